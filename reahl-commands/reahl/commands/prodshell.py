@@ -20,7 +20,6 @@
 import sys
 import os.path
 import os
-import shutil
 import inspect
 
 if sys.version_info < (3, 8):
@@ -35,7 +34,7 @@ from reahl.component.dbutils import SystemControl
 from reahl.component.shelltools import Command
 from reahl.component.context import ExecutionContext
 from reahl.component.config import ConfigSetting, StoredConfiguration, MissingValue
-from reahl.component.eggs import ReahlEgg, DistributionCache
+from reahl.component.eggs import ReahlEgg, DistributionCache, TranslationIndex, ComponentGraphCache
 from reahl.component.exceptions import DomainException
 from reahl.component.migration import MigrationPlan
 
@@ -73,6 +72,58 @@ class ComponentInfo(Command):
                 print('\t%s.%s:\t\t\t%s' % (configuration_class.config_key, name, value.description))
 
 
+class StoredIndexCommand(Command):
+    """Superclass of commands that store information about installed distributions for running processes to read."""
+    def assemble(self):
+        self.parser.add_argument('--remove', action='store_true', dest='remove', default=False,
+                                 help='remove what was stored (eg, before uninstalling)')
+
+    def remove(self, stored_path):
+        if os.path.exists(stored_path):
+            os.remove(stored_path)
+            print('removed %s' % stored_path)
+        return 0
+
+
+class IndexTranslations(StoredIndexCommand):
+    """Builds an index of all installed translation catalogues and stores it in the cache directory
+       (the installed distributions' directory, unless REAHL_CACHE_DIRECTORY is set)."""
+    keyword = 'indextranslations'
+    def execute(self, args):
+        stored_path = TranslationIndex.get_stored_path()
+        if args.remove:
+            return self.remove(stored_path)
+        entry_points = TranslationIndex.get_translation_entry_points()
+        if not TranslationIndex.can_be_stored(entry_points):
+            raise DomainException(message='Not indexing: some translation packages are editable installs.')
+        index = TranslationIndex.build(entry_points, TranslationIndex.fingerprint_of(entry_points))
+        index.write(stored_path)
+        print('indexed %s catalogues in %s' % (len(index.catalogues), stored_path))
+        return 0
+
+
+class IndexComponents(StoredIndexCommand):
+    """Resolves all the components the given root components depend on and stores them in the cache directory
+       (the installed distributions' directory, unless REAHL_CACHE_DIRECTORY is set)."""
+    keyword = 'indexcomponents'
+    def assemble(self):
+        super().assemble()
+        self.parser.add_argument('root_eggs', type=str, nargs='*', help='the root components (reahlsystem.root_egg) of the installed applications')
+
+    def execute(self, args):
+        stored_path = ComponentGraphCache.get_stored_path()
+        if args.remove:
+            return self.remove(stored_path)
+        graph_cache = ComponentGraphCache(ComponentGraphCache.fingerprint_installed_distributions())
+        for root_egg in args.root_eggs:
+            interfaces = ReahlEgg.compute_uncached_relevant_interfaces(root_egg, [])
+            if not graph_cache.can_be_stored(interfaces):
+                raise DomainException(message='Not indexing %s: some of its components are not installed on disk.' % root_egg)
+            graph_cache.store_interfaces(root_egg, [], interfaces)
+            print('indexed %s components of %s in %s' % (len(interfaces), root_egg, stored_path))
+        return 0
+
+
 class ProductionCommand(Command):
     """Superclass used for all production shell commands."""
     def assemble(self):
@@ -385,11 +436,13 @@ class RunJobs(ProductionCommand):
 
 
 class ExportStaticFiles(ProductionCommand):
-    """Exports all static web assets found in web.libraries to a specified directory."""
+    """Exports all static web assets found in web.libraries to a specified directory, along with a manifest of their content hashed names."""
     keyword = 'exportstatics'
     def assemble(self):
         super().assemble()
         self.parser.add_argument('destination_directory', type=str,  help='the destination directory to export to')
+        self.parser.add_argument('-j', '--jobs', type=int, dest='jobs', default=None, help='the number of processes to use (defaults to the number of CPUs)')
+        self.parser.add_argument('--no-compress', action='store_false', dest='compress', help='do not write compressed (.gz, .br) variants of exported files')
 
     def execute(self, args):
         super().execute(args)
@@ -399,9 +452,14 @@ class ExportStaticFiles(ProductionCommand):
             os.mkdir(args.destination_directory)
         except Exception as ex:
             raise DomainException(message='Could not create %s: %s' % (args.destination_directory, str(ex)))
-            
-        for packaged_file in self.config.web.frontend_libraries.packaged_files():
-            print('extracting %s' % packaged_file.full_path)
-            shutil.copy(packaged_file.full_path, args.destination_directory)
+
+        with self.context:
+            web_config = self.config.web
+            manifest = web_config.frontend_libraries.export_to(args.destination_directory,
+                                                               include_bundles=web_config.bundle_frontend_libraries,
+                                                               compress=args.compress, max_workers=args.jobs)
+        print('exported %s files to %s' % (len(manifest.exported_names), args.destination_directory))
+        print('set web.static_files_manifest to %s to refer to their content hashed names' % os.path.join(os.path.abspath(args.destination_directory), manifest.file_name))
+        return 0
 
 
@@ -187,7 +187,25 @@ class Configuration:
     
     filename = None   #: The name of the config file from which this Configuration will be read.
     config_key = None #: The variable name to which an instance of this Configuration will be bound when reading `filename`
-    
+    changes_made = 0  # Counts changes to all Configurations, so that snapshots know when they are out of date
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        Configuration.changes_made += 1
+
+    @property
+    def snapshot(self):
+        """A :class:`ConfigurationSnapshot` of this Configuration, recreated only if a Configuration was changed
+           since it was last created.
+
+           .. versionadded:: 7.1
+        """
+        changes_made, snapshot = self.__dict__.get('cached_snapshot', (None, None))
+        if changes_made != Configuration.changes_made:
+            snapshot = ConfigurationSnapshot(self)
+            self.__dict__['cached_snapshot'] = (Configuration.changes_made, snapshot)
+        return snapshot
+
     def update(self, other):
         for name, value in other.__dict__.items():
             setattr(self, name, value)
@@ -248,6 +266,41 @@ class Configuration:
         pass
         
 
+class ConfigurationSnapshot:
+    """A read-only copy of a :class:`Configuration` (and of the Configurations nested in it) in which the
+       value of each ConfigSetting has been resolved once and stored as a plain attribute.
+
+       Reading a setting from a snapshot is thus much cheaper than reading it from the Configuration itself,
+       where defaults (including DeferredDefaults and entry points) are resolved anew on each access.
+       Anything else (such as methods, properties or settings that have not been set) is read from the
+       Configuration itself.
+
+       Obtain a snapshot via :attr:`Configuration.snapshot`, rather than creating one directly.
+
+       :param config: The Configuration to copy.
+
+       .. versionadded:: 7.1
+    """
+    def __init__(self, config):
+        values = {}
+        for name, value in config.__dict__.items():
+            if name != 'cached_snapshot':
+                values[name] = ConfigurationSnapshot(value) if isinstance(value, Configuration) else value
+        for name, config_item in config.config_items():
+            try:
+                values[name] = getattr(config, name)
+            except ConfigurationException:
+                pass
+        self.__dict__.update(values)
+        self.__dict__['configuration'] = config
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__['configuration'], name)
+
+    def __setattr__(self, name, value):
+        raise ConfigurationException('Cannot set %s on a snapshot of %s: change the Configuration itself instead' % (name, self.configuration))
+
+
 class NullORMControl:
     @property
     def connected(self):
@@ -263,6 +316,10 @@ class NullORMControl:
     def managed_transaction(self):
         yield None
 
+    @contextmanager
+    def read_replica_routing(self):
+        yield None
+
 
 class ReahlSystemConfig(Configuration):
     filename = 'reahl.config.py'
@@ -320,6 +377,9 @@ class StoredConfiguration(Configuration):
         """Read and optionally validate the configuration.
 
         :keyword validate: If True (the default), also check that all required config is specified and warns about dangerous defaults.
+
+        .. versionchanged:: 7.1
+           Also creates the :attr:`snapshot` of the configuration read.
         """
         self.check_for_python_issue_18378()
         self.configure_logging()
@@ -335,6 +395,7 @@ class StoredConfiguration(Configuration):
         self.configure_components(include_test_dependencies)
         if validate:
             self.validate_components()
+        self.snapshot  # Created up front, so that the first request need not create it
 #        sys.path.remove(self.config_directory)
 
     def configure_logging(self):
@@ -110,12 +110,27 @@ class SystemControl:
         """Disconnects from the database."""
         self.orm_control.disconnect()
 
+    def get_connection_pool_metrics(self):
+        """Returns statistics about the use of the database connection pool (or None if these are not available).
+
+           .. versionadded:: 7.1
+        """
+        return self.orm_control.get_connection_pool_metrics()
+
     def managed_transaction(self):
         return self.orm_control.managed_transaction()
 
     def nested_transaction(self):
         return self.orm_control.nested_transaction()
 
+    def read_replica_routing(self):
+        """A context manager for code that only reads: while in effect, reads are sent to a read replica
+           of the database, if one is configured.
+
+           .. versionadded:: 7.1
+        """
+        return self.orm_control.read_replica_routing()
+
     def finalise_session(self):
         self.orm_control.finalise_session()
 
@@ -312,6 +327,9 @@ class ORMControl:
     @contextmanager
     def managed_transaction(self):
         pass
+    @contextmanager
+    def read_replica_routing(self):
+        pass
     def connect(self, auto_commit=False):
         pass
     @property
@@ -321,6 +339,8 @@ class ORMControl:
         pass
     def disconnect(self):
         pass
+    def get_connection_pool_metrics(self):
+        pass
     def commit(self):
         """Commits the current transaction. Programmers should not need to deal with such transaction
            management explicitly, since the framework already manages transactions itself."""
@@ -27,6 +27,10 @@ import toml
 import functools
 import importlib
 import pathlib
+import json
+import sysconfig
+import hashlib
+import platform
 
 import packaging
 import packaging.requirements
@@ -93,9 +97,269 @@ class DistributionCache:
             return self.cache[normalized_name]
 
         dist = importlib_metadata.distribution(req.name)
+        return self.add_distribution(dist)
+
+    def add_distribution(self, dist):
         dist_normalized_name = dist.metadata['Name'].lower()
-        self.cache[dist_normalized_name] = dist
-        return dist
+        return self.cache.setdefault(dist_normalized_name, dist)
+
+
+def get_cache_directory():
+    """Returns the directory in which information about the installed distributions is stored for
+       reuse by other processes: the directory named by the REAHL_CACHE_DIRECTORY environment variable
+       if it is set, else the directory into which distributions are installed.
+
+       .. versionadded:: 7.1
+    """
+    return os.environ.get('REAHL_CACHE_DIRECTORY', sysconfig.get_paths()['purelib'])
+
+
+def may_store_while_running():
+    """Whether information may be stored in the cache directory by a running process, rather than only by
+       commands run at install time (see :func:`get_cache_directory`).
+
+       .. versionadded:: 7.1
+    """
+    return 'REAHL_CACHE_DIRECTORY' in os.environ
+
+
+class TranslationIndex:
+    """An index of all the compiled translation catalogues (.mo files) provided by the installed
+       reahl.translations entry points, per domain and locale.
+
+       Building the index means traversing all translation packages on disk. The index is thus computed
+       only once per process. A running process reads a stored index instead of building its own, but only
+       stores one itself if REAHL_CACHE_DIRECTORY is set (see :func:`get_cache_directory`); otherwise the
+       index is stored at install time by `reahl indextranslations`. A stored index is ignored once the
+       installed translation packages differ from those it was built from. Translations provided by
+       editable installs are never stored, since their catalogues can change without their version changing.
+
+       .. versionadded:: 7.1
+    """
+    instance = None
+    filename = 'reahl-translation-index.json'
+
+    @classmethod
+    def get_stored_path(cls):
+        return os.path.join(get_cache_directory(), cls.filename)
+
+    @classmethod
+    def get_instance(cls):
+        if not cls.instance:
+            cls.instance = cls.read_or_build()
+        return cls.instance
+
+    @classmethod
+    def clear_cache(cls):
+        cls.instance = None
+
+    @classmethod
+    def get_translation_entry_points(cls):
+        if ReahlEgg.can_use_modern_entry_points_api():
+            # Python 3.9+ API with group parameter
+            return list(importlib_metadata.entry_points(group='reahl.translations'))
+        else:
+            # Python 3.8 API returns dict-like object
+            return list(importlib_metadata.entry_points().get('reahl.translations', []))
+
+    @classmethod
+    def is_editable(cls, dist):
+        try:
+            direct_url = json.loads(dist.read_text('direct_url.json') or '{}')
+        except ValueError:
+            return False
+        return direct_url.get('dir_info', {}).get('editable', False)
+
+    @classmethod
+    def fingerprint_of(cls, entry_points):
+        fingerprint = []
+        for entry_point in entry_points:
+            dist = getattr(entry_point, 'dist', None)
+            dist_id = '%s %s' % (dist.metadata['Name'], dist.version) if dist else ''
+            fingerprint.append('%s = %s [%s]' % (entry_point.name, entry_point.value, dist_id))
+        return sorted(fingerprint)
+
+    @classmethod
+    def can_be_stored(cls, entry_points):
+        dists = [getattr(entry_point, 'dist', None) for entry_point in entry_points]
+        return all(dist and not cls.is_editable(dist) for dist in dists)
+
+    @classmethod
+    def read_or_build(cls):
+        entry_points = cls.get_translation_entry_points()
+        fingerprint = cls.fingerprint_of(entry_points)
+        can_be_stored = cls.can_be_stored(entry_points)
+        stored_path = cls.get_stored_path()
+        if can_be_stored:
+            stored_index = cls.read(stored_path)
+            if stored_index and stored_index.fingerprint == fingerprint:
+                return stored_index
+
+        index = cls.build(entry_points, fingerprint)
+        if can_be_stored and may_store_while_running():
+            try:
+                index.write(stored_path)
+            except OSError as ex:
+                logging.getLogger(__name__).debug('Could not store translation index in %s: %s' % (stored_path, ex))
+        return index
+
+    @classmethod
+    def read(cls, path):
+        try:
+            with open(path, 'r') as index_file:
+                stored = json.load(index_file)
+            return cls(stored['fingerprint'], [tuple(i) for i in stored['catalogues']])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def build(cls, entry_points, fingerprint):
+        catalogues = []
+        for entry_point in entry_points:
+            for catalogue in ReahlEgg.find_all_catalogues(entry_point):
+                domain = catalogue.name[:-len('.mo')]
+                locale = catalogue.parts[-3]
+                locale_dir = str(pathlib.Path(str(catalogue)).parent.parent.parent)
+                catalogues.append((entry_point.name, domain, locale, locale_dir))
+        return cls(fingerprint, sorted(set(catalogues)))
+
+    def __init__(self, fingerprint, catalogues):
+        self.fingerprint = fingerprint
+        self.catalogues = catalogues  #: A list of tuples: (entry point name, domain, locale, directory)
+
+    def write(self, path):
+        temp_path = '%s.%s' % (path, os.getpid())
+        with open(temp_path, 'w') as index_file:
+            json.dump({'fingerprint': self.fingerprint, 'catalogues': self.catalogues}, index_file)
+        os.replace(temp_path, path)
+
+    def get_directories_for(self, domain, locale):
+        """Returns the directories that contain a catalogue for `domain` that may be used for the given `locale`.
+
+           (Catalogues for the same language as `locale` are included, because gettext falls back from, eg, 'en_gb' to 'en'.)
+        """
+        language = self.language_of(locale)
+        directories = [locale_dir for (entry_point_name, catalogue_domain, catalogue_locale, locale_dir) in self.catalogues
+                       if catalogue_domain == domain and self.language_of(catalogue_locale) == language]
+        return list(dict.fromkeys(directories))
+
+    @classmethod
+    def language_of(cls, locale):
+        return re.split('[_.@-]', locale)[0].lower()
+
+    def get_languages_provided_for(self, domain):
+        """Returns the set of locales for which the translation package of `domain` provides its own catalogue."""
+        return {catalogue_locale for (entry_point_name, catalogue_domain, catalogue_locale, locale_dir) in self.catalogues
+                if entry_point_name == domain and catalogue_domain == domain}
+
+
+class ComponentGraphCache:
+    """A cache of the ordered list of components that a given root component depends on, stored on disk
+       so that a new process need not resolve all requirements again.
+
+       A running process only reads the cache, unless REAHL_CACHE_DIRECTORY is set (see :func:`get_cache_directory`);
+       otherwise it is stored at install time by `reahl indexcomponents`.
+
+       The cache is keyed on a fingerprint of all installed distributions (and of the Python in use). Any
+       installation, upgrade or removal of a distribution thus invalidates everything in it.
+
+       .. versionadded:: 7.1
+    """
+    instance = None
+    filename = 'reahl-component-graph.json'
+
+    @classmethod
+    def get_stored_path(cls):
+        return os.path.join(get_cache_directory(), cls.filename)
+
+    @classmethod
+    def get_instance(cls):
+        if not cls.instance:
+            cls.instance = cls(cls.fingerprint_installed_distributions())
+        return cls.instance
+
+    @classmethod
+    def clear_cache(cls):
+        cls.instance = None
+
+    @classmethod
+    def get_installation_path(cls):
+        # sys.path[0] is the directory of the script being run (or the current directory): it differs
+        # between entry points into the same installation and is thus left out, unless Python was told
+        # not to prepend it
+        if sys.path and not getattr(sys.flags, 'safe_path', False):
+            return sys.path[1:]
+        return sys.path
+
+    @classmethod
+    def fingerprint_installed_distributions(cls):
+        digest = hashlib.sha256()
+        digest.update(('%s %s' % (sys.version, platform.platform())).encode('utf-8'))
+        for path_entry in cls.get_installation_path():
+            if not os.path.isdir(path_entry):
+                continue
+            for name in sorted(os.listdir(path_entry)):
+                if name.endswith('.dist-info') or name.endswith('.egg-info'):
+                    metadata_path = os.path.join(path_entry, name, 'METADATA' if name.endswith('.dist-info') else 'PKG-INFO')
+                    try:
+                        modified = os.stat(metadata_path).st_mtime_ns
+                    except OSError:
+                        modified = 0
+                    digest.update(('%s/%s@%s\n' % (path_entry, name, modified)).encode('utf-8'))
+        return digest.hexdigest()
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.entries = None
+
+    def key_for(self, main_egg, include_test_dependencies):
+        return '|'.join([main_egg]+include_test_dependencies)
+
+    def read_entries(self):
+        try:
+            with open(self.get_stored_path(), 'r') as cache_file:
+                stored = json.load(cache_file)
+            if stored['fingerprint'] == self.fingerprint:
+                return stored['components']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return {}
+
+    def get_entries(self):
+        if self.entries is None:
+            self.entries = self.read_entries()
+        return self.entries
+
+    def get_interfaces(self, main_egg, include_test_dependencies):
+        """Returns the (cached) ReahlEggs of all components `main_egg` depends on, in order, or None if not cached."""
+        stored_components = self.get_entries().get(self.key_for(main_egg, include_test_dependencies), None)
+        if stored_components is None:
+            return None
+        interfaces = []
+        for path, metadata in stored_components:
+            if not os.path.isdir(path):
+                return None
+            distribution = DistributionCache.get_instance().add_distribution(importlib_metadata.PathDistribution(pathlib.Path(path)))
+            interfaces.append(ReahlEgg(distribution, metadata=metadata))
+        return interfaces
+
+    def can_be_stored(self, interfaces):
+        return all(isinstance(i.distribution, importlib_metadata.PathDistribution) for i in interfaces)
+
+    def store_interfaces(self, main_egg, include_test_dependencies, interfaces):
+        """Stores `interfaces`, which should all be backed by distributions installed on disk (see `can_be_stored`)."""
+        stored_path = self.get_stored_path()
+        stored_components = [(str(i.distribution._path), i.metadata) for i in interfaces]
+        entries = dict(self.read_entries(), **{self.key_for(main_egg, include_test_dependencies): stored_components})
+        temp_path = '%s.%s' % (stored_path, os.getpid())
+        try:
+            with open(temp_path, 'w') as cache_file:
+                json.dump({'fingerprint': self.fingerprint, 'components': entries}, cache_file)
+            os.replace(temp_path, stored_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.entries = entries
 
 
 class InvalidDependencySpecification(DomainException):
@@ -389,9 +653,9 @@ class ReahlEgg:
     interface_cache = {}
     metadata_version_min = packaging.version.Version('1.0.0')
     metadata_version_max = packaging.version.Version('1.1.0')
-    def __init__(self, distribution):
+    def __init__(self, distribution, metadata=None):
         self.distribution = distribution
-        self.metadata = self.create_metadata(distribution)
+        self.metadata = metadata if metadata is not None else self.create_metadata(distribution)
         if self.metadata is not None:
             self.validate_version()
 
@@ -534,16 +798,15 @@ class ReahlEgg:
             job()
 
     @classmethod
-    def find_catalogues(cls, translation_entry_point):
-        def find_catalogues_in_traversable(traversable, catalogue_name):
+    def find_all_catalogues(cls, translation_entry_point):
+        def find_catalogues_in_traversable(traversable):
             for child in traversable.iterdir():
                 if child.is_dir():
-                    yield from find_catalogues_in_traversable(child, catalogue_name)
-                elif child.parts[-2] == 'LC_MESSAGES' and child.name == '%s.mo' % catalogue_name:
+                    yield from find_catalogues_in_traversable(child)
+                elif child.parts[-2] == 'LC_MESSAGES' and child.name.endswith('.mo'):
                     yield child
 
         module = translation_entry_point.load()
-        domain = translation_entry_point.name
 
         paths_contain_editable_namespace_package = (any(['__editable__.' in i for i in module.__path__]) and len(module.__path__) > 0)
         if sys.version_info < (3, 10) or paths_contain_editable_namespace_package:
@@ -553,9 +816,14 @@ class ReahlEgg:
                def iterdir(self):
                    yield from itertools.chain([pathlib.Path(i) for i in self.module.__path__ if '__editable__' not in i])
                    
-            return find_catalogues_in_traversable(TraversablePaths(module), domain)
+            return find_catalogues_in_traversable(TraversablePaths(module))
         else:
-            return find_catalogues_in_traversable(importlib_resources.files(module), domain)
+            return find_catalogues_in_traversable(importlib_resources.files(module))
+
+    @classmethod
+    def find_catalogues(cls, translation_entry_point):
+        domain = translation_entry_point.name
+        return (i for i in cls.find_all_catalogues(translation_entry_point) if i.name == '%s.mo' % domain)
     
     @classmethod
     @functools.lru_cache() #called for compatibility with python < 3.8
@@ -567,23 +835,12 @@ class ReahlEgg:
 
         domains_in_use = [e.name for e in egg_interfaces]
 
+        translation_index = TranslationIndex.get_instance()
         languages_for_eggs = {}
-
-        if cls.can_use_modern_entry_points_api():
-            # Python 3.9+ API with group parameter
-            entry_points = importlib_metadata.entry_points(group='reahl.translations')
-        else:
-            # Python 3.8 API returns dict-like object
-            all_entry_points = importlib_metadata.entry_points()
-            entry_points = all_entry_points.get('reahl.translations', [])
-
-        for translation_entry_point in entry_points:
-            for catalogue in cls.find_catalogues(translation_entry_point):
-                language = catalogue.parts[-3]
-                domain = translation_entry_point.name
-                if domain in domains_in_use:
-                    languages = languages_for_eggs.setdefault(domain, set())
-                    languages.add(language)
+        for domain in domains_in_use:
+            languages = translation_index.get_languages_provided_for(domain)
+            if languages:
+                languages_for_eggs[domain] = languages
 
         if not languages_for_eggs.values():
             return default_languages
@@ -601,6 +858,7 @@ class ReahlEgg:
     @classmethod
     def clear_cache(cls):
         cls.interface_cache.clear()
+        ComponentGraphCache.clear_cache()
 
     @classmethod
     def get_all_relevant_interfaces(cls, main_egg, include_test_dependencies=[]):
@@ -669,12 +927,24 @@ class ReahlEgg:
     
     @classmethod
     def compute_all_relevant_interfaces(cls, main_egg, include_test_dependencies):
-        interfaces = []
+        graph_cache = ComponentGraphCache.get_instance()
+        interfaces = graph_cache.get_interfaces(main_egg, include_test_dependencies)
+        if interfaces is not None:
+            return interfaces
 
+        interfaces = cls.compute_uncached_relevant_interfaces(main_egg, include_test_dependencies)
+        if may_store_while_running() and graph_cache.can_be_stored(interfaces):
+            try:
+                graph_cache.store_interfaces(main_egg, include_test_dependencies, interfaces)
+            except (OSError, TypeError, ValueError) as ex:
+                logging.getLogger(__name__).debug('Could not store component graph in %s: %s' % (graph_cache.get_stored_path(), ex))
+        return interfaces
+
+    @classmethod
+    def compute_uncached_relevant_interfaces(cls, main_egg, include_test_dependencies):
+        interfaces = []
         for i in cls.compute_ordered_dependent_distributions(main_egg, include_test_dependencies):
             interface = cls(i)
             if interface.is_component:
                 interfaces.append(interface)
-
         return interfaces
-
@@ -14,18 +14,21 @@
 #    You should have received a copy of the GNU Lesser General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import gettext
 import threading
 import logging
 
-
-from babel.support import Translations
-
 from reahl.component.context import ExecutionContext
-from reahl.component.config import ReahlSystemConfig
 
 
 class SystemWideCatalogue:
+    """The process-wide cache of all translations, keyed by (locale, domain).
+
+       Translations that could not be found are cached as well (as NullTranslations), so that each (locale, domain)
+       is only ever searched for on disk once. Once a translation is cached it is read without taking any lock.
+
+       .. versionchanged:: 7.1
+          Also caches translations that do not exist; added `preload` and `preload_supported_locales`.
+    """
     instance = None
     @classmethod
     def get_instance(cls):
@@ -38,18 +41,53 @@ class SystemWideCatalogue:
         self.map_lock = threading.Lock()
 
     def get_translation_for(self, locale, domain):
-        translation = self.translations.get((locale, domain), None)
-        if not translation:
+        try:
+            return self.translations[(locale, domain)]
+        except KeyError:
             with self.map_lock:
-                for package in ReahlSystemConfig().translation_packages:
-                    for locale_dir in package.__path__:
-                        logging.getLogger(__name__).debug('Adding translations from %s' % locale_dir)
-                        if not isinstance(translation, Translations):
-                            translation = Translations.load(dirname=locale_dir, locales=[locale], domain=domain)
-                        else:
-                            translation.merge(Translations.load(dirname=locale_dir, locales=[locale], domain=domain))
-                self.translations[(locale, domain)] = translation
-        return translation or gettext.NullTranslations()
+                translation = self.translations.get((locale, domain), None)
+                if translation is None:
+                    translation = self.load_translation(locale, domain)
+                    # Replaced as a whole so that lock-free readers never see a dict that is being changed
+                    self.translations = {**self.translations, (locale, domain): translation}
+                return translation
+
+    def load_translation(self, locale, domain):
+        from babel.support import Translations, NullTranslations
+        from reahl.component.eggs import TranslationIndex
+        translation = NullTranslations()
+        for locale_dir in TranslationIndex.get_instance().get_directories_for(domain, locale):
+            logging.getLogger(__name__).debug('Adding translations from %s' % locale_dir)
+            loaded = Translations.load(dirname=locale_dir, locales=[locale], domain=domain)
+            if isinstance(translation, Translations):
+                translation.merge(loaded)
+            elif isinstance(loaded, Translations):
+                translation = loaded
+        return translation
+
+    def preload(self, locales, domains):
+        """Loads (and caches) the translations of each of the given `domains` for each of the given `locales`.
+
+           :param locales: A list of locale names, such as 'en_gb'.
+           :param domains: A list of translation domains (the names of components).
+
+           .. versionadded:: 7.1
+        """
+        for locale in locales:
+            for domain in domains:
+                self.get_translation_for(locale, domain)
+
+    def preload_supported_locales(self, root_egg):
+        """Loads (and caches) translations for every locale supported by the component `root_egg` and the components
+           it depends on, so that no translation needs to be searched for on disk while serving requests.
+
+           :param root_egg: The name of the root component of the application.
+
+           .. versionadded:: 7.1
+        """
+        from reahl.component.eggs import ReahlEgg
+        domains = [egg.name for egg in ReahlEgg.get_all_relevant_interfaces(root_egg)]
+        self.preload(ReahlEgg.get_languages_supported_by_all(root_egg), domains)
 
     @property
     def current_locale(self):
@@ -39,10 +39,6 @@ except ImportError:
     except ImportError:
         raise ImportError('You are using a python version that does not support functools.cached_property. Please run "pip install cached-property"')
 
-import dateutil.parser 
-import babel.dates 
-from babel.core import Locale
-from babel.numbers import parse_decimal, format_number
 from wrapt import FunctionWrapper, BoundFunctionWrapper
 
 
@@ -1530,6 +1526,8 @@ class NumericField(Field):
         super().__init__(default, required, required_message, label, readable=readable, writable=writable, max_length=254)
         error_message = _('$label should be a valid number')
 
+        import babel.numbers
+        from babel.core import Locale
         locale = Locale.parse(ExecutionContext.get_context().interface_locale)
         plus = babel.numbers.get_plus_sign_symbol(locale=locale)
         minus = babel.numbers.get_minus_sign_symbol(locale=locale)
@@ -1546,11 +1544,13 @@ class NumericField(Field):
             self.add_validation_constraint(MaxValueConstraint(max_value))
 
     def parse_input(self, unparsed_input):
+        from babel.numbers import parse_decimal
         return parse_decimal(unparsed_input, ExecutionContext.get_context().interface_locale)
 
     def unparse_input(self, parsed_value):
         if parsed_value is None:
             return ''
+        from babel.numbers import format_number
         return format_number(parsed_value, ExecutionContext.get_context().interface_locale)
 
 
@@ -1607,12 +1607,14 @@ class DateField(Field):
             self.add_validation_constraint(MaxValueConstraint(max_value))
 
     def is_day_first_in_format_pattern(self):
+        import babel.dates
         date_pattern = babel.dates.get_date_format(format=self.date_format, locale=_.current_locale)
         unique_chars = ''.join(OrderedDict.fromkeys(str(date_pattern))).lower()
         return unique_chars.index('d') < unique_chars.index('m')
 
     @property
     def parser_info(self):
+        import dateutil.parser
         class ParserInfo(dateutil.parser.parserinfo):
             WEEKDAYS = [(_('Mon'), _('Monday')),
                     (_('Tue'), _('Tuesday')),
@@ -1647,6 +1649,7 @@ class DateField(Field):
         return ParserInfo()
 
     def parse_input(self, unparsed_input):
+        import dateutil.parser
         try:
             return dateutil.parser.parse(unparsed_input, dayfirst=self.is_day_first_in_format_pattern(), parserinfo=self.parser_info).date()
             #Cannot use bable parse reliably. See https://github.com/python-babel/babel/issues/541
@@ -1659,6 +1662,7 @@ class DateField(Field):
     def unparse_input(self, parsed_value):
         if not parsed_value:
             return ''
+        import babel.dates
         return babel.dates.format_date(parsed_value, format=self.date_format, locale=_.current_locale)
 
 
@@ -1931,18 +1935,31 @@ class UploadedFile:
     .. versionchanged:: 3.0
        UploadedFile is now constructed with the entire contents of the uploaded file instead of with a file-like object as in 2.1.
 
+    .. versionchanged:: 7.1
+       `contents` can also be a binary file-like object (such as the temporary file an upload was spooled to).
+       Such contents are only read when asked for, and not kept in memory.
+
     """
     def __init__(self, filename, contents, mime_type):
-        assert isinstance(contents, bytes)
-        self.contents = contents
+        assert isinstance(contents, bytes) or hasattr(contents, 'read')
+        self.source = contents
         self.filename = filename  #: The name of the file
         self.mime_type = mime_type #: The mime type of the file
 
+    @property
+    def contents(self):
+        """The entire contents of the file, as bytes."""
+        if isinstance(self.source, bytes):
+            return self.source
+        with self.open() as f:
+            return f.read()
 
     @property
     def size(self):
         """The size of the UploadedFile contents."""
-        return len(self.contents)
+        if isinstance(self.source, bytes):
+            return len(self.source)
+        return self.source.seek(0, io.SEEK_END)
 
     @contextmanager
     def open(self):
@@ -1955,9 +1972,13 @@ class UploadedFile:
            with uploaded_file.open() as contents:
                print(contents.read())
         """
-        # Scaffolding to maintain the old API when contents was a file-like object
-        with io.BytesIO(self.contents) as f:
-            yield f
+        if isinstance(self.source, bytes):
+            # Scaffolding to maintain the old API when contents was a file-like object
+            with io.BytesIO(self.source) as f:
+                yield f
+        else:
+            self.source.seek(0)
+            yield self.source
 
 
 class FileSizeConstraint(ValidationConstraint):
@@ -18,10 +18,13 @@
 
 from packaging.requirements import Requirement
 
-from reahl.tofu import expected, NoException
-from reahl.stubble import EasterEgg
+import sys
+import os.path
 
-from reahl.component.eggs import ReahlEgg, DistributionCache
+from reahl.tofu import expected, NoException, temp_dir
+from reahl.stubble import EasterEgg, CallMonitor
+
+from reahl.component.eggs import ReahlEgg, DistributionCache, ComponentGraphCache
 
 
 def distribution_name(distribution):
@@ -171,3 +174,87 @@ def test_compute_ordered_dependent_distributions_finds_transitive_dependencies_v
     # Verify reahl-tofu itself is in its list
     assert 'reahl-tofu' in tofu_names or 'reahl_tofu' in tofu_names
 
+
+def test_resolved_components_are_cached_on_disk():
+    """The ordered list of components a root component depends on can be stored on disk, and is reused by
+       other processes for as long as the installed distributions stay the same."""
+    DistributionCache.clear_cache()
+    ReahlEgg.clear_cache()
+    ComponentGraphCache.clear_cache()
+
+    directory = temp_dir()
+    saved_environ = os.environ.copy()
+    os.environ['REAHL_CACHE_DIRECTORY'] = directory.name
+    try:
+        stored_path = ComponentGraphCache.get_stored_path()
+        assert stored_path.startswith(directory.name)
+        computed_names = [i.name for i in ReahlEgg.compute_all_relevant_interfaces('reahl-component', [])]
+        assert os.path.isfile(stored_path)
+
+        # Another process, with the same installed distributions
+        fingerprint = ComponentGraphCache.fingerprint_installed_distributions()
+        ComponentGraphCache.instance = ComponentGraphCache(fingerprint)
+        with CallMonitor(ReahlEgg.compute_ordered_dependent_distributions) as monitor:
+            cached_interfaces = ReahlEgg.compute_all_relevant_interfaces('reahl-component', [])
+        assert monitor.times_called == 0
+        assert [i.name for i in cached_interfaces] == computed_names
+        [cached_component] = [i for i in cached_interfaces if i.name == 'reahl-component']
+        assert cached_component.get_persisted_classes_in_order() == ReahlEgg(DistributionCache.get_instance().get_distribution('reahl-component')).get_persisted_classes_in_order()
+
+        # Another process, after distributions have changed
+        ComponentGraphCache.instance = ComponentGraphCache('a different fingerprint')
+        assert ComponentGraphCache.get_instance().get_interfaces('reahl-component', []) is None
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        ComponentGraphCache.clear_cache()
+
+
+def test_resolved_components_are_only_read_by_running_processes():
+    """Unless REAHL_CACHE_DIRECTORY is set, a running process does not store the components it resolved: they
+       are stored (in the directory of installed distributions) only when explicitly asked, at install time."""
+    DistributionCache.clear_cache()
+    ReahlEgg.clear_cache()
+    ComponentGraphCache.clear_cache()
+
+    directory = temp_dir()
+    saved_get_stored_path = ComponentGraphCache.get_stored_path
+    saved_environ = os.environ.copy()
+    os.environ.pop('REAHL_CACHE_DIRECTORY', None)
+    stored_path = os.path.join(directory.name, 'graph.json')
+    ComponentGraphCache.get_stored_path = classmethod(lambda cls: stored_path)
+    try:
+        interfaces = ReahlEgg.compute_all_relevant_interfaces('reahl-component', [])
+        assert not os.path.exists(stored_path)
+
+        # At install time
+        graph_cache = ComponentGraphCache(ComponentGraphCache.fingerprint_installed_distributions())
+        assert graph_cache.can_be_stored(interfaces)
+        graph_cache.store_interfaces('reahl-component', [], interfaces)
+        assert os.path.isfile(stored_path)
+
+        ComponentGraphCache.clear_cache()
+        with CallMonitor(ReahlEgg.compute_ordered_dependent_distributions) as monitor:
+            cached_interfaces = ReahlEgg.compute_all_relevant_interfaces('reahl-component', [])
+        assert monitor.times_called == 0
+        assert [i.name for i in cached_interfaces] == [i.name for i in interfaces]
+    finally:
+        ComponentGraphCache.get_stored_path = saved_get_stored_path
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        ComponentGraphCache.clear_cache()
+
+
+def test_fingerprint_is_the_same_for_all_entry_points():
+    """The directory of the script being run (sys.path[0]) is not part of the fingerprint of installed distributions,
+       so that different entry points into the same installation share what is cached."""
+    directory = temp_dir()
+    directory.sub_dir('some_distribution-1.0.dist-info').file_with('METADATA', 'Name: some-distribution')
+
+    saved_first_path = sys.path[0]
+    try:
+        fingerprint = ComponentGraphCache.fingerprint_installed_distributions()
+        sys.path[0] = directory.name
+        assert ComponentGraphCache.fingerprint_installed_distributions() == fingerprint
+    finally:
+        sys.path[0] = saved_first_path
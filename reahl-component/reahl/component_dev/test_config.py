@@ -287,3 +287,33 @@ def test_config_dependent_defaults(config_with_files):
     assert config.some_key.some_other_setting == 'tra default value lala' 
 
     
+
+
+@with_fixtures(ConfigWithFiles)
+def test_config_snapshot(config_with_files):
+    """A read-only snapshot of the configuration, with all values resolved to plain attributes, is created when
+       configuring. A new snapshot is created once the configuration is changed."""
+
+    fixture = config_with_files
+    fixture.new_config_file(filename=ConfigWithDependentSetting.filename,
+                            contents='some_key.some_setting = 3')
+    fixture.set_config_spec(fixture.easter_egg, 'reahl.component_dev.test_config:ConfigWithDependentSetting')
+
+    config = StoredConfiguration(fixture.config_dir.name)
+    config.configure()
+
+    snapshot = config.snapshot
+    assert config.snapshot is snapshot
+    assert snapshot.some_key.__dict__['some_other_setting'] == 'tra 3 lala'
+    assert snapshot.reahlsystem.debug is False
+    assert snapshot.config_directory == fixture.config_dir.name
+
+    # Anything not resolved in the snapshot is read from the configuration itself
+    assert snapshot.some_key.config_items == config.some_key.config_items
+
+    with expected(ConfigurationException):
+        snapshot.some_key.some_setting = 4
+
+    config.some_key.some_setting = 4
+    assert config.snapshot is not snapshot
+    assert config.snapshot.some_key.some_other_setting == 'tra 4 lala'
@@ -17,6 +17,7 @@
 
 import datetime
 import functools
+import tempfile
 
 from reahl.tofu import Fixture, scenario, expected, NoException, uses
 from reahl.tofu.pytestsupport import with_fixtures
@@ -1314,6 +1315,24 @@ def test_file_validation_max_files(fixture):
         field.set_user_input(files)
 
 
+@with_fixtures(FieldFixture)
+def test_uploaded_file_backed_by_a_file(fixture):
+    """An UploadedFile can be backed by a file instead of by bytes, in which case its contents are only read when needed."""
+    file_obj = tempfile.TemporaryFile()
+    file_obj.write(b'.'*100)
+
+    uploaded_file = UploadedFile('file1', file_obj, 'text/plain')
+    assert uploaded_file.size == 100
+    with uploaded_file.open() as contents:
+        assert contents.read(10) == b'.'*10
+    assert uploaded_file.contents == b'.'*100
+
+    field = FileField(allow_multiple=True, max_size_bytes=50)
+    field.bind('file_value', fixture.model_object)
+    with expected(FileSizeConstraint):
+        field.set_user_input([uploaded_file])
+
+
 @with_fixtures(FieldFixture)
 def test_date_marshalling(fixture):
     """A DateField marshalls human readable date representation to a datetime.date object.
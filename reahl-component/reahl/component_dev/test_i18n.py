@@ -16,13 +16,16 @@
 
 from threading import Timer
 import datetime
+import os.path
 
 import babel.dates 
 
-from reahl.stubble import stubclass, InitMonitor, EmptyStub
+from reahl.tofu import temp_dir
+from reahl.stubble import stubclass, InitMonitor, CallMonitor, EmptyStub
 
 from reahl.component.context import ExecutionContext
 from reahl.component.i18n import Catalogue, SystemWideCatalogue
+from reahl.component.eggs import TranslationIndex
 
 
 @stubclass(ExecutionContext)
@@ -117,3 +120,78 @@ def test_translator_singleton_thread_safety():
     assert saved_state.lock_released
 
 
+def test_missing_translations_are_cached():
+    """Once looked for, a translation that does not exist is not searched for again, and cached translations
+       are read without taking the lock."""
+
+    SystemWideCatalogue.instance = None  # To "reset" the singleton
+    catalogue = SystemWideCatalogue.get_instance()
+    _ = Catalogue('reahl-component')
+
+    with LocaleContextStub(locale='xx') as context:
+        with CallMonitor(catalogue.load_translation) as monitor:
+            assert _('test string') == 'test string'
+            assert _.ngettext('thing', 'things', 3) == 'things'
+        assert monitor.times_called == 1
+
+        catalogue.map_lock.acquire()
+        try:
+            assert _('test string') == 'test string'
+        finally:
+            catalogue.map_lock.release()
+
+
+def test_preloading_translations():
+    """All translations needed can be loaded up front."""
+
+    SystemWideCatalogue.instance = None  # To "reset" the singleton
+    catalogue = SystemWideCatalogue.get_instance()
+    catalogue.preload(['af', 'xx'], ['reahl-component'])
+
+    assert set(catalogue.translations.keys()) == {('af', 'reahl-component'), ('xx', 'reahl-component')}
+    with CallMonitor(catalogue.load_translation) as monitor:
+        with LocaleContextStub(locale='af'):
+            assert Catalogue('reahl-component')('test string') == 'toets string'
+    assert monitor.times_called == 0
+
+
+def test_translation_index():
+    """The TranslationIndex knows where to find the catalogues of each domain and locale, and can be stored
+       and read back so it does not have to be built by every process."""
+
+    TranslationIndex.clear_cache()
+    index = TranslationIndex.get_instance()
+
+    assert index.get_directories_for('reahl-component', 'af')
+    assert index.get_directories_for('reahl-component', 'af_ZA') == index.get_directories_for('reahl-component', 'af')
+    assert not index.get_directories_for('reahl-component', 'xx')
+    assert 'af' in index.get_languages_provided_for('reahl-component')
+
+    directory = temp_dir()
+    stored_path = os.path.join(directory.name, 'index.json')
+    index.write(stored_path)
+    stored_index = TranslationIndex.read(stored_path)
+    assert stored_index.fingerprint == index.fingerprint
+    assert stored_index.catalogues == index.catalogues
+
+    assert not TranslationIndex.read(os.path.join(directory.name, 'nonexistent.json'))
+
+
+def test_translation_index_is_only_read_by_running_processes():
+    """Unless REAHL_CACHE_DIRECTORY is set, a running process builds its TranslationIndex without storing it."""
+
+    directory = temp_dir()
+    stored_path = os.path.join(directory.name, 'index.json')
+    saved_get_stored_path = TranslationIndex.get_stored_path
+    saved_environ = os.environ.copy()
+    TranslationIndex.get_stored_path = classmethod(lambda cls: stored_path)
+    try:
+        os.environ.pop('REAHL_CACHE_DIRECTORY', None)
+        TranslationIndex.clear_cache()
+        assert TranslationIndex.get_instance().get_directories_for('reahl-component', 'af')
+        assert not os.path.exists(stored_path)
+    finally:
+        TranslationIndex.get_stored_path = saved_get_stored_path
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        TranslationIndex.clear_cache()
@@ -22,14 +22,13 @@ Run 'reahl componentinfo reahl-domain' for information on configuration.
 """
 
 from datetime import datetime, timedelta
-import passlib.context
 import re
 import random
 from string import Template
 import logging
 
 from sqlalchemy import Column, Integer, ForeignKey, UnicodeText, String, DateTime, Boolean, Unicode
-from sqlalchemy.orm import relationship, reconstructor
+from sqlalchemy.orm import relationship
 
 from reahl.sqlalchemysupport import Base, Session, session_scoped
 
@@ -141,15 +140,20 @@ class EmailAndPasswordSystemAccount(SystemAccount):
     password_hash = Column(Unicode(1024), nullable=False)  #: The hashed password
     email = Column(Unicode(254), nullable=False, unique=True, index=True) #: The email address of this account
 
+    shared_crypt_context = None
+
     def __init__(self, **kwargs):
         super().__init__()
         self.linked_to(**kwargs)
-        self.init_on_load()
 
-    @reconstructor
-    def init_on_load(self):
-        self.crypt_context = passlib.context.CryptContext(schemes=["pbkdf2_sha512", "hex_md5"],
-                                                          deprecated="auto")
+    @property
+    def crypt_context(self):
+        cls = EmailAndPasswordSystemAccount
+        if not cls.shared_crypt_context:
+            import passlib.context
+            cls.shared_crypt_context = passlib.context.CryptContext(schemes=["pbkdf2_sha512", "hex_md5"],
+                                                                    deprecated="auto")
+        return cls.shared_crypt_context
 
     @classmethod
     def by_email(cls, email):
@@ -619,7 +623,7 @@ class LoginSession(Base):
     }
 
     account_id = Column(Integer, ForeignKey('systemaccount.id'), index=True)
-    account = relationship(SystemAccount) #: The SystemAccount currently logged on
+    account = relationship(SystemAccount, lazy='joined') #: The SystemAccount currently logged on
 
     def is_logged_in(self, secured=False):
         """Answers whether the user is logged in.
@@ -16,9 +16,6 @@
 
 """Tools for handling ReStructured Text."""
 
-import docutils.io
-import docutils.core
-
 
 class RestructuredText:
     """A chunk of ReStructured Text.
@@ -37,6 +34,9 @@ class RestructuredText:
 
            .. versionadded:: 4.0
         """
+        import docutils.io
+        import docutils.core
+
         settings = {'initial_header_level': header_start,
                     'doctitle_xform': False,
                     'output_encoding': 'unicode',
@@ -25,10 +25,15 @@ import weakref
 from contextlib import contextmanager
 import logging
 import pprint
+import time
+import threading
 
 import sqlalchemy 
 from sqlalchemy import *
 from sqlalchemy.orm import sessionmaker, scoped_session, relationship
+from sqlalchemy.orm import Session as SqlAlchemySession
+from sqlalchemy.sql.expression import Select, CompoundSelect
+from sqlalchemy import event
 from sqlalchemy.exc import InvalidRequestError, SQLAlchemyError
 from sqlalchemy import Column, Integer, ForeignKey
 from alembic.runtime.migration import MigrationContext
@@ -50,8 +55,34 @@ class SqlAlchemyConfig(Configuration):
     filename = 'sqlalchemy.config.py'
     config_key = 'sqlalchemy'
 
-    engine_create_args = ConfigSetting(description='Extra create arguments passed to sqlalchemy.create_engine()',
+    engine_create_args = ConfigSetting(description='Extra create arguments passed to sqlalchemy.create_engine() (pool_* settings that are set override these)',
                                        default={'pool_pre_ping': True})
+    pool_size = ConfigSetting(default=None, description='The number of connections kept open in the pool (None: the default of the dialect)')
+    max_overflow = ConfigSetting(default=None, description='The number of connections that may be opened in addition to pool_size when all are in use')
+    pool_timeout = ConfigSetting(default=None, description='Seconds to wait for a connection from the pool before giving up')
+    pool_recycle = ConfigSetting(default=None, description='Connections older than this number of seconds are replaced when next checked out (None: never)')
+    pool_pre_ping = ConfigSetting(default=None, description='Whether to test each connection for liveness when checking it out of the pool (None: as in engine_create_args, which pre-pings by default)')
+    pool_use_lifo = ConfigSetting(default=None, description='Whether to reuse the most recently used connection first (which lets unused ones time out on the server)')
+    query_cache_size = ConfigSetting(default=None, description='The number of compiled SQL statements cached per engine (None: the SQLAlchemy default)')
+    connections_opened_on_connect = ConfigSetting(default=0, description='The number of pool connections opened when connecting, instead of on first use (at most pool_size)')
+    read_replica_connection_uri = ConfigSetting(default=None, description='The URI of a read-only replica of the database to which reads of requests that do not commit are routed (None: no replica)', dangerous=True)
+
+    def get_engine_create_args(self):
+        """Returns the arguments to pass to sqlalchemy.create_engine(): `engine_create_args`, overridden by those
+           pool_* settings that are set. (Settings left as None are not passed at all, since not all pools accept them.)
+
+           .. versionadded:: 7.1
+        """
+        pool_args = {'pool_size': self.pool_size,
+                     'max_overflow': self.max_overflow,
+                     'pool_timeout': self.pool_timeout,
+                     'pool_recycle': self.pool_recycle,
+                     'pool_pre_ping': self.pool_pre_ping,
+                     'pool_use_lifo': self.pool_use_lifo,
+                     'query_cache_size': self.query_cache_size}
+        create_args = self.engine_create_args.copy()
+        create_args.update({name: value for name, value in pool_args.items() if value is not None})
+        return create_args
 
     def do_injections(self, config):
         if not isinstance(config.reahlsystem.orm_control, SqlAlchemyControl):
@@ -102,8 +133,49 @@ def ix_name(table_name, column_name):
     return 'ix_%s_%s' % (table_name, column_name)
 
 
+class RoutingSession(SqlAlchemySession):
+    """A SQLAlchemy Session that routes reads to a read replica while :meth:`SqlAlchemyControl.read_replica_routing` is in effect.
+
+       Only SELECT statements are sent to the read replica. Everything else (including textual SQL and
+       requests for a connection) goes to the primary database, as do SELECT ... FOR UPDATE and queries
+       for persisted classes that set `read_from_primary = True`. Once something other than objects of
+       such classes has been written in the current transaction, all further reads of that transaction
+       go to the primary database too, since the replica cannot see those changes.
+
+       .. versionadded:: 7.1
+    """
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        read_replica = self.info.get('read_replica')
+        if read_replica is not None and self.is_replicated_read(mapper, clause) and self.info.get('route_reads_to_replica'):
+            return read_replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def is_replicated_read(self, mapper, clause):
+        if self._flushing:
+            return False  # What a flush wrote is noted after the flush
+        if not isinstance(clause, (Select, CompoundSelect)):
+            self.info['wrote_in_transaction'] = True
+            return False
+        if self.info.get('wrote_in_transaction') or getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        return not (mapper is not None and getattr(mapper.class_, 'read_from_primary', False))
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def note_replicated_writes(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(not getattr(instance, 'read_from_primary', False) for instance in changed):
+        session.info['wrote_in_transaction'] = True
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def forget_replicated_writes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote_in_transaction', None)
+
+
 metadata = MetaData(naming_convention=naming_convention)  #: a metadata for use with other SqlAlchemy tables, shared with declarative classes using Base
-Session = scoped_session(sessionmaker(autoflush=True, autocommit=False), scopefunc=reahl_scope) #: A shared SQLAlchemy session, scoped using the current :class:`reahl.component.context.ExecutionContext`
+Session = scoped_session(sessionmaker(class_=RoutingSession, autoflush=True, autocommit=False), scopefunc=reahl_scope) #: A shared SQLAlchemy session, scoped using the current :class:`reahl.component.context.ExecutionContext`
 
 try:
 
@@ -318,7 +390,14 @@ def session_scoped(cls):
 
           Works the same as for_session() except that you need not pass a UserSession, the
           current UserSession is assumed.
+
+       Since session-scoped objects are often read in the request right after the one in which they
+       were changed, they are always read from the primary database (see :class:`RoutingSession`).
+
+       .. versionchanged:: 7.1
+          Sets read_from_primary on the decorated class.
     """
+    cls.read_from_primary = True
 
     add_mapped_attribute(cls, 'user_session_id', Column(Integer, ForeignKey('usersession.id', ondelete='CASCADE'), name='user_session_id', index=True))
     add_mapped_attribute(cls, 'user_session', relationship('UserSession'))
@@ -331,9 +410,9 @@ def session_scoped(cls):
 
     @classmethod
     def for_session(cls, user_session, **kwargs):
-        found = Session.query(cls).filter_by(user_session=user_session)
-        if found.count() >= 1:
-            return found.one()
+        found = Session.query(cls).filter_by(user_session=user_session).one_or_none()
+        if found is not None:
+            return found
         instance = cls(**kwargs)
         Session.add(instance)
         instance.user_session=user_session
@@ -355,11 +434,100 @@ class TransactionVeto:
         return self.should_commit is not None
 
 
+class ConnectionPoolMetrics:
+    """Statistics about the use of the connection pool of a SQLAlchemy Engine.
+
+       Obtain these via :meth:`reahl.component.dbutils.SystemControl.get_connection_pool_metrics`.
+
+       Checkouts, checkins and new connections are counted via pool events registered on the Engine, and waiting
+       is timed around the Engine obtaining a connection, so that measuring continues when the pool of the
+       Engine is recreated (for example by Engine.dispose()).
+
+       .. versionadded:: 7.1
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.checkouts = 0             #: The number of times a connection was checked out of the pool
+        self.checkins = 0              #: The number of times a connection was returned to the pool
+        self.connections_opened = 0    #: The number of new database connections opened by the pool
+        self.waits = 0                 #: The number of times a connection was waited for
+        self.total_wait_seconds = 0.0  #: The total time spent waiting for connections from the pool
+        self.max_wait_seconds = 0.0    #: The longest time spent waiting for a single connection from the pool
+        event.listen(engine, 'checkout', self.record_checkout)
+        event.listen(engine, 'checkin', self.record_checkin)
+        event.listen(engine, 'connect', self.record_connect)
+        self.time_waits_of(engine)
+
+    def time_waits_of(self, engine):
+        raw_connection = engine.raw_connection
+        def timed_raw_connection(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return raw_connection(*args, **kwargs)
+            finally:
+                self.record_wait(time.monotonic() - started)
+        engine.raw_connection = timed_raw_connection
+
+    def record_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self.lock:
+            self.checkouts += 1
+
+    def record_checkin(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.checkins += 1
+
+    def record_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.connections_opened += 1
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.waits += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def get_pool_statistic(self, name):
+        statistic = getattr(self.engine.pool, name, None)
+        return statistic() if statistic else None
+
+    @property
+    def size(self):
+        """The number of connections the pool keeps open (or None if the pool is not of a fixed size)."""
+        return self.get_pool_statistic('size')
+
+    @property
+    def checked_out(self):
+        """The number of connections currently in use."""
+        return self.get_pool_statistic('checkedout')
+
+    @property
+    def checked_in(self):
+        """The number of connections currently idle in the pool."""
+        return self.get_pool_statistic('checkedin')
+
+    @property
+    def overflow(self):
+        """The number of connections currently open in excess of `size` (negative while fewer than `size` are open)."""
+        return self.get_pool_statistic('overflow')
+
+    @property
+    def mean_wait_seconds(self):
+        """The average time spent waiting for a connection from the pool."""
+        return self.total_wait_seconds/self.waits if self.waits else 0.0
+
+    def __str__(self):
+        return 'size=%s checked_out=%s checked_in=%s overflow=%s checkouts=%s connections_opened=%s mean_wait=%.4fs max_wait=%.4fs' % \
+            (self.size, self.checked_out, self.checked_in, self.overflow, self.checkouts, self.connections_opened, self.mean_wait_seconds, self.max_wait_seconds)
+
+
 class SqlAlchemyControl(ORMControl):
     """An ORMControl for dealing with SQLAlchemy."""
     def __init__(self, echo=False):
         self.echo = echo
         self.engine = None
+        self.read_replica_engine = None
+        self.connection_pool_metrics = None
 
     @contextmanager
     def nested_transaction(self):
@@ -410,7 +578,7 @@ class SqlAlchemyControl(ORMControl):
         config = context.config
         db_api_connection_creator = context.system_control.db_control.get_dbapi_connection_creator()
         
-        create_args = config.sqlalchemy.engine_create_args.copy()
+        create_args = config.sqlalchemy.get_engine_create_args()
         if auto_commit:
             create_args['isolation_level'] = 'AUTOCOMMIT'
             create_args['execution_options'] = {'isolation_level': 'AUTOCOMMIT'}
@@ -419,9 +587,13 @@ class SqlAlchemyControl(ORMControl):
 
         engine = create_engine(config.reahlsystem.connection_uri, **create_args)
         engine.echo = self.echo
-        engine.connect()
+        self.connection_pool_metrics = ConnectionPoolMetrics(engine)
         self.engine = engine
-        Session.configure(bind=self.engine)
+        self.open_pooled_connections(max(1, config.sqlalchemy.connections_opened_on_connect))
+        if config.sqlalchemy.read_replica_connection_uri and not auto_commit:
+            self.read_replica_engine = create_engine(config.sqlalchemy.read_replica_connection_uri, **config.sqlalchemy.get_engine_create_args())
+            self.read_replica_engine.echo = self.echo
+        Session.configure(bind=self.engine, info={'read_replica': self.read_replica_engine})
 
         self.instrument_classes_for(config.reahlsystem.root_egg)
 
@@ -444,6 +616,48 @@ class SqlAlchemyControl(ORMControl):
             except InvalidRequestError:
                 logging.info('skipping declarative instrumentation of %s' % cls)
 
+    def open_pooled_connections(self, number):
+        """Opens `number` connections at once (but no more than the pool keeps open) and returns them to the pool,
+           so that they are ready for use.
+
+           .. versionadded:: 7.1
+        """
+        # Connections in excess of the size of the pool are closed as soon as they are returned to it
+        pool_size = self.connection_pool_metrics.size if self.connection_pool_metrics else None
+        if pool_size and number > pool_size:  # A size of 0 means the pool is not limited
+            logging.getLogger(__name__).warning('Opening only %s connections on connect instead of %s, since the pool keeps only %s open' % (pool_size, number, pool_size))
+            number = pool_size
+        connections = []
+        try:
+            for i in range(number):
+                connections.append(self.engine.connect())
+        finally:
+            for connection in connections:
+                connection.close()
+
+    @contextmanager
+    def read_replica_routing(self):
+        """A context manager for code that only reads from the database: while in effect, queries are sent
+           to the read replica (if `sqlalchemy.read_replica_connection_uri` is configured) instead of to the primary
+           database. Changes are still flushed to the primary, but are not visible to queries sent to the replica.
+
+           .. versionadded:: 7.1
+        """
+        session = Session()
+        previous_routing = session.info.get('route_reads_to_replica', False)
+        session.info['route_reads_to_replica'] = True
+        try:
+            yield
+        finally:
+            session.info['route_reads_to_replica'] = previous_routing
+
+    def get_connection_pool_metrics(self):
+        """Returns the :class:`ConnectionPoolMetrics` of the current Engine (or None if not connected).
+
+           .. versionadded:: 7.1
+        """
+        return self.connection_pool_metrics
+
     @property
     def connected(self):
         return self.engine
@@ -484,6 +698,10 @@ class SqlAlchemyControl(ORMControl):
         assert self.connected
         self.engine.dispose()
         self.engine = None
+        if self.read_replica_engine:
+            self.read_replica_engine.dispose()
+            self.read_replica_engine = None
+        self.connection_pool_metrics = None
         Session.remove()
 
     def commit(self):
@@ -17,13 +17,17 @@
 
 
 from contextlib import contextmanager
+import os.path
 
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Integer, Table, create_engine, text
+from sqlalchemy.orm import registry
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.exc import IntegrityError
 
-from reahl.tofu import Fixture, uses, expected
+from reahl.tofu import Fixture, uses, expected, temp_dir
 from reahl.tofu.pytestsupport import with_fixtures
-from reahl.sqlalchemysupport import SqlAlchemyControl, QueryAsSequence, Session, Base, metadata
+from reahl.sqlalchemysupport import SqlAlchemyControl, QueryAsSequence, Session, Base, metadata, SqlAlchemyConfig, ConnectionPoolMetrics, \
+                                   RoutingSession
 
 from reahl.dev.fixtures import ReahlSystemFixture
 from reahl.sqlalchemysupport_dev.fixtures import SqlAlchemyFixture
@@ -196,3 +200,200 @@ def test_finalise_session_rolls_back_and_clears_session_after_commit_failure(rea
 
         assert not Session.registry.has()
         assert Session.query(fixture.MyObject).count() == 1
+
+
+def test_connection_pool_configuration():
+    """The connection pool is configured via engine_create_args (which pre-pings by default), overridden by those pool_* settings that are set."""
+    config = SqlAlchemyConfig()
+    assert config.get_engine_create_args() == {'pool_pre_ping': True}
+
+    config.pool_pre_ping = False
+    assert config.get_engine_create_args() == {'pool_pre_ping': False}
+
+    config.pool_size = 10
+    config.max_overflow = 5
+    config.pool_recycle = 3600
+    config.pool_use_lifo = True
+    config.engine_create_args = {'pool_size': 20, 'echo_pool': True}
+    assert config.get_engine_create_args() == {'pool_size': 10, 'max_overflow': 5, 'pool_recycle': 3600, 'echo_pool': True,
+                                               'pool_pre_ping': False, 'pool_use_lifo': True}
+
+
+class ConnectionPoolFixture(Fixture):
+    def new_directory(self):
+        return temp_dir()
+
+    def new_engine(self):
+        config = SqlAlchemyConfig()
+        config.pool_size = 3
+        config.max_overflow = 1
+        config.pool_timeout = 1
+        return create_engine('sqlite:///%s' % os.path.join(self.directory.name, 'pool.db'), poolclass=QueuePool, **config.get_engine_create_args())
+
+    def new_metrics(self):
+        return ConnectionPoolMetrics(self.engine)
+
+    def del_engine(self):
+        self.engine.dispose()
+
+
+@with_fixtures(ReahlSystemFixture, ConnectionPoolFixture)
+def test_connection_pool_metrics(reahl_system_fixture, fixture):
+    """The use of the connection pool is measured, also after the pool is recreated."""
+    assert isinstance(reahl_system_fixture.system_control.get_connection_pool_metrics(), ConnectionPoolMetrics)
+
+    metrics = fixture.metrics
+    assert metrics.checkouts == 0
+    assert metrics.size == 3
+
+    connections = [fixture.engine.connect() for i in range(4)]
+    assert metrics.checkouts == 4
+    assert metrics.connections_opened == 4
+    assert metrics.checked_out == 4
+    assert metrics.overflow == 1
+    assert metrics.max_wait_seconds >= metrics.mean_wait_seconds > 0
+
+    for connection in connections:
+        connection.close()
+    assert metrics.checkins == 4
+    assert metrics.checked_out == 0
+    assert metrics.checked_in == 3
+
+    fixture.engine.dispose()
+    fixture.engine.connect().close()
+    assert metrics.checkouts == 5
+    assert metrics.waits == 5
+    assert metrics.connections_opened == 5
+
+
+@with_fixtures(ReahlSystemFixture, ConnectionPoolFixture)
+def test_opening_pooled_connections(reahl_system_fixture, fixture):
+    """Connections can be opened up front, but never more than the pool keeps open (overflow connections would
+       only be closed again when returned to it)."""
+    orm_control = SqlAlchemyControl()
+    orm_control.engine = fixture.engine
+    orm_control.connection_pool_metrics = fixture.metrics
+
+    orm_control.open_pooled_connections(2)
+    assert fixture.metrics.connections_opened == 2
+    assert fixture.metrics.checked_in == 2
+
+    orm_control.open_pooled_connections(10)
+    assert fixture.metrics.connections_opened == 3
+    assert fixture.metrics.checked_out == 0
+    assert fixture.metrics.checked_in == 3
+
+
+class ReplicatedDatabaseFixture(Fixture):
+    def new_directory(self):
+        return temp_dir()
+
+    def new_engines(self):
+        return {name: create_engine('sqlite:///%s' % os.path.join(self.directory.name, '%s.db' % name))
+                for name in ['primary', 'replica']}
+
+    def new_mapper_registry(self):
+        return registry()
+
+    def new_Note(self):
+        class Note:
+            pass
+        self.map_class_to_table(Note, 'note')
+        return Note
+
+    def new_SessionNote(self):
+        class SessionNote:
+            read_from_primary = True
+        self.map_class_to_table(SessionNote, 'sessionnote')
+        return SessionNote
+
+    def map_class_to_table(self, cls, table_name):
+        table = Table(table_name, self.mapper_registry.metadata, Column('id', Integer, primary_key=True), Column('origin', String(20)))
+        self.mapper_registry.map_imperatively(cls, table)
+
+    def new_session(self):
+        self.Note, self.SessionNote  # so that their tables are created
+        for name, engine in self.engines.items():
+            self.mapper_registry.metadata.create_all(engine)
+            with engine.begin() as connection:
+                for table in self.mapper_registry.metadata.tables.values():
+                    connection.execute(table.insert().values(origin=name))
+        return RoutingSession(bind=self.engines['primary'], info={'read_replica': self.engines['replica']})
+
+    def origins_read(self, cls, query_function=lambda query: query):
+        return [i.origin for i in query_function(self.session.query(cls).populate_existing())]
+
+    def notes_with_origin_on(self, engine_name, origin):
+        with self.engines[engine_name].connect() as connection:
+            return connection.execute(self.Note.__table__.select().where(self.Note.__table__.c.origin == origin)).all()
+
+    def del_session(self):
+        self.session.close()
+        for engine in self.engines.values():
+            engine.dispose()
+
+
+@with_fixtures(ReplicatedDatabaseFixture)
+def test_read_replica_routing(fixture):
+    """While routing to a read replica is switched on, reads go to the read replica, but writes, locking reads
+       and reads of classes marked read_from_primary are sent to the primary database."""
+
+    assert fixture.origins_read(fixture.Note) == ['primary']
+
+    fixture.session.info['route_reads_to_replica'] = True
+    assert fixture.origins_read(fixture.Note) == ['replica']
+    assert fixture.origins_read(fixture.Note, lambda query: query.with_for_update()) == ['primary']
+    assert fixture.origins_read(fixture.SessionNote) == ['primary']
+
+    note = fixture.Note()
+    note.origin = 'written'
+    fixture.session.add(note)
+    fixture.session.commit()
+    assert fixture.notes_with_origin_on('primary', 'written')
+    assert not fixture.notes_with_origin_on('replica', 'written')
+
+
+@with_fixtures(ReplicatedDatabaseFixture)
+def test_read_replica_routing_after_writes(fixture):
+    """Anything but a SELECT is sent to the primary database. Once something is written in a transaction,
+       the rest of that transaction reads from the primary database, unless only objects of classes marked
+       read_from_primary were written."""
+
+    fixture.session.info['route_reads_to_replica'] = True
+
+    # Connections handed out may be used to write
+    assert fixture.session.connection().engine is fixture.engines['primary']
+    fixture.session.rollback()
+    assert fixture.origins_read(fixture.Note) == ['replica']
+
+    # Writing objects that are always read from the primary does not stop reads going to the replica
+    session_note = fixture.SessionNote()
+    session_note.origin = 'session'
+    fixture.session.add(session_note)
+    fixture.session.flush()
+    assert fixture.origins_read(fixture.Note) == ['replica']
+
+    # Textual SQL is sent to the primary, and later reads see its effects
+    fixture.session.execute(text("UPDATE note SET origin = 'updated'"))
+    assert fixture.origins_read(fixture.Note) == ['updated']
+    fixture.session.commit()
+    assert fixture.notes_with_origin_on('primary', 'updated')
+    assert not fixture.notes_with_origin_on('replica', 'updated')
+
+    # A new transaction reads from the replica again, until something is flushed
+    assert fixture.origins_read(fixture.Note) == ['replica']
+    note = fixture.Note()
+    note.origin = 'written'
+    fixture.session.add(note)
+    assert sorted(fixture.origins_read(fixture.Note)) == ['updated', 'written']
+
+
+@with_fixtures(SqlAlchemyFixture)
+def test_switching_on_read_replica_routing(sql_alchemy_fixture):
+    """Read replica routing is switched on for the duration of SqlAlchemyControl.read_replica_routing()."""
+    orm_control = SqlAlchemyControl()
+
+    assert not Session().info.get('route_reads_to_replica')
+    with orm_control.read_replica_routing():
+        assert Session().info['route_reads_to_replica']
+    assert not Session().info.get('route_reads_to_replica')
@@ -20,24 +20,37 @@ Run 'reahl componentinfo reahl-web-declarative' for configuration information.
 
 """
 
-import random
-import hmac
+import base64
+import functools
 import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import pickle
+import random
+import sqlite3
+import tempfile
+import threading
+import time
 import urllib.parse
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 from sqlalchemy import Column, Integer, BigInteger, LargeBinary, PickleType, String, UnicodeText, ForeignKey, DateTime
-from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.orm import relationship, deferred, with_polymorphic, Session as SqlAlchemySession
 from sqlalchemy import event
 from sqlalchemy.inspection import inspect
 
 from reahl.sqlalchemysupport import Session, Base
 from reahl.component.eggs import ReahlEgg
-from reahl.component.config import Configuration
-from reahl.component.context import ExecutionContext
+from reahl.component.config import Configuration, ConfigSetting, ConfigurationException
+from reahl.component.context import ExecutionContext, NoContextFound
 from reahl.web.interfaces import UserSessionProtocol, UserInputProtocol, PersistedExceptionProtocol, PersistedFileProtocol
 from reahl.web.csrf import CSRFToken
 from reahl.web.fw import Url
+from reahl.web.uploads import PartialUpload
 
 class InvalidKeyException(Exception):
     pass
@@ -46,6 +59,7 @@ class UserSession(Base, UserSessionProtocol):
     """An implementation of :class:`reahl.web.interfaces.UserSessionProtocol` of the Reahl framework."""
 
     __tablename__ = 'usersession'
+    read_from_primary = True
 
     id = Column(Integer, primary_key=True)
     discriminator = Column('row_type', String(40))
@@ -61,11 +75,12 @@ class UserSession(Base, UserSessionProtocol):
 
     @classmethod
     def remove_dead_sessions(cls, now=None):
-        now = now or datetime.now()
-        if now.minute > 0 and now.minute < 5:
-            config = ExecutionContext.get_context().config
-            cutoff = now - timedelta(seconds=config.web.session_lifetime)
-            Session.query(cls).filter(cls.last_activity <= cutoff).delete()
+        """Removes a bounded number of dead sessions (see :class:`DeadSessionReaper`).
+
+           .. versionchanged:: 7.1
+              Removes sessions in batches each time it is run, instead of all of them once an hour.
+        """
+        return DeadSessionReaper(session_class=cls).reap(now=now)
 
     @classmethod
     def for_current_session(cls):
@@ -90,9 +105,18 @@ class UserSession(Base, UserSessionProtocol):
         super().__init__(**kwargs)
 
     def get_csrf_token(self):
-        key = ExecutionContext.get_context().config.web.csrf_key
-        message = self.as_key()
-        return CSRFToken(value=hmac.new(key.encode('utf-8'), msg=message.encode('utf-8'), digestmod=hashlib.sha1).hexdigest())
+        # The token is created only once per request; its signed string is then also computed only once
+        context = ExecutionContext.get_context()
+        request = getattr(context, 'request', None)
+        cached_request, cached_token = getattr(self, '_csrf_token_cache', (None, None))
+        if request is not None and cached_request is request:
+            return cached_token
+
+        session_key = self.as_key()
+        legacy_value = CSRFToken.new_hmac(session_key, digestmod=hashlib.sha1).hexdigest() if CSRFToken.accepts_sha1_tokens() else None
+        token = CSRFToken(value=CSRFToken.new_hmac(session_key).hexdigest(), legacy_value=legacy_value)
+        self._csrf_token_cache = (request, token)
+        return token
 
     def is_secured(self):
         context = ExecutionContext.get_context()
@@ -117,16 +141,22 @@ class UserSession(Base, UserSessionProtocol):
     def from_key(cls, key):
         try:
             web_session_id, salt = key.split(':')
+            web_session_id = int(web_session_id)
         except ValueError:
             raise InvalidKeyException()
-        sessions = Session.query(cls).filter_by(id=web_session_id)
-        if sessions.count() == 1 and sessions.one().salt == salt:
-            return sessions.one()
+        web_session = Session.get(cls, web_session_id)
+        if web_session is not None and hmac.compare_digest(web_session.salt.encode('utf-8'), salt.encode('utf-8')):
+            return web_session
         raise InvalidKeyException()
 
     def as_key(self):
-        Session.flush() # To make sure .id is populated
-        return '%s:%s' % (str(self.id), self.salt)
+        if self.id is None:
+            Session.flush() # To make sure .id is populated
+        return self.key_for(self.id, self.salt)
+
+    @classmethod
+    def key_for(cls, web_session_id, salt):
+        return '%s:%s' % (str(web_session_id), salt)
 
     def secure_cookie_is_valid(self):
         context = ExecutionContext.get_context()
@@ -163,12 +193,19 @@ class UserSession(Base, UserSessionProtocol):
 
     def set_session_key(self, response):
         context = ExecutionContext.get_context()
+        if getattr(context, 'session_data_views_to_save', None):
+            StoredSessionData.save_pending()
         session_cookie = self.as_key()
         response.set_cookie(context.config.web.session_key_name, urllib.parse.quote(session_cookie), path='/', samesite='Strict')
         if self.is_secured():
             response.set_cookie(context.config.web.secure_key_name, urllib.parse.quote(self.secure_salt), secure=True, path='/',
                                 max_age=context.config.web.idle_secure_lifetime, samesite='Strict')
 
+    @classmethod
+    def after_commit(cls, context, response):
+        if getattr(context, 'session_data_writes', None):
+            StoredSessionData.write_saved(context, response)
+
     def generate_salt(self):
         alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZqwertyuiopasdfghjklzxcvbnm0123456789'
         self.salt = ''.join([random.choice(alphabet) for x in list(range(40))])
@@ -189,8 +226,131 @@ class UserSession(Base, UserSessionProtocol):
             
 
 
+class ReapResult:
+    """What a :class:`DeadSessionReaper` did during one call to :meth:`DeadSessionReaper.reap`.
+
+       .. versionadded:: 7.1
+    """
+    def __init__(self, reaped, batches, seconds):
+        self.reaped = reaped    #: The number of sessions removed.
+        self.batches = batches  #: The number of batches in which they were removed.
+        self.seconds = seconds  #: How long it took.
+
+    def __str__(self):
+        return 'reaped %s dead sessions in %s batches (%.3fs)' % (self.reaped, self.batches, self.seconds)
+
+
+class DeadSessionReaper:
+    """Removes UserSessions (and all that belongs to them) that have not been active for longer than
+       `web.session_lifetime`.
+
+       Sessions are removed in batches of at most `batch_size`. If no database transaction is in progress
+       when :meth:`reap` is called, each batch is committed in its own short transaction. Otherwise (as when
+       run via `reahl runjobs`) all batches are part of the current transaction, and at most `max_batches`
+       are removed per call.
+
+       What the removed sessions kept in a :class:`SessionDataStore` (and the files it refers to) is removed
+       along with each batch. Files that were abandoned while being uploaded in chunks are removed too.
+
+       :keyword batch_size: The maximum number of sessions removed at once.
+       :keyword max_batches: The maximum number of batches removed per call to :meth:`reap` (None means no limit).
+       :keyword session_class: The class of UserSession to remove.
+
+       .. versionadded:: 7.1
+    """
+    def __init__(self, batch_size=500, max_batches=20, session_class=None):
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.session_class = session_class or UserSession
+
+    def get_cutoff(self, now):
+        config = ExecutionContext.get_context().config
+        return now - timedelta(seconds=config.web.session_lifetime)
+
+    def reap_batch(self, cutoff):
+        """Removes one batch of dead sessions, returning their keys."""
+        session_class = self.session_class
+        dead = Session.query(session_class.id, session_class.salt).filter(session_class.last_activity <= cutoff)\
+                                                                  .order_by(session_class.id).limit(self.batch_size).all()
+        if dead:
+            Session.query(session_class).filter(session_class.id.in_([i for (i, salt) in dead])).delete()
+        return [session_class.key_for(i, salt) for (i, salt) in dead]
+
+    def remove_stored_data_of(self, session_keys, cutoff):
+        config = ExecutionContext.get_context().config
+        session_data_store = getattr(config.web, 'webdeclarative', None) and config.web.webdeclarative.session_data_store
+        if not (session_data_store and session_keys):
+            return
+        removed = session_data_store.remove_all_for(session_keys)
+        file_store = StoredPersistedFile.get_file_store()
+        if file_store:
+            # The same contents may be kept for sessions that live on
+            content_hashes = {i.content_hash for i in removed if getattr(i, 'content_hash', None)}
+            content_hashes -= session_data_store.content_hashes_in_use(content_hashes)
+            file_store.remove_unless_added_since(content_hashes, cutoff)
+
+    def reap(self, now=None):
+        """Removes dead sessions, batch by batch, until none are left or `max_batches` is reached.
+           Returns a :class:`ReapResult`.
+        """
+        started = time.monotonic()
+        cutoff = self.get_cutoff(now or datetime.now())
+        commit_each_batch = not Session().in_transaction()
+
+        reaped = batches = 0
+        while self.max_batches is None or batches < self.max_batches:
+            if commit_each_batch:
+                with Session().begin():
+                    reaped_keys = self.reap_batch(cutoff)
+            else:
+                reaped_keys = self.reap_batch(cutoff)
+            self.remove_stored_data_of(reaped_keys, cutoff)
+            reaped += len(reaped_keys)
+            if not reaped_keys:
+                break
+            batches += 1
+            if len(reaped_keys) < self.batch_size:
+                break
+        PartialUpload.remove_stale(cutoff)
+
+        result = ReapResult(reaped, batches, time.monotonic()-started)
+        logging.getLogger(__name__).info(str(result))
+        return result
+
+    def run_continuously(self, context, stop_event, interval_seconds=60):
+        """Keeps on reaping dead sessions until `stop_event` is set. Intended to be the target of a
+           background :class:`threading.Thread`.
+
+           Batches follow each other immediately while a backlog of dead sessions remains; otherwise
+           it waits `interval_seconds` between calls to :meth:`reap`.
+
+           :param context: The :class:`~reahl.component.context.ExecutionContext` whose `config` and
+                           (connected) `system_control` to use.
+           :param stop_event: A :class:`threading.Event` which is set to stop reaping.
+           :keyword interval_seconds: How long to wait when there is nothing left to reap.
+        """
+        reaper_context = ExecutionContext(name='DeadSessionReaper')
+        reaper_context.id = id(reaper_context) # Never that of a context it may be started from: it needs a database Session of its own
+        reaper_context.config = context.config
+        reaper_context.system_control = context.system_control
+        with reaper_context:
+            try:
+                while not stop_event.is_set():
+                    try:
+                        result = self.reap()
+                        has_backlog = self.max_batches is not None and result.batches == self.max_batches
+                    except Exception as ex:
+                        logging.getLogger(__name__).exception(ex)
+                        has_backlog = False
+                    if not has_backlog:
+                        stop_event.wait(interval_seconds)
+            finally:
+                Session.remove()
+
+
 class SessionData(Base):
     __tablename__ = 'sessiondata'
+    read_from_primary = True  # Written by a POST and read by the GET that follows it
 
     id = Column(Integer, primary_key=True)
     discriminator = Column('row_type', String(40))
@@ -211,32 +371,20 @@ class SessionData(Base):
 
     @classmethod
     def clear_for_form(cls, form):
-        for stale in cls.find_for_cached(form.view, form=form):
-            cls.delete_cached(form.view, stale)
+        cls.delete_all_cached(form.view, cls.find_for_cached(form.view, form=form))
 
     @classmethod
     def clear_for_view(cls, view):
-        for stale in cls.find_for_cached(view, form=None):
-            cls.delete_cached(view, stale)
+        cls.delete_all_cached(view, cls.find_for_cached(view, form=None))
 
     @classmethod
     def clear_all_view_data(cls, view):
-        web_session = ExecutionContext.get_context().session
-        items = Session.query(cls).filter_by(web_session=web_session, view_path=view.full_path, ui_name=view.user_interface.name)
-        for stale in items:
-            cls.delete_cached(view, stale)
+        cls.delete_all_cached(view, cls.find_all_cached(view))
 
     @classmethod
     def find_all_cached(cls, view):
         if view.cached_session_data is None:
-
-            @event.listens_for(Session(), 'after_soft_rollback')
-            def clear_cache(session, previous_transaction):
-                view.cached_session_data = None
-
-            web_session = ExecutionContext.get_context().session
-            query = Session.query(SessionData).filter_by(web_session=web_session, view_path=view.full_path, ui_name=view.user_interface.name)
-            view.cached_session_data = query.all()
+            view.cached_session_data = SessionDataCache.for_current_request().get_data_for(view)
 
         return [i for i in view.cached_session_data if isinstance(i, cls)]
 
@@ -257,12 +405,53 @@ class SessionData(Base):
         view.cached_session_data.append(instance)
         return instance
 
+    @classmethod
+    def save_all_for_cached(cls, view, form=None, all_kwargs=None):
+        """Creates an instance for each dictionary of keyword arguments in `all_kwargs`, adding them all
+           to the Session at once so that they are flushed together.
+
+           .. versionadded:: 7.1
+        """
+        assert (not form) or (form.view is view)
+        channel_name = form.channel_name if form else None
+        web_session = ExecutionContext.get_context().session
+        instances = [cls(web_session=web_session, view_path=view.full_path, ui_name=view.user_interface.name, channel_name=channel_name, **kwargs)
+                     for kwargs in all_kwargs or []]
+        Session.add_all(instances)
+        view.cached_session_data.extend(instances)
+        return instances
+
     @classmethod
     def delete_cached(cls, view, instance):
         if inspect(instance).persistent:
             Session.delete(instance)
         view.cached_session_data.remove(instance)
 
+    @classmethod
+    def delete_all_cached(cls, view, instances):
+        """Deletes all of the given `instances` using a single DELETE statement per table, instead of one per instance.
+           The deleted instances are removed from the Session as well.
+
+           .. versionadded:: 7.1
+        """
+        instances = list(instances)
+        if not instances:
+            return
+        for instance in instances:
+            view.cached_session_data.remove(instance)
+
+        persisted = [i for i in instances if inspect(i).persistent]
+        for instance in instances:
+            if inspect(instance).persistent or inspect(instance).pending:
+                Session.expunge(instance)
+
+        if persisted:
+            ids = [i.id for i in persisted]
+            base_table = SessionData.__table__
+            tables = {table for i in persisted for table in inspect(i).mapper.tables if table is not base_table}
+            for table in sorted(tables, key=lambda t: t.name)+[base_table]:
+                Session.execute(table.delete().where(table.c.id.in_(ids)))
+
     __hash__ = None
     def __eq__(self, other):
         return isinstance(other, self.__class__) and \
@@ -274,22 +463,53 @@ class SessionData(Base):
         return not self.__eq__(other)
 
 
-class UserInput(SessionData, UserInputProtocol):
-    """An implementation of :class:`reahl.web.interfaces.UserInputProtocol`. It represents
-       a value that was input by a user."""
-    __tablename__ = 'userinput'
-    __mapper_args__ = {'polymorphic_identity': 'userinput'}
-    id = Column(Integer, ForeignKey('sessiondata.id', ondelete='CASCADE'), primary_key=True)
+class SessionDataCache:
+    """All the :class:`SessionData` of the current UserSession, loaded with a single query the first time
+       any View needs it during a request, and then shared by all Views.
 
-    key = Column(UnicodeText, nullable=False)
-    value = Column(UnicodeText, nullable=True)
-
-    __hash__ = None
-    def __eq__(self, other):
-        return super().__eq__(other) and \
-               self.key == other.key and \
-               self.value == other.value
+       The cache is discarded when the database transaction is rolled back.
 
+       .. versionadded:: 7.1
+    """
+    @classmethod
+    def for_current_request(cls):
+        context = ExecutionContext.get_context()
+        cache = getattr(context, 'session_data_cache', None)
+        if cache is None or cache.web_session is not context.session:
+            cache = context.session_data_cache = cls(context.session)
+        return cache
+
+    def __init__(self, web_session):
+        self.web_session = web_session
+        self.session_data = None  # (ui_name, view_path) -> [SessionData]
+        self.views = {}
+
+    def load(self):
+        self.session_data = {}
+        if inspect(self.web_session).persistent:
+            all_session_data = with_polymorphic(SessionData, '*')
+            for i in Session.query(all_session_data).filter(all_session_data.web_session_id == self.web_session.id):
+                self.session_data.setdefault((i.ui_name, i.view_path), []).append(i)
+
+    def get_data_for(self, view):
+        if self.session_data is None:
+            self.load()
+        self.views[id(view)] = view
+        return self.session_data.setdefault((view.user_interface.name, view.full_path), [])
+
+    def invalidate(self):
+        for view in self.views.values():
+            view.cached_session_data = None
+        self.views.clear()
+        self.session_data = None
+
+
+class UserInputBehaviour(UserInputProtocol):
+    """The behaviour of :class:`UserInput` and :class:`StoredUserInput`, implemented in terms of the methods of
+       :class:`SessionData` (or :class:`StoredSessionData`).
+
+       .. versionadded:: 7.1
+    """
     @classmethod
     def get_previously_entered_for_form(cls, form, input_name, entered_input_type):
         return cls.get_previously_saved_for(form.view, form, input_name, entered_input_type)
@@ -316,19 +536,14 @@ class UserInput(SessionData, UserInputProtocol):
 
     @classmethod
     def save_value_for(cls, view, form, key, value, value_type):
-        for i in [e for e in cls.find_for_cached(view, form=form) if e.key == key]:
-            cls.delete_cached(view, i)
+        cls.delete_all_cached(view, [e for e in cls.find_for_cached(view, form=form) if e.key == key])
 
         if value_type is str:
             assert isinstance(value, str), 'Cannot handle the value: ' + str(value)
             cls.save_for_cached(view, form=form, key=key, value=value)
         elif value_type is list:
             assert all([isinstance(i, str) for i in value]), 'Cannot handle the value: ' + str(value)
-            if value:
-                for i in value:
-                    cls.save_for_cached(view, form=form, key=key, value=i)
-            else:
-                cls.save_for_cached(view, form=form, key=key, value=None)
+            cls.save_all_for_cached(view, form=form, all_kwargs=[dict(key=key, value=i) for i in value or [None]])
         else:
             assert None, 'Cannot persist values of type: %s' % value_type
 
@@ -342,40 +557,46 @@ class UserInput(SessionData, UserInputProtocol):
 
     @classmethod
     def remove_persisted_for_view(cls, view, key):
-        for previous in [i for i in cls.find_for_cached(view, form=None) if i.key == key]:
-            cls.delete_cached(view, previous)
+        cls.delete_all_cached(view, [i for i in cls.find_for_cached(view, form=None) if i.key == key])
 
-class PersistedException(SessionData, PersistedExceptionProtocol):
-    """An implementation of :class:`reahl.web.interfaces.PersistedExceptionProtocol`. It represents
-       an Exception that was raised upon a user interaction."""
-    __tablename__ = 'persistedexception'
-    __mapper_args__ = {'polymorphic_identity': 'persistedexception'}
+
+class UserInput(SessionData, UserInputBehaviour):
+    """An implementation of :class:`reahl.web.interfaces.UserInputProtocol`. It represents
+       a value that was input by a user."""
+    __tablename__ = 'userinput'
+    __mapper_args__ = {'polymorphic_identity': 'userinput'}
     id = Column(Integer, ForeignKey('sessiondata.id', ondelete='CASCADE'), primary_key=True)
 
-    exception = Column(PickleType, nullable=False)
-    input_name = Column(UnicodeText)
+    key = Column(UnicodeText, nullable=False)
+    value = Column(UnicodeText, nullable=True)
 
+    __hash__ = None
     def __eq__(self, other):
         return super().__eq__(other) and \
-               self.exception == other.exception
+               self.key == other.key and \
+               self.value == other.value
+
 
+class PersistedExceptionBehaviour(PersistedExceptionProtocol):
+    """The behaviour of :class:`PersistedException` and :class:`StoredPersistedException`.
+
+       .. versionadded:: 7.1
+    """
     @classmethod
     def save_exception_for_form(cls, form, **kwargs):
         return cls.save_for_cached(form.view, form=form, **kwargs)
 
     @classmethod
     def for_input(cls, form, input_name):
-        return [i for i in super().find_for_cached(form.view, form=form) if i.input_name == input_name]
+        return [i for i in cls.find_for_cached(form.view, form=form) if i.input_name == input_name]
 
     @classmethod
     def clear_for_form_except_inputs(cls, form):
-        for stale in cls.for_input(form, None):
-            cls.delete_cached(form.view, stale)
+        cls.delete_all_cached(form.view, cls.for_input(form, None))
 
     @classmethod
     def clear_for_all_inputs(cls, form):
-        for e in [i for i in super().find_for_cached(form.view, form=form) if i.input_name is not None]:
-            cls.delete_cached(form.view, e)
+        cls.delete_all_cached(form.view, [i for i in cls.find_for_cached(form.view, form=form) if i.input_name is not None])
 
     @classmethod
     def get_exception_for_form(cls, form):
@@ -392,37 +613,43 @@ class PersistedException(SessionData, PersistedExceptionProtocol):
         return None
 
 
-class PersistedFile(SessionData, PersistedFileProtocol):
-    """An implementation of :class:`reahl.web.interfaces.PersistedFileProtocol`. It represents
-       a file that was input by a user."""
-    __tablename__ = 'persistedfile'
-    __mapper_args__ = {'polymorphic_identity': 'persistedfile'}
+class PersistedException(SessionData, PersistedExceptionBehaviour):
+    """An implementation of :class:`reahl.web.interfaces.PersistedExceptionProtocol`. It represents
+       an Exception that was raised upon a user interaction."""
+    __tablename__ = 'persistedexception'
+    __mapper_args__ = {'polymorphic_identity': 'persistedexception'}
     id = Column(Integer, ForeignKey('sessiondata.id', ondelete='CASCADE'), primary_key=True)
 
-    input_name = Column(UnicodeText, nullable=False)
-    filename = Column(UnicodeText, nullable=False)
-    file_data = deferred(Column(LargeBinary, nullable=False)) 
-    mime_type = Column(UnicodeText, nullable=False)
-    size = Column(BigInteger, nullable=False)
+    exception = Column(PickleType, nullable=False)
+    input_name = Column(UnicodeText)
 
     def __eq__(self, other):
         return super().__eq__(other) and \
-               self.filename == other.filename and \
-               self.input_name == other.input_name
+               self.exception == other.exception
 
+
+class PersistedFileBehaviour(PersistedFileProtocol):
+    """The behaviour of :class:`PersistedFile` and :class:`StoredPersistedFile`.
+
+       .. versionadded:: 7.1
+    """
     @property
     def file_obj(self):
         class LazyFileObj:
             def __init__(self, persisted_file):
                 self.persisted_file = persisted_file
-                self.position = 0
-            def read(self):
-                try:
-                    return self.persisted_file.file_data[self.position:]
-                finally:
-                    self.position = len(self.persisted_file.file_data)-1
-            def seek(self, position):
-                self.position = position
+                self.loaded = None
+            @property
+            def stream(self):
+                if self.loaded is None:
+                    self.loaded = io.BytesIO(self.persisted_file.file_data) # Shares the bytes (does not copy them) until written to
+                return self.loaded
+            def read(self, size=-1):
+                return self.stream.read(size)
+            def seek(self, position, whence=io.SEEK_SET):
+                return self.stream.seek(position, whence)
+            def tell(self):
+                return self.stream.tell()
         return LazyFileObj(self)
 
     @classmethod
@@ -432,7 +659,7 @@ class PersistedFile(SessionData, PersistedFileProtocol):
     @classmethod
     def add_persisted_for_form(cls, form, input_name, uploaded_file):
         filename = uploaded_file.filename
-        file_data = uploaded_file.contents
+        file_data = uploaded_file.contents # The whole file, in memory: only a ContentAddressedFileStore streams it
         mime_type = uploaded_file.mime_type
         size = uploaded_file.size
         return cls.save_for_cached(form.view, form=form, input_name=input_name, filename=filename, file_data=file_data,
@@ -440,23 +667,584 @@ class PersistedFile(SessionData, PersistedFileProtocol):
 
     @classmethod
     def remove_persisted_for_form(cls, form, input_name, filename):
-        persisted = [i for i in cls.find_for_cached(form.view, form=form) if i.input_name == input_name and i.filename == filename]
-        for persisted_file in persisted:
-            cls.delete_cached(form.view, persisted_file)
+        cls.delete_all_cached(form.view, [i for i in cls.find_for_cached(form.view, form=form) if i.input_name == input_name and i.filename == filename])
 
     @classmethod
     def is_uploaded_for_form(cls, form, input_name, filename):
-        return len([i for i in PersistedFile.find_for_cached(form.view, form=form) if i.input_name == input_name and i.filename == filename]) == 1
+        return len([i for i in cls.find_for_cached(form.view, form=form) if i.input_name == input_name and i.filename == filename]) == 1
+
+
+class PersistedFile(SessionData, PersistedFileBehaviour):
+    """An implementation of :class:`reahl.web.interfaces.PersistedFileProtocol`. It represents
+       a file that was input by a user.
+
+       The contents of the file are kept in a single database column, hence the whole file is read into
+       memory when it is persisted. To avoid that for large files, set `web.webdeclarative.session_data_store`
+       and `web.webdeclarative.file_store_directory` (see :class:`StoredPersistedFile`).
+    """
+    __tablename__ = 'persistedfile'
+    __mapper_args__ = {'polymorphic_identity': 'persistedfile'}
+    id = Column(Integer, ForeignKey('sessiondata.id', ondelete='CASCADE'), primary_key=True)
+
+    input_name = Column(UnicodeText, nullable=False)
+    filename = Column(UnicodeText, nullable=False)
+    file_data = deferred(Column(LargeBinary, nullable=False)) 
+    mime_type = Column(UnicodeText, nullable=False)
+    size = Column(BigInteger, nullable=False)
+
+    def __eq__(self, other):
+        return super().__eq__(other) and \
+               self.filename == other.filename and \
+               self.input_name == other.input_name
     
 
+class SessionDataStore:
+    """Where :class:`StoredSessionData` is kept, instead of in the database.
+
+       A SessionDataStore keeps the list of StoredSessionData of each View, keyed by a string. Subclasses
+       implement the reading and writing of these; the request or response of the current interaction is
+       passed along for stores that keep (some of) their data with the browser.
+
+       .. versionadded:: 7.1
+    """
+    keeps_data_with_browser = False
+
+    def read(self, key, request):
+        """Returns the list of StoredSessionData stored for `key`, or None if nothing (valid) was stored."""
+        raise NotImplementedError()
+
+    def write(self, key, session_data, response):
+        """Stores the list of StoredSessionData in `session_data` for `key`."""
+        raise NotImplementedError()
+
+    def remove(self, key, response):
+        """Removes anything stored for `key`."""
+        raise NotImplementedError()
+
+    def remove_all_for(self, session_keys):
+        """Removes everything stored for the UserSessions with the given keys (the key of anything stored for a
+           UserSession starts with the key of that UserSession, followed by a ':'). Returns the list of
+           StoredSessionData removed, as far as it is known.
+        """
+        raise NotImplementedError()
+
+    def content_hashes_in_use(self, content_hashes):
+        """Returns the set of those `content_hashes` to which StoredSessionData that is still kept refers."""
+        raise NotImplementedError()
+
+
+class SqliteSessionDataStore(SessionDataStore):
+    """A :class:`SessionDataStore` that keeps data in an SQLite database file (in WAL mode), separate
+       from the database of the application.
+
+       :param path: The path of the SQLite database file.
+       :keyword timeout: How long (in seconds) to wait for a lock held by another process.
+
+       .. versionadded:: 7.1
+    """
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self.connections = threading.local()
+
+    @property
+    def connection(self):
+        # A connection may not be shared between threads, nor survive a fork
+        if getattr(self.connections, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS session_data (key TEXT PRIMARY KEY, value BLOB NOT NULL)')
+            # Which contents in a ContentAddressedFileStore (possibly shared by several sessions) each key refers to
+            connection.execute('CREATE TABLE IF NOT EXISTS content_reference (key TEXT NOT NULL, content_hash TEXT NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS content_reference_key ON content_reference (key)')
+            connection.execute('CREATE INDEX IF NOT EXISTS content_reference_hash ON content_reference (content_hash)')
+            self.connections.connection = connection
+            self.connections.pid = os.getpid()
+        return self.connections.connection
+
+    def read(self, key, request):
+        row = self.connection.execute('SELECT value FROM session_data WHERE key = ?', (key,)).fetchone()
+        return pickle.loads(row[0]) if row else None # Kept on the server only, as PickleType columns are in the database
+
+    @contextmanager
+    def transaction(self):
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def write(self, key, session_data, response):
+        content_hashes = {i.content_hash for i in session_data if getattr(i, 'content_hash', None)}
+        with self.transaction() as connection:
+            connection.execute('INSERT OR REPLACE INTO session_data (key, value) VALUES (?, ?)', (key, pickle.dumps(session_data)))
+            connection.execute('DELETE FROM content_reference WHERE key = ?', (key,))
+            connection.executemany('INSERT INTO content_reference (key, content_hash) VALUES (?, ?)',
+                                   [(key, content_hash) for content_hash in content_hashes])
+
+    def remove(self, key, response):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM session_data WHERE key = ?', (key,))
+            connection.execute('DELETE FROM content_reference WHERE key = ?', (key,))
+
+    def remove_all_for(self, session_keys):
+        removed = []
+        with self.transaction() as connection:
+            for session_key in session_keys:
+                # All keys starting with 'session_key:' sort before 'session_key;'
+                key_range = ('%s:' % session_key, '%s;' % session_key)
+                for (value,) in connection.execute('SELECT value FROM session_data WHERE key >= ? AND key < ?', key_range).fetchall():
+                    removed.extend(pickle.loads(value))
+                connection.execute('DELETE FROM session_data WHERE key >= ? AND key < ?', key_range)
+                connection.execute('DELETE FROM content_reference WHERE key >= ? AND key < ?', key_range)
+        return removed
+
+    def content_hashes_in_use(self, content_hashes):
+        in_use = set()
+        for content_hash in set(content_hashes):
+            if self.connection.execute('SELECT 1 FROM content_reference WHERE content_hash = ? LIMIT 1', (content_hash,)).fetchone():
+                in_use.add(content_hash)
+        return in_use
+
+
+class SignedCookieSessionDataStore(SessionDataStore):
+    """A :class:`SessionDataStore` that keeps user input in cookies on the browser, as JSON signed with
+       `web.csrf_key` so that it cannot be tampered with. (It can, however, be read by the user.)
+
+       Only input the user is allowed to see is put in cookies. Everything else (such as exceptions, files
+       and passwords), as well as input that does not fit in a cookie, is kept in `server_side_store`.
+
+       :param server_side_store: The :class:`SessionDataStore` in which to keep what is not kept in cookies.
+       :keyword max_cookie_size: The maximum size (in bytes) of a single cookie value.
+       :keyword max_cookies: The maximum number of cookies used for session data.
+
+       .. versionadded:: 7.1
+    """
+    keeps_data_with_browser = True
+    cookie_prefix = 'reahl-sd-'
+
+    def __init__(self, server_side_store, max_cookie_size=4000, max_cookies=20):
+        self.server_side_store = server_side_store
+        self.max_cookie_size = max_cookie_size
+        self.max_cookies = max_cookies
+
+    def cookie_name_for(self, key):
+        return '%s%s' % (self.cookie_prefix, hashlib.sha256(key.encode('utf-8')).hexdigest()[:24])
+
+    def signature_for(self, key, encoded_value):
+        csrf_key = ExecutionContext.get_context().config.web.csrf_key
+        return hmac.new(csrf_key.encode('utf-8'), ('%s.%s' % (key, encoded_value)).encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def encode(self, key, session_data):
+        values = [[i.view_path, i.ui_name, i.channel_name, i.key, i.value] for i in session_data]
+        encoded_value = base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return '%s.%s' % (encoded_value, self.signature_for(key, encoded_value))
+
+    def decode(self, key, cookie_value):
+        encoded_value, _, signature = cookie_value.rpartition('.')
+        if not hmac.compare_digest(signature, self.signature_for(key, encoded_value)):
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded_value.encode('ascii')))
+            return [StoredUserInput(view_path=view_path, ui_name=ui_name, channel_name=channel_name, key=input_key, value=value)
+                    for view_path, ui_name, channel_name, input_key, value in values]
+        except (ValueError, TypeError):
+            return None
+
+    def read(self, key, request):
+        cookie_value = request.cookies.get(self.cookie_name_for(key))
+        in_cookie = self.decode(key, cookie_value) if cookie_value else None
+        on_server = self.server_side_store.read(key, request)
+        if in_cookie is None and on_server is None:
+            return None
+        return (in_cookie or []) + (on_server or [])
+
+    def has_room_for(self, cookie_name, cookie_value):
+        request = ExecutionContext.get_context().request
+        other_cookies = [name for name in request.cookies if name.startswith(self.cookie_prefix) and name != cookie_name]
+        return len(cookie_value) <= self.max_cookie_size and len(other_cookies) < self.max_cookies
+
+    def remove_cookie(self, cookie_name, response):
+        if cookie_name in ExecutionContext.get_context().request.cookies:
+            response.delete_cookie(cookie_name, path='/')
+
+    def write(self, key, session_data, response):
+        cookie_name = self.cookie_name_for(key)
+        in_cookie = [i for i in session_data if i.may_be_kept_with_browser]
+        cookie_value = self.encode(key, in_cookie) if in_cookie else None
+        if cookie_value and not self.has_room_for(cookie_name, cookie_value):
+            logging.getLogger(__name__).debug('Keeping session data for %s on the server: it does not fit in a cookie' % key)
+            cookie_value = None
+
+        if cookie_value:
+            max_age = ExecutionContext.get_context().config.web.idle_lifetime_max
+            response.set_cookie(cookie_name, cookie_value, path='/', max_age=max_age, samesite='Strict', httponly=True)
+            on_server = [i for i in session_data if not i.may_be_kept_with_browser]
+        else:
+            self.remove_cookie(cookie_name, response)
+            on_server = session_data
+
+        if on_server:
+            self.server_side_store.write(key, on_server, response)
+        else:
+            self.server_side_store.remove(key, response)
+
+    def remove(self, key, response):
+        self.remove_cookie(self.cookie_name_for(key), response)
+        self.server_side_store.remove(key, response)
+
+    def remove_all_for(self, session_keys):
+        # Cookies expire on the browser by themselves
+        return self.server_side_store.remove_all_for(session_keys)
+
+    def content_hashes_in_use(self, content_hashes):
+        return self.server_side_store.content_hashes_in_use(content_hashes) # Files are never kept in cookies
+
+
+class ContentAddressedFileStore:
+    """Keeps the contents of files in a directory, each under the name of its SHA256 hash. Contents are
+       copied into it in chunks, so a file never needs to be in memory as a whole.
+
+       :param directory: The directory in which to keep files.
+
+       .. versionadded:: 7.1
+    """
+    chunk_size = 64*1024
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, content_hash):
+        return os.path.join(self.directory, content_hash[:2], content_hash)
+
+    def add(self, file_obj):
+        """Copies the contents of the binary file-like object `file_obj` into the store, returning its hash."""
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.incoming-')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                for chunk in iter(functools.partial(file_obj.read, self.chunk_size), b''):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            content_hash = digest.hexdigest()
+            path = self.path_for(content_hash)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path) # Also refreshes the modification time of contents already there
+        except:
+            os.remove(temp_path)
+            raise
+        return content_hash
+
+    def open(self, content_hash):
+        """Returns the contents stored under `content_hash`, as a :class:`StoredContents`."""
+        return StoredContents(self.path_for(content_hash))
+
+    def remove_unless_added_since(self, content_hashes, cutoff):
+        """Removes the contents stored under each of `content_hashes`, except those added (again) after the
+           datetime `cutoff`, since the same contents may also have been added for another session since.
+
+           The caller should only pass `content_hashes` that are not referred to by anything still kept.
+        """
+        cutoff_timestamp = cutoff.timestamp()
+        for content_hash in set(content_hashes):
+            path = self.path_for(content_hash)
+            try:
+                if os.stat(path).st_mtime <= cutoff_timestamp:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class StoredContents:
+    """The contents of a file in a :class:`ContentAddressedFileStore`, which can be read like a binary file.
+       The file is only open during each call to :meth:`read`, hence it never needs to be closed.
+
+       :param path: The path of the file.
+
+       .. versionadded:: 7.1
+    """
+    def __init__(self, path):
+        self.path = path
+        self.position = 0
+
+    def read(self, size=-1):
+        with open(self.path, 'rb') as contents:
+            contents.seek(self.position)
+            data = contents.read(size)
+        self.position += len(data)
+        return data
+
+    def seek(self, position, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            position += self.position
+        elif whence == io.SEEK_END:
+            position += os.path.getsize(self.path)
+        self.position = position
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class StoredSessionData:
+    """The equivalent of :class:`SessionData` for when `web.webdeclarative.session_data_store` is set.
+
+       All the StoredSessionData of a View is read from the :class:`SessionDataStore` at once, and written
+       back only once the changes made to the database during the request have been committed. Changes made
+       in a transaction that is rolled back are discarded, as they would have been had they been in the database.
+
+       .. versionadded:: 7.1
+    """
+    may_be_kept_with_browser = False
+
+    def __init__(self, view_path=None, ui_name=None, channel_name=None, **kwargs):
+        self.view_path = view_path
+        self.ui_name = ui_name
+        self.channel_name = channel_name
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def get_store(cls):
+        return ExecutionContext.get_context().config.web.webdeclarative.session_data_store
+
+    @classmethod
+    def key_for(cls, view):
+        web_session = ExecutionContext.get_context().session
+        return '%s:%s:%s' % (web_session.as_key(), view.user_interface.name, view.full_path)
+
+    @classmethod
+    def get_views_to_save(cls):
+        context = ExecutionContext.get_context()
+        views_to_save = getattr(context, 'session_data_views_to_save', None)
+        if views_to_save is None:
+            views_to_save = context.session_data_views_to_save = {}
+        return views_to_save
+
+    @classmethod
+    def mark_changed(cls, view):
+        cls.get_views_to_save()[id(view)] = view
+
+    @classmethod
+    def save_pending(cls):
+        context = ExecutionContext.get_context()
+        views_to_save = cls.get_views_to_save()
+        session_data_writes = getattr(context, 'session_data_writes', None) or []
+        for view in views_to_save.values():
+            session_data_writes.append((cls.key_for(view), list(view.cached_session_data or [])))
+        context.session_data_writes = session_data_writes
+        views_to_save.clear()
+
+    @classmethod
+    def write_saved(cls, context, response):
+        store = context.config.web.webdeclarative.session_data_store
+        for key, session_data in context.session_data_writes:
+            if session_data:
+                store.write(key, session_data, response)
+            else:
+                store.remove(key, response)
+        context.session_data_writes = []
+
+    @classmethod
+    def discard_pending(cls):
+        views_to_save = cls.get_views_to_save()
+        for view in views_to_save.values():
+            view.cached_session_data = None
+        views_to_save.clear()
+
+    @classmethod
+    def clear_for_form(cls, form):
+        cls.delete_all_cached(form.view, cls.find_for_cached(form.view, form=form))
+
+    @classmethod
+    def clear_for_view(cls, view):
+        cls.delete_all_cached(view, cls.find_for_cached(view, form=None))
+
+    @classmethod
+    def clear_all_view_data(cls, view):
+        cls.delete_all_cached(view, cls.find_all_cached(view))
+
+    @classmethod
+    def find_all_cached(cls, view):
+        if view.cached_session_data is None:
+            stored = cls.get_store().read(cls.key_for(view), ExecutionContext.get_context().request)
+            view.cached_session_data = stored or []
+        return [i for i in view.cached_session_data if isinstance(i, cls)]
+
+    @classmethod
+    def find_for_cached(cls, view, form=None):
+        assert (not form) or (form.view is view)
+        channel_name = form.channel_name if form else None
+        return [i for i in cls.find_all_cached(view) if i.channel_name == channel_name]
+
+    @classmethod
+    def save_for_cached(cls, view, form=None, **kwargs):
+        assert (not form) or (form.view is view)
+        channel_name = form.channel_name if form else None
+        instance = cls(view_path=view.full_path, ui_name=view.user_interface.name, channel_name=channel_name, **kwargs)
+        cls.find_all_cached(view)
+        view.cached_session_data.append(instance)
+        cls.mark_changed(view)
+        return instance
+
+    @classmethod
+    def save_all_for_cached(cls, view, form=None, all_kwargs=None):
+        return [cls.save_for_cached(view, form=form, **kwargs) for kwargs in all_kwargs or []]
+
+    @classmethod
+    def delete_cached(cls, view, instance):
+        view.cached_session_data.remove(instance)
+        cls.mark_changed(view)
+
+    @classmethod
+    def delete_all_cached(cls, view, instances):
+        for instance in list(instances):
+            cls.delete_cached(view, instance)
+
+    __hash__ = None
+    def __eq__(self, other):
+        return isinstance(other, self.__class__) and \
+               self.ui_name == other.ui_name and \
+               self.channel_name == other.channel_name
+
+    def __neq__(self, other):
+        return not self.__eq__(other)
+
+
+@event.listens_for(SqlAlchemySession, 'after_soft_rollback')
+def invalidate_session_data_caches(session, previous_transaction):
+    # Registered once for all Sessions; only the caches of the current request are affected
+    try:
+        context = ExecutionContext.get_context()
+    except NoContextFound:
+        return
+    session_data_cache = getattr(context, 'session_data_cache', None)
+    if session_data_cache:
+        session_data_cache.invalidate()
+    if getattr(context, 'session_data_views_to_save', None):
+        StoredSessionData.discard_pending()
+
+
+class StoredUserInput(StoredSessionData, UserInputBehaviour):
+    """A :class:`UserInput` kept in a :class:`SessionDataStore`.
+
+       Input the user is not allowed to see (such as a password) is marked as confidential, so that it is never
+       kept with the browser.
+
+       .. versionadded:: 7.1
+    """
+    confidential = False
+
+    @property
+    def may_be_kept_with_browser(self):
+        return not self.confidential
+
+    @classmethod
+    def may_be_seen_by_user(cls, form, input_name):
+        input_widget = getattr(form, 'inputs', {}).get(input_name)
+        return input_widget is not None and input_widget.bound_field.can_read()
+
+    @classmethod
+    def save_input_value_for_form(cls, form, input_name, value, entered_input_type):
+        super().save_input_value_for_form(form, input_name, value, entered_input_type)
+        if not cls.may_be_seen_by_user(form, input_name):
+            for saved in cls.find_for_cached(form.view, form=form):
+                if saved.key == input_name:
+                    saved.confidential = True
+
+    __hash__ = None
+    def __eq__(self, other):
+        return super().__eq__(other) and \
+               self.key == other.key and \
+               self.value == other.value
+
+
+class StoredPersistedException(StoredSessionData, PersistedExceptionBehaviour):
+    """A :class:`PersistedException` kept in a :class:`SessionDataStore`.
+
+       .. versionadded:: 7.1
+    """
+    input_name = None
+
+    def __eq__(self, other):
+        return super().__eq__(other) and \
+               self.exception == other.exception
+
+
+class StoredPersistedFile(StoredSessionData, PersistedFileBehaviour):
+    """A :class:`PersistedFile` kept in a :class:`SessionDataStore`.
+
+       If `web.webdeclarative.file_store_directory` is set, the contents of the file are kept in a
+       :class:`ContentAddressedFileStore` there, and only its hash is kept in the SessionDataStore.
+
+       .. versionadded:: 7.1
+    """
+    content_hash = None
+
+    @classmethod
+    def get_file_store(cls):
+        directory = ExecutionContext.get_context().config.web.webdeclarative.file_store_directory
+        return ContentAddressedFileStore(directory) if directory else None
+
+    @classmethod
+    def add_persisted_for_form(cls, form, input_name, uploaded_file):
+        file_store = cls.get_file_store()
+        if not file_store:
+            return super().add_persisted_for_form(form, input_name, uploaded_file)
+        with uploaded_file.open() as contents:
+            content_hash = file_store.add(contents)
+        return cls.save_for_cached(form.view, form=form, input_name=input_name, filename=uploaded_file.filename, content_hash=content_hash,
+                                   mime_type=uploaded_file.mime_type, size=uploaded_file.size)
+
+    @property
+    def file_obj(self):
+        if self.content_hash:
+            return self.get_file_store().open(self.content_hash)
+        return super().file_obj
+
+    def __eq__(self, other):
+        return super().__eq__(other) and \
+               self.filename == other.filename and \
+               self.input_name == other.input_name
+
+
 class WebDeclarativeConfig(Configuration):
     filename = 'web.webdeclarative.config.py'
     config_key = 'web.webdeclarative'
 
+    session_data_store = ConfigSetting(default=None,
+                                       description='A SessionDataStore (such as SqliteSessionDataStore or SignedCookieSessionDataStore) in which to keep '
+                                                   'user input, exceptions and uploaded files of a user session instead of in the database')
+
+    file_store_directory = ConfigSetting(default=None,
+                                         description='If set (along with session_data_store), the contents of uploaded files are streamed to this directory '
+                                                     'instead of being read into memory to be kept in the session_data_store (or the database)')
+
     def do_injections(self, config):
         config.web.session_class = UserSession
-        config.web.persisted_exception_class = PersistedException
-        config.web.persisted_userinput_class = UserInput
-        config.web.persisted_file_class = PersistedFile
+        if self.session_data_store and self.session_data_store.keeps_data_with_browser and not self.file_store_directory:
+            raise ConfigurationException('%s keeps data with the browser: web.webdeclarative.file_store_directory should be set so that uploaded files are not' % self.session_data_store)
+        if self.session_data_store:
+            config.web.persisted_exception_class = StoredPersistedException
+            config.web.persisted_userinput_class = StoredUserInput
+            config.web.persisted_file_class = StoredPersistedFile
+        else:
+            config.web.persisted_exception_class = PersistedException
+            config.web.persisted_userinput_class = UserInput
+            config.web.persisted_file_class = PersistedFile
 
 
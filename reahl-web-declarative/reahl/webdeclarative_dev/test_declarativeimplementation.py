@@ -17,20 +17,31 @@
 
 from datetime import datetime, timedelta
 
+import os
+import io
+import base64
+import hashlib
 import http.cookies
+import threading
 import urllib.parse
 
-from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy import Column, ForeignKey, Integer, event
 from webob import Response
 
-from reahl.tofu import scenario, Fixture, uses
+from reahl.tofu import scenario, Fixture, uses, expected, temp_dir
 from reahl.stubble import stubclass, EmptyStub
 from reahl.tofu.pytestsupport import with_fixtures
 
 from reahl.component.context import ExecutionContext
+from reahl.component.config import ConfigurationException
+from reahl.component.modelinterface import UploadedFile
 from reahl.sqlalchemysupport import Session, Base, session_scoped
-from reahl.webdeclarative.webdeclarative import UserSession, SessionData, UserInput
+from reahl.webdeclarative.webdeclarative import UserSession, SessionData, UserInput, InvalidKeyException, \
+    WebDeclarativeConfig, StoredUserInput, SqliteSessionDataStore, SignedCookieSessionDataStore, DeadSessionReaper, \
+    StoredPersistedFile, ContentAddressedFileStore, ReapResult
 
+from reahl.web.fw import UrlBoundView
+from reahl.web.uploads import PartialUpload, AnnouncedFile
 from reahl.web.ui import Form
 from reahl.web_dev.fixtures import WebFixture
 from reahl.sqlalchemysupport_dev.fixtures import SqlAlchemyFixture
@@ -210,6 +221,40 @@ def test_reading_cookies_on_initialising_a_session(web_fixture):
     assert not fixture.context.session.is_secured()
 
 
+@with_fixtures(WebFixture)
+def test_session_keys_that_do_not_match(web_fixture):
+    """A UserSession is only found for a key with its id and its salt."""
+
+    user_session = UserSession()
+    Session.add(user_session)
+    Session.flush()
+
+    assert UserSession.from_key(user_session.as_key()) is user_session
+
+    for invalid_key in ['%s:wrongsalt' % user_session.id, 'notanid:%s' % user_session.salt, 'nodelimiter', '%s:%s' % (user_session.id+1, user_session.salt)]:
+        with expected(InvalidKeyException):
+            UserSession.from_key(invalid_key)
+
+
+@with_fixtures(WebFixture)
+def test_csrf_token_is_computed_once_per_request(web_fixture):
+    """The CSRF token of a UserSession is computed (and signed) only once per request."""
+    fixture = web_fixture
+
+    UserSession.initialise_web_session_on(fixture.context)
+    user_session = fixture.context.session
+
+    token = user_session.get_csrf_token()
+    assert user_session.get_csrf_token() is token
+    assert token.as_signed_string() is token.as_signed_string()
+
+    # A new request gets a new token, with the same value
+    fixture.context.request = fixture.new_request()
+    new_token = user_session.get_csrf_token()
+    assert new_token is not token
+    assert new_token.matches(token)
+
+
 @with_fixtures(WebFixture)
 def test_session_data_disappears_when_session_does(web_fixture):
     """When a UserSession is deleted, all associated SessionData disappear as well."""
@@ -297,6 +342,275 @@ def test_persisting_input(web_fixture, party_account_fixture, input_scenarios):
     assert previously_entered == fixture.empty_entered_input
 
 
+@uses(web_fixture=WebFixture)
+class SessionDataStoreFixture(Fixture):
+    def new_temp_dir(self):
+        return temp_dir()
+
+    def send_response_cookies_with_next_request(self, response):
+        cookies = http.cookies.SimpleCookie()
+        cookies.load(self.web_fixture.request.headers.get('Cookie', ''))
+        for set_cookie in response.headers.getall('Set-Cookie'):
+            cookies.load(set_cookie)
+        self.web_fixture.request.headers['Cookie'] = '; '.join(['%s=%s' % (name, morsel.coded_value) for name, morsel in cookies.items() if morsel.value])
+
+    def new_form(self, readable=True):
+        web_fixture = self.web_fixture
+        @stubclass(Form)
+        class FormStub:
+            view = web_fixture.view
+            user_interface = EmptyStub(name='myui')
+            channel_name = 'myform'
+            inputs = {'aninput': EmptyStub(bound_field=EmptyStub(can_read=lambda: readable))}
+        return FormStub()
+
+
+class SessionDataStoreScenarios(SessionDataStoreFixture):
+    @scenario
+    def sqlite(self):
+        self.store = SqliteSessionDataStore(os.path.join(self.temp_dir.name, 'sessiondata.db'))
+
+    @scenario
+    def signed_cookie(self):
+        self.store = SignedCookieSessionDataStore(SqliteSessionDataStore(os.path.join(self.temp_dir.name, 'sessiondata.db')))
+
+
+@with_fixtures(WebFixture, SessionDataStoreScenarios)
+def test_persisting_input_in_a_session_data_store(web_fixture, session_data_store_scenarios):
+    """When a SessionDataStore is configured, UserInput is kept in it instead of in the database, and written
+       to it only once the changes made to the database have been committed."""
+    fixture = session_data_store_scenarios
+    web_fixture.config.web.webdeclarative = WebDeclarativeConfig()
+    web_fixture.config.web.webdeclarative.session_data_store = fixture.store
+    form = fixture.new_form()
+
+    StoredUserInput.save_input_value_for_form(form, 'aninput', 'a value', str)
+    response = Response()
+    web_fixture.context.session.set_session_key(response)
+    assert not fixture.store.read(StoredUserInput.key_for(web_fixture.view), web_fixture.request)
+
+    UserSession.after_commit(web_fixture.context, response)
+    fixture.send_response_cookies_with_next_request(response)
+
+    # On the next request, the input is read back from the store
+    web_fixture.view.cached_session_data = None
+    assert StoredUserInput.get_previously_entered_for_form(form, 'aninput', str) == 'a value'
+    assert Session.query(UserInput).count() == 0
+
+    # Changes made in a transaction that is rolled back are not written to the store
+    transaction = Session().begin_nested()
+    StoredUserInput.clear_for_form(form)
+    transaction.rollback()
+    response = Response()
+    web_fixture.context.session.set_session_key(response)
+    UserSession.after_commit(web_fixture.context, response)
+    fixture.send_response_cookies_with_next_request(response)
+
+    web_fixture.view.cached_session_data = None
+    assert StoredUserInput.get_previously_entered_for_form(form, 'aninput', str) == 'a value'
+
+
+class SignedCookieFixture(SessionDataStoreFixture):
+    def new_server_side_store(self):
+        return SqliteSessionDataStore(os.path.join(self.temp_dir.name, 'sessiondata.db'))
+
+    def new_store(self):
+        return SignedCookieSessionDataStore(self.server_side_store, max_cookie_size=400)
+
+    def new_key(self):
+        return StoredUserInput.key_for(self.web_fixture.view)
+
+    def cookies_set_on(self, response):
+        cookies = http.cookies.SimpleCookie()
+        for set_cookie in response.headers.getall('Set-Cookie'):
+            cookies.load(set_cookie)
+        return {name: morsel.value for name, morsel in cookies.items() if morsel.value}
+
+    def write_and_read_back(self, session_data):
+        response = Response()
+        self.store.write(self.key, session_data, response)
+        self.send_response_cookies_with_next_request(response)
+        return response, self.store.read(self.key, self.web_fixture.request)
+
+
+@with_fixtures(WebFixture, SignedCookieFixture)
+def test_signed_cookie_session_data_store_detects_tampering(web_fixture, signed_cookie_fixture):
+    """Data in a cookie that was not signed with web.csrf_key for the current session is ignored."""
+    fixture = signed_cookie_fixture
+    store = fixture.store
+    response = Response()
+    store.write('akey', [StoredUserInput(view_path='/', ui_name='myui', key='aninput', value='a value')], response)
+
+    cookie_name = store.cookie_name_for('akey')
+    [cookie_value] = fixture.cookies_set_on(response).values()
+    encoded_value, signature = cookie_value.split('.')
+    assert b'a value' in base64.urlsafe_b64decode(encoded_value.encode('ascii'))
+
+    web_fixture.request.headers['Cookie'] = '%s=%s' % (cookie_name, cookie_value)
+    [read] = store.read('akey', web_fixture.request)
+    assert (read.key, read.value) == ('aninput', 'a value')
+    assert store.read('anotherkey', web_fixture.request) is None
+
+    web_fixture.request.headers['Cookie'] = '%s=%s.%s' % (cookie_name, encoded_value[:-4]+'AAAA', signature)
+    assert store.read('akey', web_fixture.request) is None
+
+
+@with_fixtures(WebFixture, SignedCookieFixture)
+def test_signed_cookie_session_data_store_keeps_only_visible_input_with_the_browser(web_fixture, signed_cookie_fixture):
+    """Only input the user is allowed to see is kept in a cookie: anything else, and input that does not fit in
+       a cookie, is kept in the server side store."""
+    fixture = signed_cookie_fixture
+    web_fixture.config.web.webdeclarative = WebDeclarativeConfig()
+    web_fixture.config.web.webdeclarative.session_data_store = fixture.store
+
+    # A password (input the user may not see)
+    form = fixture.new_form(readable=False)
+    StoredUserInput.save_input_value_for_form(form, 'aninput', 'secret', str)
+    response, read_back = fixture.write_and_read_back(web_fixture.view.cached_session_data)
+    assert not fixture.cookies_set_on(response)
+    assert [i.value for i in read_back] == ['secret']
+    assert [i.value for i in fixture.server_side_store.read(fixture.key, web_fixture.request)] == ['secret']
+
+    # Input the user may see
+    web_fixture.view.cached_session_data = None
+    form = fixture.new_form(readable=True)
+    StoredUserInput.save_input_value_for_form(form, 'aninput', 'visible', str)
+    response, read_back = fixture.write_and_read_back(web_fixture.view.cached_session_data)
+    assert len(fixture.cookies_set_on(response)) == 1
+    assert [i.value for i in read_back] == ['visible']
+    assert fixture.server_side_store.read(fixture.key, web_fixture.request) is None
+
+    # Input too big for a cookie
+    StoredUserInput.save_input_value_for_form(form, 'aninput', 'x'*fixture.store.max_cookie_size, str)
+    response, read_back = fixture.write_and_read_back(web_fixture.view.cached_session_data)
+    assert not fixture.cookies_set_on(response)
+    assert [i.value for i in read_back] == ['x'*fixture.store.max_cookie_size]
+
+
+@with_fixtures(WebFixture, SignedCookieFixture)
+def test_signed_cookie_session_data_store_needs_a_file_store(web_fixture, signed_cookie_fixture):
+    """Uploaded files are never kept with the browser: a SessionDataStore that keeps data with the browser can only be
+       configured along with a file_store_directory."""
+    config = WebDeclarativeConfig()
+    config.session_data_store = signed_cookie_fixture.store
+    with expected(ConfigurationException):
+        config.do_injections(web_fixture.config)
+
+    config.file_store_directory = signed_cookie_fixture.temp_dir.name
+    config.do_injections(web_fixture.config)
+
+
+@with_fixtures(WebFixture)
+def test_session_data_is_cleared_in_bulk(web_fixture):
+    """Clearing the UserInput of a Form deletes all of it with a single DELETE per table, and removes the deleted
+       instances from the Session."""
+    @stubclass(Form)
+    class FormStub:
+        view = web_fixture.view
+        user_interface = EmptyStub(name='myui')
+        channel_name = 'myform'
+    form = FormStub()
+
+    UserInput.save_input_value_for_form(form, 'alist', ['one', 'two', 'three'], list)
+    UserInput.save_input_value_for_form(form, 'astring', 'four', str)
+    Session.flush()
+    saved = Session.query(UserInput).all()
+    assert len(saved) == 4
+
+    statements = []
+    def log_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, executemany))
+    engine = Session().get_bind()
+    event.listen(engine, 'before_cursor_execute', log_statement)
+    try:
+        UserInput.clear_for_form(form)
+        Session.flush()
+    finally:
+        event.remove(engine, 'before_cursor_execute', log_statement)
+
+    deletes = [(statement, executemany) for statement, executemany in statements if statement.startswith('DELETE')]
+    assert len(deletes) == 2
+    assert not any(executemany for statement, executemany in deletes)
+    assert not any(i in Session() for i in saved)
+    assert Session.query(UserInput).count() == 0
+    assert UserInput.get_previously_entered_for_form(form, 'alist', list) is None
+
+
+@with_fixtures(WebFixture)
+def test_session_data_of_all_views_is_read_once_per_request(web_fixture):
+    """All the SessionData of a UserSession is read with one query, shared by all Views, and is discarded
+       (without accumulating event listeners) when the transaction is rolled back."""
+    fixture = web_fixture
+    view = fixture.view
+    other_view = UrlBoundView(fixture.user_interface, '/other', 'Another view')
+
+    UserInput.add_persisted_for_view(view, 'akey', 'a value', str)
+    UserInput.add_persisted_for_view(other_view, 'akey', 'another value', str)
+    Session.flush()
+    view.cached_session_data = other_view.cached_session_data = None
+    fixture.context.session_data_cache = None
+
+    statements = []
+    def log_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    engine = Session().get_bind()
+    listeners_before = len(Session().dispatch.after_soft_rollback)
+    event.listen(engine, 'before_cursor_execute', log_statement)
+    try:
+        assert UserInput.get_persisted_for_view(view, 'akey', str) == 'a value'
+        assert UserInput.get_persisted_for_view(other_view, 'akey', str) == 'another value'
+    finally:
+        event.remove(engine, 'before_cursor_execute', log_statement)
+    assert len([i for i in statements if i.startswith('SELECT')]) == 1
+
+    transaction = Session().begin_nested()
+    UserInput.remove_persisted_for_view(view, 'akey')
+    transaction.rollback()
+    assert view.cached_session_data is None
+    assert other_view.cached_session_data is None
+    assert len(Session().dispatch.after_soft_rollback) == listeners_before
+    assert UserInput.get_persisted_for_view(view, 'akey', str) == 'a value'
+
+
+@with_fixtures(WebFixture)
+def test_stored_files_are_kept_in_a_content_addressed_file_store(web_fixture):
+    """When web.webdeclarative.file_store_directory is set, only the hash of an uploaded file is kept in the
+       SessionDataStore; the contents are streamed to a file named for that hash."""
+    store_dir = temp_dir()
+    config = web_fixture.config.web.webdeclarative = WebDeclarativeConfig()
+    config.session_data_store = SqliteSessionDataStore(os.path.join(store_dir.name, 'sessiondata.db'))
+    config.file_store_directory = os.path.join(store_dir.name, 'files')
+
+    @stubclass(Form)
+    class FormStub:
+        view = web_fixture.view
+        user_interface = EmptyStub(name='myui')
+        channel_name = 'myform'
+    form = FormStub()
+
+    contents = io.BytesIO(b'some file contents')
+    persisted = StoredPersistedFile.add_persisted_for_form(form, 'afile', UploadedFile('afile.txt', contents, 'text/plain'))
+    expected_hash = hashlib.sha256(b'some file contents').hexdigest()
+    assert persisted.content_hash == expected_hash
+    assert persisted.size == len(b'some file contents')
+    assert os.path.isfile(os.path.join(config.file_store_directory, expected_hash[:2], expected_hash))
+
+    # The file is only open while being read, so file_obj need not be closed
+    [found] = StoredPersistedFile.get_persisted_for_form(form, 'afile')
+    file_obj = found.file_obj
+    assert file_obj.read(4) == b'some'
+    assert file_obj.read() == b' file contents'
+    assert file_obj.seek(0, io.SEEK_END) == len(b'some file contents')
+    assert UploadedFile('afile.txt', found.file_obj, 'text/plain').contents == b'some file contents'
+
+    file_store = ContentAddressedFileStore(config.file_store_directory)
+    file_store.remove_unless_added_since([expected_hash], datetime.now()-timedelta(seconds=60))
+    assert os.path.isfile(os.path.join(config.file_store_directory, expected_hash[:2], expected_hash))
+
+    file_store.remove_unless_added_since([expected_hash], datetime.now()+timedelta(seconds=1))
+    assert not os.path.exists(os.path.join(config.file_store_directory, expected_hash[:2], expected_hash))
+
+
 class SessionScopedFixture(Fixture):
 
     def create_user_session(self):
@@ -345,3 +659,189 @@ def test_cascade_removal_of_user_session(sql_alchemy_fixture, session_scoped_fix
 
         assert Session.query(MySessionScoped).count() == 0
         assert Session.query(UserSession).count() == fixture.expected_user_session_after_delete
+
+
+@with_fixtures(WebFixture)
+def test_dead_sessions_are_reaped_in_batches(web_fixture):
+    """Sessions that have been idle for longer than web.session_lifetime are removed in bounded batches;
+       each call to reap removes at most max_batches batches and reports what it did."""
+    config = web_fixture.config
+    web_fixture.context.session.set_last_activity_time()
+    long_ago = datetime.now() - timedelta(seconds=config.web.session_lifetime+10)
+
+    dead_sessions = [UserSession() for i in range(5)]
+    for user_session in dead_sessions:
+        user_session.last_activity = long_ago
+        Session.add(user_session)
+    Session.flush()
+    assert Session.query(UserSession).count() == 6
+
+    reaper = DeadSessionReaper(batch_size=2, max_batches=2)
+
+    result = reaper.reap()
+    assert result.reaped == 4
+    assert result.batches == 2
+    assert Session.query(UserSession).count() == 2
+
+    result = reaper.reap()
+    assert result.reaped == 1
+    assert result.batches == 1
+    assert Session.query(UserSession).one() is web_fixture.context.session
+
+    result = reaper.reap()
+    assert result.reaped == 0
+
+
+@with_fixtures(WebFixture)
+def test_reaping_removes_what_reaped_sessions_stored(web_fixture):
+    """What dead sessions kept in a SessionDataStore (and the files it refers to) is removed when they are reaped,
+       regardless of when it was written; what live sessions kept there is left alone."""
+    store_dir = temp_dir()
+    config = web_fixture.config.web.webdeclarative = WebDeclarativeConfig()
+    store = config.session_data_store = SqliteSessionDataStore(os.path.join(store_dir.name, 'sessiondata.db'))
+    config.file_store_directory = os.path.join(store_dir.name, 'files')
+    file_store = StoredPersistedFile.get_file_store()
+
+    long_ago = datetime.now() - timedelta(seconds=web_fixture.config.web.session_lifetime+10)
+    live_session = web_fixture.context.session
+    live_session.set_last_activity_time()
+    dead_session = UserSession()
+    dead_session.last_activity = long_ago
+    Session.add(dead_session)
+    Session.flush()
+
+    def store_file_for(user_session, contents):
+        content_hash = file_store.add(io.BytesIO(contents))
+        os.utime(file_store.path_for(content_hash), (long_ago.timestamp(), long_ago.timestamp()))
+        key = '%s:myui:/' % user_session.as_key()
+        store.write(key, [StoredPersistedFile(view_path='/', ui_name='myui', input_name='afile', content_hash=content_hash)], None)
+        return key, content_hash
+
+    live_key, live_hash = store_file_for(live_session, b'live contents')
+    dead_key, dead_hash = store_file_for(dead_session, b'dead contents')
+
+    result = DeadSessionReaper().reap()
+    assert result.reaped == 1
+
+    assert store.read(dead_key, None) is None
+    assert not os.path.exists(file_store.path_for(dead_hash))
+    assert store.read(live_key, None)
+    assert os.path.isfile(file_store.path_for(live_hash))
+
+
+@with_fixtures(WebFixture)
+def test_reaping_keeps_contents_shared_with_live_sessions(web_fixture):
+    """Contents in the file store that a dead session shares with a live one are kept when the dead session is
+       reaped, even if they were added long ago."""
+    store_dir = temp_dir()
+    config = web_fixture.config.web.webdeclarative = WebDeclarativeConfig()
+    store = config.session_data_store = SqliteSessionDataStore(os.path.join(store_dir.name, 'sessiondata.db'))
+    config.file_store_directory = os.path.join(store_dir.name, 'files')
+    file_store = StoredPersistedFile.get_file_store()
+
+    long_ago = datetime.now() - timedelta(seconds=web_fixture.config.web.session_lifetime+10)
+    live_session = web_fixture.context.session
+    live_session.set_last_activity_time()
+    dead_session = UserSession()
+    dead_session.last_activity = long_ago
+    Session.add(dead_session)
+    Session.flush()
+
+    content_hash = file_store.add(io.BytesIO(b'shared contents'))
+    os.utime(file_store.path_for(content_hash), (long_ago.timestamp(), long_ago.timestamp()))
+    live_key = '%s:myui:/' % live_session.as_key()
+    for user_session in [live_session, dead_session]:
+        store.write('%s:myui:/' % user_session.as_key(),
+                    [StoredPersistedFile(view_path='/', ui_name='myui', input_name='afile', filename='shared.txt', content_hash=content_hash)], None)
+
+    result = DeadSessionReaper().reap()
+    assert result.reaped == 1
+
+    [live_file] = store.read(live_key, None)
+    assert live_file.file_obj.read() == b'shared contents'
+
+    # Once the last session that refers to them is reaped, they are removed
+    live_session.last_activity = long_ago
+    result = DeadSessionReaper().reap()
+    assert result.reaped == 1
+    assert not os.path.exists(file_store.path_for(content_hash))
+
+
+@with_fixtures(WebFixture)
+def test_reaping_removes_abandoned_partial_uploads(web_fixture):
+    """Files abandoned while being uploaded in chunks are removed once nothing was added to them for web.session_lifetime."""
+    web_fixture.config.web.partial_uploads_directory = os.path.join(temp_dir().name, 'uploads')
+    long_ago = datetime.now() - timedelta(seconds=web_fixture.config.web.session_lifetime+10)
+
+    def start_upload(upload_key):
+        partial_upload = PartialUpload(upload_key)
+        partial_upload.announce(AnnouncedFile('file.html', 'text/html', 20))
+        partial_upload.add_chunk(0, io.BytesIO(b'0123456789'), hashlib.sha256(b'0123456789').hexdigest())
+        return partial_upload
+
+    abandoned_upload = start_upload('abandoned')
+    for path in [abandoned_upload.path, abandoned_upload.announcement_path]:
+        os.utime(path, (long_ago.timestamp(), long_ago.timestamp()))
+    ongoing_upload = start_upload('ongoing')
+
+    DeadSessionReaper().reap()
+
+    assert abandoned_upload.received_size == 0
+    assert not os.path.exists(abandoned_upload.announcement_path)
+    assert ongoing_upload.received_size == 10
+
+
+@with_fixtures(WebFixture)
+def test_reaping_continuously(web_fixture):
+    """A DeadSessionReaper run continuously reaps in an ExecutionContext (and thus a database Session) of its own, committing
+       as it goes, until stopped."""
+    stop_event = threading.Event()
+    reaped_in = []
+
+    @stubclass(DeadSessionReaper)
+    class DeadSessionReaperStub(DeadSessionReaper):
+        def reap(self, now=None):
+            context = ExecutionContext.get_context()
+            try:
+                result = super().reap(now=now)
+                reaped_in.append((context.id, context.config, context.system_control, Session(), result))
+                return result
+            finally:
+                stop_event.set()
+
+    reaper_thread = threading.Thread(target=DeadSessionReaperStub().run_continuously, args=(web_fixture.context, stop_event))
+    reaper_thread.start()
+    reaper_thread.join(10)
+    assert not reaper_thread.is_alive()
+
+    [(context_id, config, system_control, database_session, result)] = reaped_in
+    assert result.reaped == 0
+    assert context_id != web_fixture.context.id
+    assert database_session is not Session()
+    assert config is web_fixture.context.config
+    assert system_control is web_fixture.context.system_control
+
+
+@with_fixtures(WebFixture)
+def test_reaping_continuously_while_there_is_a_backlog(web_fixture):
+    """A DeadSessionReaper run continuously reaps again immediately while a backlog remains (or, when max_batches
+       was reached), but waits otherwise, also after an error."""
+    results = [ReapResult(4, 2, 0), ReapResult(4, 2, 0), ReapResult(1, 1, 0), Exception('reaping broke'), ReapResult(0, 0, 0)]
+    waits = []
+
+    @stubclass(DeadSessionReaper)
+    class DeadSessionReaperStub(DeadSessionReaper):
+        def reap(self, now=None):
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+    class StopEventStub:
+        def is_set(self):
+            return not results
+        def wait(self, timeout):
+            waits.append((len(results), timeout))
+
+    DeadSessionReaperStub(batch_size=2, max_batches=2).run_continuously(web_fixture.context, StopEventStub(), interval_seconds=30)
+    assert waits == [(2, 30), (1, 30), (0, 30)]
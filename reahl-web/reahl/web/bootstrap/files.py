@@ -23,11 +23,16 @@ Styled Inputs that allow a user to choose or upload files.
 """
 
 
+
 from reahl.component.i18n import Catalogue
-from reahl.component.modelinterface import ExposedNames, Action, Event, Field, UploadedFile
+from reahl.component.exceptions import DomainException
+from reahl.component.modelinterface import ExposedNames, Action, Event, Field, IntegerField, UploadedFile, \
+    FileSizeConstraint, MimeTypeConstraint, MaxFilesConstraint, ValidationConstraint
 from reahl.component.context import ExecutionContext
 import reahl.web.ui
+from reahl.web.fw import RemoteMethod, JsonResult
 from reahl.web.ui import UniqueFilesConstraint
+from reahl.web.uploads import PartialUpload, AnnouncedFile
 from reahl.web.bootstrap.ui import Div, Span, Li, Ul
 from reahl.web.bootstrap.forms import Button, NestedForm, FormLayout, Label
 
@@ -126,6 +131,8 @@ class FileUploadLi(Li):
 
 # Uses: reahl/web/reahl.files.js
 class FileUploadPanel(Div):
+    chunk_size = 1024*1024  # The size of chunks in which the browser sends a file
+
     def __init__(self, file_upload_input, css_id=None):
         super().__init__(file_upload_input.view, css_id=css_id)
         self.set_attribute('class', 'reahl-bootstrap-file-upload-panel')
@@ -134,6 +141,7 @@ class FileUploadPanel(Div):
         self.add_nested_form()
         self.add_uploaded_list()
         self.add_upload_controls()
+        self.add_chunked_upload_methods()
 
     def add_nested_form(self):
         self.upload_form = self.add_child(NestedForm(self.view, '%s-%s-upload' % (self.input_form.css_id, self.bound_field.name)))
@@ -161,6 +169,13 @@ class FileUploadPanel(Div):
         button_addon.add_child(Button(self.upload_form.form, self.events.upload_file, style='secondary', outline=True))
         return controls_panel
 
+    def add_chunked_upload_methods(self):
+        self.chunk_receiver = self.view.add_resource(RemoteMethod(self.view, '%s-chunk' % self.upload_form.css_id, self.receive_chunk,
+                                                                  JsonResult(IntegerField(), catch_exception=DomainException)))
+        self.upload_progress = self.view.add_resource(RemoteMethod(self.view, '%s-progress' % self.upload_form.css_id, self.get_upload_progress,
+                                                                   JsonResult(IntegerField()), immutable=True,
+                                                                   read_from_replica=False))
+
     @property
     def persisted_file_class(self):
         return self.file_upload_input.persisted_file_class
@@ -208,6 +223,9 @@ class FileUploadPanel(Div):
                     removeLabel=self.events.remove_file.label,
                     cancelLabel=_('Cancel'),
                     duplicateValidationErrorMessage=unique_names_constraint.message,
+                    chunkUploadUrl=str(self.chunk_receiver.get_url()),
+                    uploadProgressUrl=str(self.upload_progress.get_url()),
+                    chunkSize=self.chunk_size,
                     waitForUploadsMessage=_('Please try again when all files have finished uploading.'))
         return super().get_js(context=context) + [js]
 
@@ -218,6 +236,67 @@ class FileUploadPanel(Div):
         if self.uploaded_file is not None:
             self.persisted_file_class.add_persisted_for_form(self.input_form, self.name, self.uploaded_file)
 
+    def get_partial_upload(self, upload_id):
+        if not upload_id or len(upload_id) > 200:
+            raise DomainException(message=_('Invalid upload.'))
+        return PartialUpload.for_current_session(self.input_form, self.name, upload_id)
+
+    def get_upload_progress(self, upload_id=None):
+        return self.get_partial_upload(upload_id).received_size
+
+    def check_announced_file(self, announced_file):
+        # Constraints that need not wait for the contents are checked before anything is stored
+        config = ExecutionContext.get_context().config
+        if announced_file.size < 0:
+            raise DomainException(message=_('Invalid upload.'))
+        if announced_file.size > config.web.max_chunked_upload_bytes:
+            raise DomainException(message=_('The uploaded file is too large.'))
+        try:
+            for constraint in self.fields.uploaded_file.validation_constraints:
+                if isinstance(constraint, (FileSizeConstraint, MimeTypeConstraint)):
+                    constraint.validate_input([announced_file])
+            for constraint in self.bound_field.validation_constraints:
+                if isinstance(constraint, MaxFilesConstraint):
+                    already_uploaded = self.persisted_file_class.get_persisted_for_form(self.input_form, self.name)
+                    constraint.validate_input(already_uploaded+[announced_file])
+        except ValidationConstraint as ex:
+            raise DomainException(message=ex.message)
+
+    def receive_chunk(self, upload_id=None, offset='0', total_size='0', checksum='', filename='', mime_type='', chunk=None):
+        """Receives one chunk of a file uploaded in chunks, returning the number of bytes received so far.
+           When the last chunk is received, the file is validated and added like a file uploaded in one go."""
+        partial_upload = self.get_partial_upload(upload_id)
+        try:
+            offset = int(offset)
+            total_size = int(total_size)
+        except ValueError:
+            raise DomainException(message=_('Invalid upload.'))
+
+        if offset == 0:
+            announced_file = AnnouncedFile(filename, mime_type or 'application/octet-stream', total_size)
+            self.check_announced_file(announced_file)
+            partial_upload.announce(announced_file)
+        else:
+            announced_file = partial_upload.announced_file
+
+        if chunk is None or not hasattr(chunk, 'file'):
+            raise DomainException(message=_('Invalid upload.'))
+        received_size = partial_upload.add_chunk(offset, chunk.file, checksum)
+        if received_size > announced_file.size:
+            partial_upload.discard()
+            raise DomainException(message=_('The uploaded file is larger than announced.'))
+
+        if received_size == announced_file.size:
+            with partial_upload.open() as assembled:
+                try:
+                    self.fields.uploaded_file.from_input([UploadedFile(announced_file.filename, assembled, announced_file.mime_type)])
+                    self.upload_file()
+                except ValidationConstraint as ex:
+                    raise DomainException(message=ex.message)
+                finally:
+                    partial_upload.discard()
+        return received_size
+
 
 class FileUploadInput(reahl.web.ui.Input):
     """A Widget that allows the user to upload several files.  FileUploadInput
@@ -278,7 +357,7 @@ class FileUploadInput(reahl.web.ui.Input):
         return None
 
     def accept_input(self, input_values):
-        value = [UploadedFile(f.filename, f.file_obj.read(), f.mime_type)
+        value = [UploadedFile(f.filename, f.file_obj, f.mime_type)
                  for f in self.persisted_file_class.get_persisted_for_form(self.form, self.name)]
         self.bound_field.from_input(value)
 
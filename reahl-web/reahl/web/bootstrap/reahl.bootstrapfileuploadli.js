@@ -126,10 +126,12 @@ $.widget('reahl.bootstrapfileuploadli', {
             var widget = $('#'+cssId);
             widget.empty();
             widget.append(html);
+            widget.removeAttr('data-reahl-content-hash');
         }
     },
     cancelUpload: function() {
 	var this_ = this;
+        this_.cancelled = true;
         if (this_.jqXhr) {
             this_.jqXhr.abort();
 	    this_.jqXhr = undefined;
@@ -146,6 +148,13 @@ $.widget('reahl.bootstrapfileuploadli', {
         }));
         $(this.element).append(this.createFileNameSpan());
         $(this.element).append(this.createProgressBar());
+        if (this_.canUploadInChunks()) {
+            this_.getFileInputPanel().uploadStarted(this_.getFilename(), function() {
+                this_.state = 'upload started';
+                this_.resumeChunkedUpload(0);
+            });
+            return;
+        }
         var startThisUpload = function() {
             var data = {'_noredirect':''};
             data[submitName] = '';
@@ -179,6 +188,96 @@ $.widget('reahl.bootstrapfileuploadli', {
         };
         this_.getFileInputPanel().uploadStarted(this_.getFilename(), startThisUpload);
     },
+    canUploadInChunks: function() {
+        /* Small files (and browsers that cannot compute checksums) are uploaded in one go, via the nested form */
+        var options = this.getAjaxOptions();
+        return options.chunkUploadUrl && this.options.file.size > options.chunkSize && window.crypto && window.crypto.subtle;
+    },
+    getUploadId: function() {
+        var file = this.options.file;
+        return [this.getFilename(), file.size, file.lastModified].join(':');
+    },
+    resumeChunkedUpload: function(attempt) {
+        /* Asks the server how much of the file it already has, and continues from there */
+        var this_ = this;
+        if (this_.cancelled) {
+            return;
+        }
+        $.ajax({
+            url: this_.getAjaxOptions().uploadProgressUrl,
+            data: {upload_id: this_.getUploadId()},
+            cache: false,
+            beforeSend: function(jqXHR, settings) {
+                this_.saveJqXhr(jqXHR);
+            },
+            success: function(receivedSize) {
+                this_.sendChunk(receivedSize, attempt);
+            },
+            error: function(jqXHR, textStatus, errorThrown) {
+                this_.chunkFailed(attempt, textStatus);
+            }
+        });
+    },
+    sendChunk: function(offset, attempt) {
+        var this_ = this;
+        if (this_.cancelled) {
+            return;
+        }
+        var file = this.options.file;
+        var chunk = file.slice(offset, Math.min(offset+this.getAjaxOptions().chunkSize, file.size));
+        chunk.arrayBuffer().then(function(buffer) {
+            return window.crypto.subtle.digest('SHA-256', buffer);
+        }).then(function(digest) {
+            var checksum = Array.from(new Uint8Array(digest)).map(function(b) { return b.toString(16).padStart(2, '0'); }).join('');
+            var formData = new FormData();
+            formData.append('upload_id', this_.getUploadId());
+            formData.append('offset', offset);
+            formData.append('total_size', file.size);
+            formData.append('checksum', checksum);
+            formData.append('filename', this_.getFilename());
+            formData.append('mime_type', file.type);
+            formData.append('chunk', chunk, this_.getFilename());
+            $.ajax({
+                url: this_.getAjaxOptions().chunkUploadUrl,
+                type: 'POST',
+                data: formData,
+                processData: false,
+                contentType: false,
+                cache: false,
+                beforeSend: function(jqXHR, settings) {
+                    this_.saveJqXhr(jqXHR);
+                },
+                success: function(result) {
+                    if (typeof result !== 'number') {
+                        this_.getFileInputPanel().uploadFinished();
+                        this_.changeToFailed(result);
+                    } else if (result >= file.size) {
+                        this_.updateProgress(100);
+                        this_.changeToUploaded();
+                        this_.getFileInputPanel().uploadFinished();
+                    } else {
+                        this_.updateProgress(Math.floor(result*100/file.size));
+                        this_.sendChunk(result, 0);
+                    }
+                },
+                error: function(jqXHR, textStatus, errorThrown) {
+                    this_.chunkFailed(attempt, textStatus);
+                }
+            });
+        });
+    },
+    chunkFailed: function(attempt, textStatus) {
+        var this_ = this;
+        if (textStatus === 'abort') {
+            return;
+        }
+        if (attempt < 5) {
+            setTimeout(function() { this_.resumeChunkedUpload(attempt+1); }, 1000*Math.pow(2, attempt));
+        } else {
+            this_.getFileInputPanel().uploadFinished();
+            this_.changeToFailed(this_.getErrorMessage());
+        }
+    },
     saveJqXhr: function(jqXhr) {
 	this.jqXhr = jqXhr
     },
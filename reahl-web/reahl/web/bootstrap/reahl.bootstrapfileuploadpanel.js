@@ -28,7 +28,10 @@ $.widget('reahl.bootstrapfileuploadpanel', {
         waitForUploadsMessage: 'please wait, uploads in progress',
         errorMessage: 'Ajax error',
         removeLabel: 'Remove',
-        cancelLabel: 'Cancel'
+        cancelLabel: 'Cancel',
+        chunkUploadUrl: '',
+        uploadProgressUrl: '',
+        chunkSize: 1048576
     },
 
     getFormId: function() {
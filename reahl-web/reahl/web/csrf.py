@@ -86,6 +86,26 @@ class CSRFTokenField(Field):
 
 
 class CSRFToken:
+    """A token proving that a form was rendered by this site for the current session.
+
+       .. versionchanged:: 7.1
+          Signatures are now HMAC-SHA256, computed from a keyed HMAC that is only created once per `web.csrf_key`.
+          A token remembers its signed string. While `web.csrf_accept_sha1_tokens` is True, tokens signed with
+          HMAC-SHA1 (by earlier versions) are still accepted, and match a token created with a `legacy_value`.
+    """
+    keyed_hmacs = {}  # (csrf_key, digest name) -> an HMAC object already fed the key, to be copied
+
+    @classmethod
+    def new_hmac(cls, message_string, digestmod=hashlib.sha256):
+        key = ExecutionContext.get_context().config.web.csrf_key
+        try:
+            keyed_hmac = cls.keyed_hmacs[(key, digestmod)]
+        except KeyError:
+            keyed_hmac = cls.keyed_hmacs.setdefault((key, digestmod), hmac.new(key.encode('utf-8'), digestmod=digestmod))
+        message_hmac = keyed_hmac.copy()
+        message_hmac.update(message_string.encode('utf-8'))
+        return message_hmac
+
     @classmethod
     def from_coded_string(cls, signed_string):
         try:
@@ -98,6 +118,9 @@ class CSRFToken:
 
         computed_signature = cls.sign_timed_value(received_value_string, received_timestamp_string)
         is_signature_valid = hmac.compare_digest(received_signature.encode('utf-8'), computed_signature.encode('utf-8'))
+        if not is_signature_valid and cls.accepts_sha1_tokens():
+            computed_signature = cls.sign_timed_value(received_value_string, received_timestamp_string, digestmod=hashlib.sha1)
+            is_signature_valid = hmac.compare_digest(received_signature.encode('utf-8'), computed_signature.encode('utf-8'))
         if not is_signature_valid:
             raise InvalidCSRFToken('Invalid signature')
 
@@ -131,19 +154,27 @@ class CSRFToken:
         return '%s:%s' % (cls.encode_string(value_string), cls.encode_string(timestamp_string))
 
     @classmethod
-    def sign_timed_value(cls, value_string, timestamp_string):
+    def sign_timed_value(cls, value_string, timestamp_string, digestmod=hashlib.sha256):
         timed_value = cls.get_delimited_encoded_string(value_string, timestamp_string)
-        key = ExecutionContext.get_context().config.web.csrf_key
-        return hmac.new(key.encode('utf-8'), msg=timed_value.encode('utf-8'), digestmod=hashlib.sha1).hexdigest()
+        return cls.new_hmac(timed_value, digestmod=digestmod).hexdigest()
+
+    @classmethod
+    def accepts_sha1_tokens(cls):
+        return ExecutionContext.get_context().config.web.csrf_accept_sha1_tokens
 
-    def __init__(self, value=None, timestamp=None):
+    def __init__(self, value=None, timestamp=None, legacy_value=None):
         self.value = value or hashlib.sha1(os.urandom(64)).hexdigest()
+        self.legacy_value = legacy_value
         self.timestamp = timestamp if timestamp else self.get_now().timestamp()
+        self.signed_string = None  # (value, timestamp, signed string) as last computed
 
     def as_signed_string(self):
-        timestamp_string = repr(self.timestamp)
-        signature = self.sign_timed_value(self.value, timestamp_string)
-        return '%s:%s' % (self.get_delimited_encoded_string(self.value, timestamp_string), signature)
+        if not (self.signed_string and self.signed_string[:2] == (self.value, self.timestamp)):
+            timestamp_string = repr(self.timestamp)
+            signature = self.sign_timed_value(self.value, timestamp_string)
+            self.signed_string = (self.value, self.timestamp,
+                                  '%s:%s' % (self.get_delimited_encoded_string(self.value, timestamp_string), signature))
+        return self.signed_string[2]
 
     def is_expired(self):
         now = self.get_now()
@@ -152,4 +183,6 @@ class CSRFToken:
         return self.timestamp < cutoff_timestamp
 
     def matches(self, other):
-        return hmac.compare_digest(self.value, other.value)
\ No newline at end of file
+        if hmac.compare_digest(self.value, other.value):
+            return True
+        return bool(self.legacy_value) and hmac.compare_digest(self.legacy_value, other.value)
\ No newline at end of file
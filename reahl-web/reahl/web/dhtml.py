@@ -24,8 +24,6 @@ import io
 import html.parser
 import logging
 
-from bs4 import BeautifulSoup, SoupStrainer
-
 from reahl.component.modelinterface import Field
 from reahl.component.exceptions import ProgrammerError
 from reahl.component.i18n import Catalogue
@@ -48,6 +46,7 @@ class DHTMLFile:
         self.orignal_encoding = None
         
     def read(self):
+        from bs4 import BeautifulSoup, SoupStrainer
         with io.open(self.filename, 'rb') as dhtml_file:
             def strain(name, attrs):
                 if name == 'title':
@@ -34,7 +34,19 @@ class WebConfig(Configuration):
     static_root = ConfigSetting(default=os.getcwd(),
                                 description='The directory from which static files will be served',
                                 dangerous=True)
+    static_file_recheck_seconds = ConfigSetting(default=0,
+                                                description='The time (in seconds) for which a file served from static_root is assumed not to have changed on disk')
+    compress_static_files = ConfigSetting(default=False,
+                                          description='If True, gzip (and brotli, if installed) compressed copies of the static files of front end libraries are served to browsers that accept them; copies written by "reahl exportstatics" are used if present, else copies are created at startup (and kept in minified_files_cache_directory, if set)')
+    static_files_url = ConfigSetting(default='/static',
+                                     description='The URL (or a CDN URL) under which pages refer to the static files of front end libraries')
+    static_files_manifest = ConfigSetting(default=None,
+                                          description='The path of a manifest written by "reahl exportstatics"; if set, pages refer to the content hashed names of static files listed in it')
+    minified_files_cache_directory = ConfigSetting(default=None,
+                                                   description='If set, a directory in which minified, concatenated (and compressed) static files are kept so that they can be reused by all processes (even after restarts)')
     frontend_libraries = ConfigSetting(description='A collection of front end libraries to include on pages')
+    bundle_frontend_libraries = ConfigSetting(default=False,
+                                              description='If True, the JavaScript and CSS files of each front end library are served minified in a single file that can be cached forever')
     session_key_name = ConfigSetting(default='reahl',
                                      description='The name of this site\'s cookie in a user\'s a browser')
     guest_key_name = ConfigSetting(default='reahl-guest',
@@ -80,6 +92,19 @@ class WebConfig(Configuration):
                              dangerous=True)
     csrf_timeout_seconds = ConfigSetting(default=60*15,
                                          description='Forms have to be submitted within this time (in seconds) after being rendered.')
+    csrf_accept_sha1_tokens = ConfigSetting(default=True,
+                                            description='Also accept CSRF tokens signed with HMAC-SHA1 by versions before 7.1 (switch this off once csrf_timeout_seconds have passed since upgrading)')
+    max_request_body_bytes = ConfigSetting(default=None,
+                                           description='If set, requests with a body (such as file uploads) larger than this (in bytes) are refused before being read')
+    partial_uploads_directory = ConfigSetting(default=None,
+                                              description='The directory where files uploaded in chunks are assembled (by default, a directory in the system temp directory). Only the user running the application may have access to it.')
+    max_chunked_upload_bytes = ConfigSetting(default=50*1024*1024,
+                                             description='The largest file (in bytes) that may be uploaded in chunks to a FileUploadInput. '
+                                                         'Once complete, such a file is kept like any other upload: unless web.webdeclarative.file_store_directory '
+                                                         'is set, it is read into memory as a whole and stored in the database in one go, so only raise '
+                                                         'this if file_store_directory is set')
+    warm_up_urls = ConfigSetting(default=[],
+                                 description='The URLs rendered by ReahlWSGIApplication.warm_up() (before worker processes are forked)')
 
     @property
     def secure_key_name(self):
@@ -20,23 +20,29 @@ Run 'reahl componentinfo reahl-web' for configuration information.
 """
 
 import atexit
+import shutil
 import inspect
 import json
 import logging
 import hashlib
 import mimetypes
+import stat
 import string
 import time
 import sys
 import threading
-from contextlib import contextmanager
+from contextlib import contextmanager, ExitStack
 from datetime import datetime
 import itertools
 import functools
+import gc
+import gzip
 import io
 import locale
+import mmap
 import os
 import os.path
+import posixpath
 import re
 import tempfile
 import warnings
@@ -52,15 +58,13 @@ except ImportError:
     except ImportError:
         raise ImportError('You are using a python version that does not support functools.cached_property. Please run "pip install cached-property"')
 
-import rjsmin
-import rcssmin
-
 from webob import Request, Response
 from webob.exc import HTTPException
 from webob.exc import HTTPForbidden
 from webob.exc import HTTPInternalServerError
 from webob.exc import HTTPMethodNotAllowed
 from webob.exc import HTTPNotFound
+from webob.exc import HTTPRequestEntityTooLarge
 from webob.exc import HTTPSeeOther
 from webob.request import DisconnectionError
 from webob.multidict import MultiDict
@@ -75,7 +79,7 @@ from reahl.component.exceptions import IsSubclass
 from reahl.component.exceptions import NotYetAvailable
 from reahl.component.exceptions import ProgrammerError
 from reahl.component.exceptions import arg_checks
-from reahl.component.i18n import Catalogue
+from reahl.component.i18n import Catalogue, SystemWideCatalogue
 from reahl.component.modelinterface import StandaloneFieldIndex, FieldIndex, Field, Event, ValidationConstraint,\
                                              Allowed, ExposedNames, Event, Action
 from reahl.web.csrf import InvalidCSRFToken, CSRFToken, ExpiredCSRFToken
@@ -968,6 +972,9 @@ class Widget:
                         the Widget will also merely be displayed to the user if the user can write to the Widget.
     """
     exists = True
+    required_libraries = []  #: The classes of :class:`~reahl.web.libraries.Library` instances this Widget needs on its page
+                             #: (only needed for Libraries that are not active by default)
+
     @classmethod
     def factory(cls, *widget_args, **widget_kwargs):
         """Obtains a Factory for this Widget. A Factory for this Widget is merely an object that will be used by the 
@@ -1257,6 +1264,23 @@ class Widget:
             for widget in child.contained_widgets():
                 yield widget
 
+    @cached_property
+    def all_required_libraries(self):
+        if not self.visible:
+            return set()
+        required_libraries = set(self.required_libraries)
+        for child in self.children:
+            required_libraries.update(child.all_required_libraries)
+        return required_libraries
+
+    def is_library_required(self, library):
+        """Answers whether the given :class:`~reahl.web.libraries.Library` is required by this Widget, or by any
+           Widget it contains.
+
+           .. versionadded:: 7.1
+        """
+        return any(isinstance(library, library_class) for library_class in self.all_required_libraries)
+
     @property
     def is_runtime_checking_enabled(self):
         config = ExecutionContext.get_context().config
@@ -1335,6 +1359,59 @@ class Widget:
         return container[0]
 
 
+class LazyWidget(Widget):
+    """A placeholder for a Widget that is only created (using `widget_factory`) once it is actually needed.
+
+       The Widget is created the first time its contents are needed: to be rendered, to compute its
+       concurrency hash, to process input or to find its contained Widgets. If the LazyWidget is not
+       visible (as determined by its own `read_check` and `write_check`), the Widget is never created
+       at all. This saves having to build large subtrees that will not be shown to the current user.
+
+       Note that the created Widget cannot contain :class:`~reahl.web.ui.Slot` s, and that SubResources
+       (such as those of a Form) contained in a LazyWidget only exist once it has been created.
+
+       :param view: (See :class:`Widget`.)
+       :param widget_factory: A :class:`WidgetFactory` for the Widget to create once it is needed.
+       :keyword read_check: (See :class:`Widget`.)
+       :keyword write_check: (See :class:`Widget`.)
+
+       .. versionadded:: 7.1
+    """
+    def __init__(self, view, widget_factory, read_check=None, write_check=None):
+        self.widget_factory = widget_factory
+        self.created_widget = None
+        super().__init__(view, read_check=read_check, write_check=write_check)
+
+    @property
+    def children(self):
+        if self.created_widget is None and self.visible:
+            self.created_widget = self.widget_factory.create(self.view)
+            self._children.append(self.created_widget)
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+
+    @property
+    def is_created(self):
+        """Answers whether the Widget this LazyWidget stands in for has been created yet."""
+        return self.created_widget is not None
+
+    @property
+    def available_slots(self):
+        return {}
+
+    def attach_out_of_bound_widgets(self, widgets):
+        if self.is_created:
+            super().attach_out_of_bound_widgets(widgets)
+
+    def get_out_of_bound_container(self):
+        if self.is_created:
+            return super().get_out_of_bound_container()
+        return None
+
+
 class ErrorWidget(Widget):
     query_fields = ExposedNames()
     query_fields.error_message = lambda i: Field(default=_('An error occurred'))
@@ -2106,6 +2183,14 @@ class Resource:
     def should_commit(self):
         return True
 
+    @property
+    def may_read_from_replica(self):
+        """Whether the database reads of this Resource may be sent to a read replica of the database.
+
+           .. versionadded:: 7.1
+        """
+        return False
+
     @property
     def http_methods(self):
         regex = re.compile(r'handle_(?!(request)$)([a-z]+)?')
@@ -2361,12 +2446,22 @@ class WidgetResult(MethodResult):
        A JavaScript `<script>` tag is rendered also, containing the JavaScript activating code for the 
        new contents of this refreshed Widget.
 
+       If the browser sends the content hashes of what it currently displays (as a JSON object in the
+       `__reahl_rendered_hashes__` argument), only the Widgets whose rendered contents differ are sent
+       back. Those that are unchanged are listed by css_id under `unchanged` instead, and the hashes of
+       all rendered Widgets are sent under `hashes`.
+
        .. versionchanged:: 6.1
           result_widget parameter changed to be a list, renamed to result_widgets.
           Deprecated kwarg as_json_and_result
        .. versionchanged:: 7.0
           Removed kwarg as_json_and_result
+       .. versionchanged:: 7.1
+          Only send Widgets whose contents changed if the browser sends its content hashes.
+       .. versionchanged:: 7.1
+          Libraries that are not active, but required by a rendered Widget, are included with it.
     """
+    rendered_hashes_argument = '__reahl_rendered_hashes__'
 
     def __init__(self, result_widgets):
         if not isinstance(result_widgets, list):
@@ -2381,11 +2476,42 @@ class WidgetResult(MethodResult):
         for widget in self.result_widgets:
             widgets_to_render.add(widget)
             widgets_to_render.update(self.get_coactive_widgets_recursively(widget))
-        rendered_widgets = {widget.css_id: widget.render_contents() + widget.render_contents_js()
+        rendered_widgets = {widget.css_id: self.render_required_libraries(widget) + widget.render_contents() + widget.render_contents_js()
                             for widget in widgets_to_render}
         success = exception is None
         report_exception = str(exception) if exception and not exception.handled_inline else ''
-        return json.dumps({ 'success': success, 'exception': report_exception, 'result': rendered_widgets })
+        json_result = { 'success': success, 'exception': report_exception, 'result': rendered_widgets }
+
+        client_hashes = self.get_client_content_hashes()
+        if client_hashes is not None:
+            content_hashes = {css_id: self.hash_contents(contents) for css_id, contents in rendered_widgets.items()}
+            unchanged = sorted([css_id for css_id, content_hash in content_hashes.items()
+                                if client_hashes.get(css_id) == content_hash])
+            json_result['result'] = {css_id: contents for css_id, contents in rendered_widgets.items()
+                                     if css_id not in unchanged}
+            json_result['unchanged'] = unchanged
+            json_result['hashes'] = content_hashes
+        return json.dumps(json_result)
+
+    def render_required_libraries(self, widget):
+        # Libraries that are not active may not have been included on the page the widget now appears on
+        config = ExecutionContext.get_context().config
+        return ''.join([library.inline_material() for library in config.web.frontend_libraries
+                        if not library.active and widget.is_library_required(library)])
+
+    def get_client_content_hashes(self):
+        request = ExecutionContext.get_context().request
+        hashes_string = request.params.get(self.rendered_hashes_argument, None)
+        if hashes_string is None:
+            return None
+        try:
+            client_hashes = json.loads(hashes_string)
+        except ValueError:
+            return {}
+        return client_hashes if isinstance(client_hashes, dict) else {}
+
+    def hash_contents(self, contents):
+        return hashlib.md5(contents.encode('utf-8')).hexdigest()
 
     def get_coactive_widgets_recursively(self, widget):
         ancestral_widgets = []
@@ -2438,6 +2564,10 @@ class RemoteMethod(SubResource):
                         a RemoteMethod is accessible via http 'get' if it is idempotent, else by 'post'. This behaviour can be 
                         overridden by specifying an http method explicitly using the `method` keyword argument.
        :keyword disable_csrf_check: Pass True to prevent this RemoteMethod from doing the usual CSRF check.
+       :keyword read_from_replica: Whether the reads of this method may be sent to a read replica of the database
+                                   (if one is configured). By default, only immutable methods read from the replica.
+                                   Pass False for an immutable method that needs to see changes committed very recently,
+                                   since a replica may lag behind the primary database.
 
         .. versionchanged:: 5.0
            idempotent and immutable kwargs split up into two and better defined.
@@ -2448,14 +2578,18 @@ class RemoteMethod(SubResource):
         .. versionchanged:: 5.2
            disable_csrf_check keyword argument added.
 
+        .. versionchanged:: 7.1
+           read_from_replica keyword argument added.
+
     """
     sub_regex = 'method'
     sub_path_template = 'method'
 
-    def __init__(self, view, name, callable_object, default_result, idempotent=False, immutable=False, method=None, disable_csrf_check=False):
+    def __init__(self, view, name, callable_object, default_result, idempotent=False, immutable=False, method=None, disable_csrf_check=False, read_from_replica=None):
         super().__init__(view, name)
         self.idempotent = idempotent or immutable
         self.immutable = immutable
+        self.read_from_replica = immutable if read_from_replica is None else read_from_replica
         self.callable_object = callable_object
         self.default_result = default_result
         self.caught_exception = None
@@ -2467,6 +2601,10 @@ class RemoteMethod(SubResource):
     def should_commit(self):
         return ((self.caught_exception is None) or getattr(self.caught_exception, 'commit', False)) and (not self.immutable)
 
+    @property
+    def may_read_from_replica(self):
+        return self.immutable and self.read_from_replica
+
     @property
     def name(self):
         return self.unique_name
@@ -2634,6 +2772,10 @@ class ComposedPage(Resource):
     @property
     def should_commit(self):
         return False
+
+    @property
+    def may_read_from_replica(self):
+        return True
         
     def handle_get(self, request):
         internal_redirect = getattr(request, 'internal_redirect', None)
@@ -2672,12 +2814,16 @@ class FileView(View):
 
 
 class ViewableFile:
+    immutable = False
+    content_encoding = None
+    compressible_mime_types = ['application/javascript', 'text/javascript', 'application/json', 'application/xml', 'image/svg+xml']
     def __init__(self, name, size, mtime, mime_type=None, encoding=None):
         self.name = name
         self.mime_type = mime_type or self.guess_mime_type(name)
         self.encoding = encoding or self.guess_encoding(name, self.mime_type)
         self.mtime = mtime
         self.size = size
+        self.generated_variants = None
 
     def guess_mime_type(self, filename):
         mime_type, encoding = mimetypes.guess_type(filename)
@@ -2694,18 +2840,64 @@ class ViewableFile:
     def is_text(self, mime_type):
         return mime_type and mime_type.startswith('text/')
 
+    @property
+    def disk_path(self):
+        """The path of this file on disk, if it can be read directly from disk, else None."""
+        return None
+
+    @property
+    def is_compressible(self):
+        return self.is_text(self.mime_type) or self.mime_type in self.compressible_mime_types
+
+    @property
+    def compressed_variants(self):
+        """A list of :class:`CompressedFile`\s with the contents of this file, in order of preference.
+
+           These are the variants generated by :meth:`generate_compressed_variants`, or else those
+           found next to this file on disk (such as those written by `reahl exportstatics`).
+        """
+        if self.generated_variants is not None:
+            return self.generated_variants
+        return self.found_variants
+
+    @cached_property
+    def found_variants(self):
+        if self.disk_path:
+            return CompressedFile.find_next_to(self, self.disk_path)
+        return []
+
+    def generate_compressed_variants(self, cache_directory=None):
+        """Creates compressed copies of this file to be used as its :attr:`compressed_variants`.
+
+           Nothing is created if compressed variants were found next to this file on disk. The copies
+           are kept in `cache_directory` (where other processes can reuse them) if given, else in
+           temporary files.
+        """
+        if self.is_compressible and not self.found_variants:
+            if cache_directory:
+                create_variant = functools.partial(CompressedFile.create_cached_for, cache_directory=cache_directory)
+            else:
+                create_variant = CompressedFile.create_temp_for
+            self.generated_variants = [create_variant(self, content_encoding)
+                                       for content_encoding in CompressedFile.supported_content_encodings()]
+
 
 class FileOnDisk(ViewableFile):
-    def __init__(self, full_path, relative_name):
+    missing = False  #: Set when the file could not be opened anymore
+    def __init__(self, full_path, relative_name, stat_result=None):
 
         self.full_path = full_path
         self.relative_name = relative_name
-        st = os.stat(full_path)
+        st = stat_result or os.stat(full_path)
         super().__init__(
             full_path,
             st.st_size,
             st.st_mtime)
 
+    @property
+    def disk_path(self):
+        return self.full_path
+
     @contextmanager
     def open(self):
         open_file = io.open(self.full_path, mode='rb')
@@ -2737,8 +2929,9 @@ class PackagedFile(ViewableFile):
 
         path = pathlib.Path(relative_name)
         with self.extracted_file() as path:
-            size = path.stat().st_size
-            mtime = path.stat().st_mtime
+            st = path.stat()
+            size = st.st_size
+            mtime = st.st_mtime
 
         super().__init__(path.name, size, mtime)
 
@@ -2751,46 +2944,77 @@ class PackagedFile(ViewableFile):
              path.open(mode=mode, **arguments) as open_file:
                 yield open_file
 
+    @cached_property
+    def disk_path(self):
+        ref = importlib_resources.files(self.package_name) / self.relative_name
+        if isinstance(ref, pathlib.Path) and ref.is_file():
+            return str(ref)
+        return None
+
     @contextmanager
     def extracted_file(self):
-        ref = importlib_resources.files(self.package_name) / self.relative_name
-        with importlib_resources.as_file(ref) as path:
-            yield path
+        if self.disk_path:
+            yield pathlib.Path(self.disk_path)
+        else:
+            ref = importlib_resources.files(self.package_name) / self.relative_name
+            with importlib_resources.as_file(ref) as path:
+                yield path
 
 
 class ConcatenatedFile(FileOnDisk):
+    """A file on disk containing the (minified) contents of the ViewableFiles in `contents`, one after the other.
+
+       If `web.minified_files_cache_directory` is set, the result is kept in that directory, named after
+       a hash of the contents of the files and the minifiers used on them. Processes that start later
+       (or other processes on the same host) then reuse it instead of minifying everything again.
+
+       .. versionchanged:: 7.1
+          Added caching of results in `web.minified_files_cache_directory`.
+    """
     def __init__(self, relative_name, contents):
-        self.temp_file = self.concatenate(relative_name, contents)
-        super().__init__(self.temp_file.name, relative_name)
+        cache_directory = ExecutionContext.get_context().config.web.minified_files_cache_directory
+        if cache_directory:
+            full_path = self.cached_concatenation(cache_directory, relative_name, contents)
+        else:
+            self.temp_file = self.concatenate(relative_name, contents)
+            full_path = self.temp_file.name
+        super().__init__(full_path, relative_name)
      
-    def minifier(self, relative_name):
+    def minifier(self, relative_name, already_minified=False):
         class NoOpMinifier:
+            version = 'none'
             def minify(self, input_stream, output_stream):
                 for line in input_stream:
                     output_stream.write(line)
-        
-        class JSMinifier:
-            def minify(self, input_stream, output_stream):
-                text = io.StringIO()
-                for line in input_stream:
-                    text.write(line)
-
-                output_stream.write(rjsmin.jsmin(text.getvalue()))
-
-        class CSSMinifier:
-            def minify(self, input_stream, output_stream):
-                text = io.StringIO()
-                for line in input_stream:
-                    text.write(line)
-                output_stream.write(rcssmin.cssmin(text.getvalue()))
 
         context = ExecutionContext.get_context()
-        if context.config.reahlsystem.debug:
+        if context.config.reahlsystem.debug or already_minified:
             return NoOpMinifier()
 
         if relative_name.endswith('.css'):
+            import rcssmin
+
+            class CSSMinifier:
+                version = 'rcssmin-%s' % rcssmin.__version__
+                def minify(self, input_stream, output_stream):
+                    text = io.StringIO()
+                    for line in input_stream:
+                        text.write(line)
+                    output_stream.write(rcssmin.cssmin(text.getvalue()))
+
             return CSSMinifier()
         elif relative_name.endswith('.js'):
+            import rjsmin
+
+            class JSMinifier:
+                version = 'rjsmin-%s' % rjsmin.__version__
+                def minify(self, input_stream, output_stream):
+                    text = io.StringIO()
+                    for line in input_stream:
+                        text.write(line)
+
+                    output_stream.write(rjsmin.jsmin(text.getvalue()))
+
             return JSMinifier()
         else:
             return NoOpMinifier()
@@ -2810,14 +3034,218 @@ class ConcatenatedFile(FileOnDisk):
 
         return open_file
 
+    def is_minified(self, inner_file):
+        return '.min.' in pathlib.Path(inner_file.relative_name).name
+
+    def separator(self, relative_name):
+        return ''
+
+    def prepared_contents(self, relative_name, inner_file, opened_inner_file):
+        return opened_inner_file
+
     def concatenate(self, relative_name, contents):
         temp_file = self.create_temp_file(relative_name)
-        for inner_file in contents:
-            with inner_file.open(mode='r') as opened_inner_file:
-                self.minifier(relative_name).minify(opened_inner_file, temp_file)
-        temp_file.flush()
+        self.write_concatenation(relative_name, contents, temp_file)
         return temp_file
 
+    def write_concatenation(self, relative_name, contents, output_file):
+        for index, inner_file in enumerate(contents):
+            if index > 0:
+                output_file.write(self.separator(relative_name))
+            with inner_file.open(mode='r') as opened_inner_file:
+                self.minifier(relative_name, already_minified=self.is_minified(inner_file)).minify(self.prepared_contents(relative_name, inner_file, opened_inner_file), output_file)
+        output_file.flush()
+
+    def cache_key(self, relative_name, contents):
+        key = hashlib.sha256(self.separator(relative_name).encode('utf-8'))
+        for inner_file in contents:
+            key.update(self.minifier(relative_name, already_minified=self.is_minified(inner_file)).version.encode('utf-8'))
+            content_hash = hashlib.sha256()
+            with inner_file.open() as opened_inner_file:
+                for block in iter(functools.partial(opened_inner_file.read, 65536), b''):
+                    content_hash.update(block)
+            key.update(content_hash.digest())
+        return key.hexdigest()
+
+    def cached_concatenation(self, cache_directory, relative_name, contents):
+        extension = os.path.splitext(relative_name)[1]
+        cached_path = os.path.join(cache_directory, '%s%s' % (self.cache_key(relative_name, contents), extension))
+        if not os.path.isfile(cached_path):
+            os.makedirs(cache_directory, exist_ok=True)
+            (file_handle, temp_path) = tempfile.mkstemp(suffix=extension, dir=cache_directory)
+            try:
+                with open(file_handle, 'w') as output_file:
+                    self.write_concatenation(relative_name, contents, output_file)
+                os.replace(temp_path, cached_path)  # atomic, so other processes never see a partly written file
+            except:
+                os.remove(temp_path)
+                raise
+        return cached_path
+
+
+class BundledFile(ConcatenatedFile):
+    """A ConcatenatedFile of JavaScript or CSS files with a hash of its contents in its name.
+
+       Because its name changes whenever its contents change, a BundledFile can be cached
+       by browsers (and proxies) forever.
+
+       A BundledFile is not served from the directory of each file it includes. Relative `url(...)`
+       references in CSS are thus rewritten to be relative to `relative_name`. Source map comments
+       are removed, since the source map of one file does not map the BundledFile.
+
+       .. versionadded:: 7.1
+    """
+    immutable = True
+    source_map_comment = re.compile(r'^[ \t]*(//[#@][ \t]*sourceMappingURL=.*|/\*[#@][ \t]*sourceMappingURL=[^*]*\*/)[ \t]*$', re.MULTILINE)
+    css_url = re.compile(r'''url\(\s*(['"]?)([^'"()\s]+)\1\s*\)''')
+
+    def __init__(self, relative_name, contents):
+        super().__init__(relative_name, contents)
+        self.relative_name = self.content_hashed_name(relative_name)
+
+    def separator(self, relative_name):
+        return ';\n' if relative_name.endswith('.js') else '\n'
+
+    def prepared_contents(self, relative_name, inner_file, opened_inner_file):
+        text = self.source_map_comment.sub('', opened_inner_file.read())
+        if relative_name.endswith('.css'):
+            text = self.css_url.sub(functools.partial(self.relocated_url, relative_name, inner_file.relative_name), text)
+        return io.StringIO(text)
+
+    @classmethod
+    def relocated_url(cls, relative_name, inner_relative_name, match):
+        quote, url = match.group(1), match.group(2)
+        if url.startswith(('/', '#')) or re.match(r'[a-zA-Z][a-zA-Z0-9+.-]*:', url):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(inner_relative_name), url))
+        return 'url(%s%s%s)' % (quote, posixpath.relpath(target, posixpath.dirname(relative_name) or '.'), quote)
+
+    def cache_key(self, relative_name, contents):
+        # What a BundledFile contains also depends on where it and the files it includes are served from
+        key = hashlib.sha256(('bundled:%s' % super().cache_key(relative_name, contents)).encode('utf-8'))
+        for name in [relative_name]+[inner_file.relative_name for inner_file in contents]:
+            key.update(posixpath.dirname(name).encode('utf-8')+b'\0')
+        return key.hexdigest()
+
+    def content_hashed_name(self, relative_name):
+        content_hash = hashlib.sha256()
+        with self.open() as open_file:
+            for block in iter(functools.partial(open_file.read, 65536), b''):
+                content_hash.update(block)
+        return self.name_with_hash(relative_name, content_hash)
+
+    @classmethod
+    def name_with_hash(cls, relative_name, content_hash):
+        stem, extension = os.path.splitext(relative_name)
+        return '%s-%s%s' % (stem, content_hash.hexdigest()[:16], extension)
+
+
+class CompressedFile(FileOnDisk):
+    """A copy of `original_file` on disk at `full_path`, compressed using `content_encoding` ('br' or 'gzip').
+
+       Brotli ('br') compression is only available if the brotli package is installed.
+
+       A CompressedFile has the modification time of `original_file`, so that all processes serving it
+       agree on its Last-Modified and ETag headers.
+
+       .. versionadded:: 7.1
+    """
+    extensions = {'br': '.br', 'gzip': '.gz'}
+    brotli_quality = 11  #: Used for files compressed ahead of time, such as by `reahl exportstatics`
+    gzip_level = 9  #: Used for files compressed ahead of time, such as by `reahl exportstatics`
+    runtime_brotli_quality = 5  #: Used for files compressed while an application starts up
+    runtime_gzip_level = 6  #: Used for files compressed while an application starts up
+
+    @classmethod
+    def get_brotli(cls):
+        try:
+            import brotli
+        except ImportError:
+            return None
+        return brotli
+
+    @classmethod
+    def supported_content_encodings(cls):
+        return (['br'] if cls.get_brotli() else []) + ['gzip']
+
+    @classmethod
+    def compress(cls, original_file, content_encoding, output_file, at_runtime=False):
+        with original_file.open() as input_file:
+            if content_encoding == 'br':
+                quality = cls.runtime_brotli_quality if at_runtime else cls.brotli_quality
+                output_file.write(cls.get_brotli().compress(input_file.read(), quality=quality))
+            else:
+                level = cls.runtime_gzip_level if at_runtime else cls.gzip_level
+                with gzip.GzipFile(filename='', mode='wb', compresslevel=level, fileobj=output_file, mtime=0) as compressed_file:
+                    shutil.copyfileobj(input_file, compressed_file)
+
+    @classmethod
+    def write_next_to(cls, full_path, content_bytes, content_encoding):
+        """Writes `content_bytes`, compressed using `content_encoding`, to a file next to `full_path`."""
+        variant_path = full_path+cls.extensions[content_encoding]
+        with io.open(variant_path, mode='wb') as output_file:
+            cls.compress(FileFromBlob(full_path, content_bytes, None, None, len(content_bytes), 0), content_encoding, output_file)
+        return variant_path
+
+    @classmethod
+    def create_temp_for(cls, original_file, content_encoding):
+        (file_handle, path) = tempfile.mkstemp(suffix=cls.extensions[content_encoding])
+        with io.open(file_handle, mode='wb') as output_file:
+            cls.compress(original_file, content_encoding, output_file, at_runtime=True)
+        atexit.register(os.remove, path)
+        return cls(original_file, path, content_encoding)
+
+    @classmethod
+    def cache_key(cls, original_file, content_encoding):
+        key = hashlib.sha256(('%s-%s-%s' % (content_encoding, cls.runtime_brotli_quality, cls.runtime_gzip_level)).encode('utf-8'))
+        with original_file.open() as input_file:
+            for block in iter(functools.partial(input_file.read, 64*1024), b''):
+                key.update(block)
+        return key.hexdigest()
+
+    @classmethod
+    def create_cached_for(cls, original_file, content_encoding, cache_directory):
+        extension = cls.extensions[content_encoding]
+        cached_path = os.path.join(cache_directory, '%s%s' % (cls.cache_key(original_file, content_encoding), extension))
+        if not os.path.isfile(cached_path):
+            os.makedirs(cache_directory, exist_ok=True)
+            (file_handle, temp_path) = tempfile.mkstemp(suffix=extension, dir=cache_directory)
+            try:
+                with io.open(file_handle, mode='wb') as output_file:
+                    cls.compress(original_file, content_encoding, output_file, at_runtime=True)
+                os.replace(temp_path, cached_path)  # atomic, so other processes never see a partly written file
+            except:
+                os.remove(temp_path)
+                raise
+        return cls(original_file, cached_path, content_encoding)
+
+    @classmethod
+    def find_next_to(cls, original_file, full_path):
+        variants = []
+        for content_encoding in cls.supported_content_encodings():
+            variant_path = full_path+cls.extensions[content_encoding]
+            try:
+                st = os.stat(variant_path)
+            except OSError:
+                continue
+            if st.st_mtime >= original_file.mtime:
+                variants.append(cls(original_file, variant_path, content_encoding, stat_result=st))
+        return variants
+
+    def __init__(self, original_file, full_path, content_encoding, stat_result=None):
+        self.original_file = original_file
+        self.full_path = full_path
+        self.relative_name = original_file.relative_name
+        self.content_encoding = content_encoding
+        st = stat_result or os.stat(full_path)
+        ViewableFile.__init__(self, original_file.name, st.st_size, original_file.mtime,
+                              mime_type=original_file.mime_type, encoding=original_file.encoding)
+        self.immutable = original_file.immutable
+
+    @property
+    def compressed_variants(self):
+        return []
+
 
 class FileFactory(Factory):
     def create_file(self, relative_path):
@@ -2828,19 +3256,73 @@ class FileList(FileFactory):
     def __init__(self, files):
         super().__init__(self.create_file)
         self.files = files
+
+    @cached_property
+    def files_by_relative_name(self):
+        files_by_relative_name = {}
+        for file_ in self.files:
+            files_by_relative_name.setdefault(file_.relative_name, file_)
+        return files_by_relative_name
         
     def create_file(self, relative_path):
         path = relative_path[1:]
-        for file_ in self.files:
-            if file_.relative_name == path:
-                return file_
-        raise NoMatchingFactoryFound(relative_path)
+        try:
+            return self.files_by_relative_name[path]
+        except KeyError:
+            raise NoMatchingFactoryFound(relative_path)
+
+
+class FileOnDiskCache:
+    """The FileOnDisk instances created by DiskDirectories, kept for reuse by later requests.
+
+       Each ReahlWSGIApplication has its own. Only the `max_entries` most recently used files are kept.
+
+       .. versionadded:: 7.1
+    """
+    max_entries = 10000
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or self.max_entries
+        self.entries = OrderedDict()  # full_path -> (time checked, FileOnDisk)
+        self.lock = threading.Lock()
+
+    def get(self, full_path):
+        with self.lock:
+            try:
+                self.entries.move_to_end(full_path)
+                return self.entries[full_path]
+            except KeyError:
+                return (None, None)
+
+    def put(self, full_path, checked_at, file_on_disk):
+        with self.lock:
+            self.entries[full_path] = (checked_at, file_on_disk)
+            self.entries.move_to_end(full_path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def remove(self, full_path):
+        with self.lock:
+            self.entries.pop(full_path, None)
+
+    def __len__(self):
+        return len(self.entries)
 
 
 class DiskDirectory(FileFactory):
-    def __init__(self, root_path):
+    """Serves the files found in a directory (relative to `web.static_root`).
+
+       A FileOnDisk, once created, is kept in a :class:`FileOnDiskCache` (by default, the one of the
+       ReahlWSGIApplication serving the current request). It is reused for as long as
+       `web.static_file_recheck_seconds` have not passed since its file was last checked, and after
+       that for as long as the file's modification time and size stay the same.
+
+       .. versionchanged:: 7.1
+          Added caching of FileOnDisk instances, and the file_cache keyword argument.
+    """
+    def __init__(self, root_path, file_cache=None):
         super().__init__(self.create_file)
         self.root_path = root_path
+        self.file_cache = file_cache
 
     def create_file(self, relative_path):
         path = relative_path[1:]
@@ -2849,16 +3331,59 @@ class DiskDirectory(FileFactory):
         relative_path = self.root_path.split('/')+path.split('/')
         full_path = os.path.join(static_root, *relative_path)
         logging.getLogger(__name__).debug('Request is for static file "%s"' % full_path)
-        if os.path.isfile(full_path):
-            return FileOnDisk(full_path, relative_path)
+        file_on_disk = self.find_file_on_disk(self.get_file_cache(context), full_path, relative_path, context.config.web.static_file_recheck_seconds)
+        if file_on_disk:
+            return file_on_disk
         raise NoMatchingFactoryFound(relative_path)
 
+    def get_file_cache(self, context):
+        if self.file_cache is None:
+            self.file_cache = getattr(context, 'static_file_cache', None) or FileOnDiskCache()
+        return self.file_cache
+
+    def find_file_on_disk(self, file_cache, full_path, relative_path, recheck_seconds):
+        now = time.monotonic()
+        checked_at, cached_file = file_cache.get(full_path)
+        if cached_file and cached_file.missing:
+            cached_file = None
+        if cached_file and (now - checked_at) < recheck_seconds:
+            return cached_file
+
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            st = None
+        if not (st and stat.S_ISREG(st.st_mode)):
+            file_cache.remove(full_path)
+            return None
+
+        if not (cached_file and (cached_file.mtime, cached_file.size) == (st.st_mtime, st.st_size)):
+            cached_file = FileOnDisk(full_path, relative_path, stat_result=st)
+        file_cache.put(full_path, now, cached_file)
+        return cached_file
+
 
 class FileDownload(Response):
-    chunk_size = 4096
-    def __init__(self, a_file):
-        self.file = a_file 
+    """A Response that sends the contents of a :class:`ViewableFile`, supporting conditional and partial GETs.
+
+       Files that can be read directly from disk are sent using the `wsgi.file_wrapper` of the WSGI server
+       (if it has one), which lets the server use `sendfile`. Partial GETs of such files are served
+       from a memory map of the file.
+
+       .. versionchanged:: 7.1
+          Added use of `wsgi.file_wrapper` and memory mapped partial GETs; the chunk size now adapts to the size of the file.
+    """
+    chunk_size = None        #: If set, the size of chunks in which a file is read, else it is computed from the size of the file
+    min_chunk_size = 64*1024 #: The smallest size of chunk used when the chunk size is computed
+    max_chunk_size = 1024*1024 #: The largest size of chunk used when the chunk size is computed
+    def __init__(self, a_file, accept_encoding=None):
+        compressed_variants = a_file.compressed_variants
+        self.original_file = a_file
+        self.file = self.choose_variant(a_file, compressed_variants, accept_encoding)
+        self.disk_file = None
         super().__init__(app_iter=self, conditional_response=True)
+        if self.chunk_size is None:
+            self.chunk_size = self.compute_chunk_size()
         self.content_type = self.file.mime_type if self.file.mime_type else None
         self.charset = self.file.encoding if self.file.encoding else None
         self.content_length = str(self.file.size) if (self.file.size is not None) else None
@@ -2866,6 +3391,51 @@ class FileDownload(Response):
         self.etag = ('%s-%s-%s' % (self.file.mtime,
                                    self.file.size,
                                    abs(hash(self.file.name))))
+        if self.file.content_encoding:
+            self.content_encoding = self.file.content_encoding
+            self.etag = '%s-%s' % (self.etag, self.file.content_encoding)
+        if compressed_variants:
+            self.vary = ('Accept-Encoding',)
+        if self.file.immutable:
+            self.cache_control = 'public, max-age=31536000, immutable'
+
+    def choose_variant(self, a_file, compressed_variants, accept_encoding):
+        if not (compressed_variants and accept_encoding):
+            return a_file
+        variants_by_encoding = {variant.content_encoding: variant for variant in compressed_variants}
+        acceptable = accept_encoding.acceptable_offers([variant.content_encoding for variant in compressed_variants]+['identity'])
+        if acceptable:
+            best_encoding, quality = acceptable[0]
+            return variants_by_encoding.get(best_encoding, a_file)
+        return a_file
+
+    def compute_chunk_size(self):
+        return min(max((self.file.size or 0)//16, self.min_chunk_size), self.max_chunk_size)
+
+    def can_use_file_wrapper(self, environ):
+        conditional_headers = ['HTTP_RANGE', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE']
+        return 'wsgi.file_wrapper' in environ and self.file.disk_path \
+               and environ.get('REQUEST_METHOD', 'GET') == 'GET' \
+               and not any(header in environ for header in conditional_headers)
+
+    def __call__(self, environ, start_response):
+        if self.file.disk_path:
+            # Opened before the response starts, so that a file that disappeared can still be reported as not found
+            try:
+                self.disk_file = io.open(self.file.disk_path, mode='rb')
+            except OSError:
+                self.original_file.missing = self.file.missing = True
+                return HTTPNotFound()(environ, start_response)
+        self.uses_file_wrapper = self.can_use_file_wrapper(environ)
+        if self.uses_file_wrapper:
+            content_length = self.content_length
+            self.app_iter = environ['wsgi.file_wrapper'](self.disk_file, self.chunk_size)
+            self.content_length = content_length
+        return super().__call__(environ, start_response)
+
+    def close(self):
+        if self.disk_file:
+            self.disk_file.close()
 
     def __iter__(self):
         return self.app_iter_range(start=0)
@@ -2881,6 +3451,13 @@ class FileDownload(Response):
             return
         current = start or 0
 
+        if self.disk_file:
+            with self.disk_file as fileobj, \
+                 mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                for chunk_start in range(current, end+1, self.chunk_size):
+                    yield mapped_file[chunk_start:min(chunk_start+self.chunk_size, end+1)]
+            return
+
         with self.file.open() as fileobj:
             fileobj.seek(current)
             # Invariant: everything < current has been processed
@@ -2908,7 +3485,7 @@ class StaticFileResource(SubResource):
         self.file = a_file
 
     def handle_get(self, request):
-        return FileDownload(self.file)
+        return FileDownload(self.file, accept_encoding=request.accept_encoding)
 
 
 class MissingForm(Resource):
@@ -2947,6 +3524,64 @@ class IdentityDictionary:
     def __getitem__(self, x): return x
 
 
+class RequestScopedIterable:
+    """Iterates over the app_iter of a Response, and only leaves the scope of the request it belongs to
+       when it is closed by the WSGI server (or when done iterating)."""
+    def __init__(self, app_iter, request_scope):
+        self.app_iter = app_iter
+        self.request_scope = request_scope
+
+    def __iter__(self):
+        try:
+            for chunk in self.app_iter:
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        try:
+            if hasattr(self.app_iter, 'close'):
+                self.app_iter.close()
+        finally:
+            self.request_scope.close()
+
+
+class LimitedRequestBody:
+    """Wraps the `wsgi.input` of a request so that no more than `max_bytes` of it can be read: reading
+       more raises :class:`webob.exc.HTTPRequestEntityTooLarge`. (Needed for requests that do not state
+       their Content-Length upfront, such as chunked ones.)"""
+    chunk_size = 64*1024
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def limit_for(self, size):
+        remaining = self.max_bytes - self.bytes_read + 1 # One more byte than allowed, to notice when too much was sent
+        return remaining if size is None or size < 0 else min(size, remaining)
+
+    def counted(self, data):
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise HTTPRequestEntityTooLarge()
+        return data
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(iter(functools.partial(self.read, self.chunk_size), b''))
+        return self.counted(self.stream.read(self.limit_for(size)))
+
+    def readline(self, size=-1):
+        return self.counted(self.stream.readline(self.limit_for(size)))
+
+    def readlines(self, hint=-1):
+        return list(iter(self.readline, b''))
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
 class ReahlWSGIApplication:
     """A web application. This class should only ever be instantiated in a WSGI script, using the `from_directory`
        method.
@@ -2980,14 +3615,20 @@ class ReahlWSGIApplication:
         self.request_lock = threading.Lock()
         self.config = config
         self.system_control = SystemControl(self.config)
+        self.static_file_cache = FileOnDiskCache()
         with ExecutionContext(name='%s.__init__()' % self.__class__.__name__) as context:
             context.config = self.config
             context.system_control = self.system_control
             self.root_user_interface_factory = UserInterfaceFactory(None, RegexPath('/', '/', {}), IdentityDictionary(), self.config.web.site_root, 'site_root')
-            self.add_reahl_static_files()
+            self.static_files = self.add_reahl_static_files()
 
     def add_reahl_static_files(self):
         static_files = self.config.web.frontend_libraries.packaged_files()
+        if self.config.web.bundle_frontend_libraries:
+            static_files += self.config.web.frontend_libraries.bundled_files()
+        if self.config.web.compress_static_files:
+            for static_file in static_files:
+                static_file.generate_compressed_variants(cache_directory=self.config.web.minified_files_cache_directory)
         self.define_static_files('/static', static_files)
         return static_files
 
@@ -3009,6 +3650,53 @@ class ReahlWSGIApplication:
                 self.should_disconnect = True
         self.started = True
 
+    def warm_up(self, urls=None):
+        """Does all the once-off initialisation that would otherwise only happen lazily while the first
+           requests are being served: translations are loaded, static files are prepared and each of
+           `urls` is rendered once (which imports and initialises everything needed to render them).
+
+           Call this in a server's master process before it forks its worker processes, so that the workers
+           share the results (copy-on-write) instead of each doing the same work on its first requests.
+           If this ReahlWSGIApplication was not started yet, it is stopped again afterwards so that
+           no database connections are shared with forked processes.
+
+           :keyword urls: A list of URLs (paths) to render. Defaults to `web.warm_up_urls`.
+
+           Whatever rendering the URLs writes to the database (such as the UserSession created for
+           each request) is rolled back.
+
+           .. versionadded:: 7.1
+        """
+        urls = self.config.web.warm_up_urls if urls is None else urls
+        started_here = not self.started
+        if started_here:
+            self.start()
+        try:
+            with ExecutionContext(name='%s.warm_up()' % self.__class__.__name__) as context:
+                context.config = self.config
+                context.system_control = self.system_control
+                SystemWideCatalogue.get_instance().preload_supported_locales(self.config.reahlsystem.root_egg)
+                for static_file in self.static_files:
+                    static_file.compressed_variants
+                try:
+                    # The requests share the Session of this context, so what they write is rolled back with this transaction
+                    with self.system_control.nested_transaction() as veto:
+                        veto.should_commit = False
+                        for url in urls:
+                            response = Request.blank(url, charset='utf8').get_response(self)
+                            response.body  # Renders it all, and closes the request
+                            if response.status_int >= 400:
+                                logging.getLogger(__name__).warning('Warming up %s resulted in: %s' % (url, response.status))
+                finally:
+                    self.system_control.finalise_session()
+        finally:
+            if started_here:
+                self.stop()
+                self.started = False
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()  # So that the garbage collector in forked processes does not touch (and copy) these objects
+
     def stop(self):
         """Stops the ReahlWSGIApplication by "disconnecting" from the database. What "disconnecting" means may differ
            depending on the persistence mechanism in use."""
@@ -3103,58 +3791,94 @@ class ReahlWSGIApplication:
             raise ProgrammerError('%s is not started. Did you mean to set start_on_first_request=True?' % self)
         request = Request(environ, charset='utf8')
         context = self.create_context_for_request()
-        context.config = self.config
+        context.config = self.config.snapshot
         context.request = request
         context.system_control = self.system_control
-        with context, self.concurrency_manager:
-            with self.system_control.nested_transaction():
-                self.config.web.session_class.initialise_web_session_on(context)
-                context.session.set_last_activity_time()
+        context.static_file_cache = self.static_file_cache
+        request_scope = ExitStack()
+        request_scope.enter_context(context)
+        request_scope.enter_context(self.concurrency_manager)
+        try:
+            response = self.create_response(context, request)
+            app_iter = response(environ, start_response)
+        except:
+            request_scope.close()
+            raise
+
+        if getattr(response, 'uses_file_wrapper', False):
+            # The server streams the file itself, outside of our request handling
+            request_scope.close()
+            return app_iter
+        return RequestScopedIterable(app_iter, request_scope)
+
+    @contextmanager
+    def read_replica_routing_for(self, resource):
+        if resource and resource.may_read_from_replica:
+            with self.system_control.read_replica_routing():
+                yield
+        else:
+            yield
+
+    def create_response(self, context, request):
+        max_request_body_bytes = self.config.web.max_request_body_bytes
+        if max_request_body_bytes is not None:
+            if (request.content_length or 0) > max_request_body_bytes:
+                # Refused before the body (and any files in it) is spooled anywhere
+                return HTTPRequestEntityTooLarge()
+            if request.content_length is None and not request.is_body_seekable:
+                # Without a Content-Length (as when chunked), the body can only be limited while it is read
+                request.environ['wsgi.input'] = LimitedRequestBody(request.environ['wsgi.input'], max_request_body_bytes)
+
+        with self.system_control.nested_transaction():
+            self.config.web.session_class.initialise_web_session_on(context)
+            context.session.set_last_activity_time()
+        try:
             try:
-                try:
-                    with self.system_control.nested_transaction() as veto:
-                        veto.should_commit = False
-                        resource = None
-                        try:
-                            resource = self.resource_for(request)
+                with self.system_control.nested_transaction() as veto:
+                    veto.should_commit = False
+                    resource = None
+                    try:
+                        resource = self.resource_for(request)
+                        with self.read_replica_routing_for(resource):
                             response = resource.handle_request(request) 
-                            veto.should_commit = resource.should_commit
-                        except InternalRedirect as e:
-                            if resource:
-                                resource.cleanup_after_transaction()
-                            request.internal_redirect = e
-                            resource = self.resource_for(request)
+                        veto.should_commit = resource.should_commit
+                    except InternalRedirect as e:
+                        if resource:
+                            resource.cleanup_after_transaction()
+                        request.internal_redirect = e
+                        resource = self.resource_for(request)
+                        with self.read_replica_routing_for(resource):
                             response = resource.handle_request(request) 
-                            veto.should_commit = resource.should_commit
-                            if not veto.should_commit:
-                                context.config.web.session_class.preserve_session(context.session)
-                    if not veto.should_commit:
-                        context.config.web.session_class.restore_session(context.session) # Because the rollback above nuked it
-                    if resource:
-                        resource.cleanup_after_transaction()
+                        veto.should_commit = resource.should_commit
+                        if not veto.should_commit:
+                            context.config.web.session_class.preserve_session(context.session)
+                if not veto.should_commit:
+                    context.config.web.session_class.restore_session(context.session) # Because the rollback above nuked it
+                if resource:
+                    resource.cleanup_after_transaction()
                         
-                except HTTPException as e:
-                    response = e
-                except DisconnectionError as e:
-                    response = HTTPInternalServerError(unicode_body=str(e))
-                except CouldNotConstructResource as e:
-                    if self.config.reahlsystem.debug:
-                        raise e.__cause__ from None
-                    else:
-                        #TODO: constuct a fake view, and pass that in
-                        response = UncaughtError(e.current_view, e.root_ui, e.target_ui, e.__cause__)
-                except Exception as e:
-                    if self.config.reahlsystem.debug:
-                        raise e
-                    else:
-                        logging.getLogger(__name__).exception(e)
-                        response = UncaughtError(resource.view, resource.view.user_interface.root_ui, resource.view.user_interface, e)
-
-                context.session.set_session_key(response)
+            except HTTPException as e:
+                response = e
+            except DisconnectionError as e:
+                response = HTTPInternalServerError(unicode_body=str(e))
+            except CouldNotConstructResource as e:
+                if self.config.reahlsystem.debug:
+                    raise e.__cause__ from None
+                else:
+                    #TODO: constuct a fake view, and pass that in
+                    response = UncaughtError(e.current_view, e.root_ui, e.target_ui, e.__cause__)
+            except Exception as e:
+                if self.config.reahlsystem.debug:
+                    raise e
+                else:
+                    logging.getLogger(__name__).exception(e)
+                    response = UncaughtError(resource.view, resource.view.user_interface.root_ui, resource.view.user_interface, e)
+
+            context.session.set_session_key(response)
                 
-            finally:
-               self.system_control.finalise_session()
-               
-            for chunk in response(environ, start_response):
-                yield chunk
+        finally:
+           self.system_control.finalise_session()
+
+        self.config.web.session_class.after_commit(context, response)
+        return response
 
@@ -65,6 +65,15 @@ class UserSessionProtocol(object, metaclass=ABCMeta):
            to the response (such as setting a cookie with the ID of the current session).
         """
 
+    @classmethod
+    def after_commit(cls, context, response):
+        """Called at the end of a request loop, once the changes made to the database have been committed, to
+           enable an implementation to save anything (such as data kept outside of the database) that should
+           only be kept if those changes were.
+
+        .. versionadded:: 7.1
+        """
+
     @classmethod
     @abstractmethod
     def initialise_web_session_on(cls, context):
@@ -35,12 +35,17 @@ creating a :class:`Library` and configure your site to use it.
 
 """
 
+import concurrent.futures
+import hashlib
 import itertools
+import json
+import os
+import os.path
 from collections import OrderedDict
 
 from reahl.component.context import ExecutionContext
 from reahl.component.exceptions import ProgrammerError
-from reahl.web.fw import PackagedFile, ConcatenatedFile
+from reahl.web.fw import PackagedFile, BundledFile, CompressedFile
 
 
 class LibraryIndex:
@@ -59,6 +64,7 @@ class LibraryIndex:
     """
     def __init__(self, *libraries):
         self.libraries_by_name = OrderedDict()
+        self.manifests = {}
         for library in libraries:
             self.add(library)
 
@@ -89,6 +95,39 @@ class LibraryIndex:
     def packaged_files(self):
         return [i for i in itertools.chain(*[library.packaged_files() for library in self])]
 
+    def bundled_files(self):
+        """Returns the :class:`~reahl.web.fw.BundledFile` instances of all Libraries in this index.
+
+        .. versionadded:: 7.1
+        """
+        return [i for i in itertools.chain(*[library.bundled_files() for library in self])]
+
+    def export_to(self, destination_directory, include_bundles=False, compress=True, max_workers=None):
+        """Exports the files of all Libraries in this index to `destination_directory`, using a
+        :class:`StaticFilesExporter`.
+
+        :param destination_directory: The (new) directory to export to.
+        :keyword include_bundles: If True, also export the :class:`~reahl.web.fw.BundledFile` of each Library.
+        :keyword compress: If True, also write compressed variants of each exported file.
+        :keyword max_workers: The number of processes to use.
+
+        .. versionadded:: 7.1
+        """
+        static_files = self.packaged_files()
+        if include_bundles:
+            static_files += self.bundled_files()
+        exporter = StaticFilesExporter(destination_directory, compress=compress)
+        return exporter.export(static_files, max_workers=max_workers)
+
+    def get_manifest(self, manifest_path):
+        """Returns the :class:`StaticFilesManifest` read from `manifest_path`, reading it only once.
+
+        .. versionadded:: 7.1
+        """
+        if manifest_path not in self.manifests:
+            self.manifests[manifest_path] = StaticFilesManifest.read_from(manifest_path)
+        return self.manifests[manifest_path]
+
     def __iter__(self):
         return iter(self.libraries_by_name.values())
 
@@ -101,6 +140,104 @@ class LibraryIndex:
     def __str__(self):
         return  '%s(%s)' % (self.__class__.__name__, ','.join(self.libraries_by_name.keys()))
 
+
+class StaticFilesManifest:
+    """The names under which static files were exported by `reahl exportstatics`, keyed by
+    their logical names (their names relative to /static).
+
+    If `web.static_files_manifest` is set to the path of such a manifest, pages refer to the
+    exported names of files (relative to `web.static_files_url`) instead of their logical names.
+
+    :param exported_names: A dictionary mapping logical names to exported names.
+
+    .. versionadded:: 7.1
+    """
+    file_name = 'reahl-static-manifest.json'  #: The name of the manifest file written in the export directory
+    def __init__(self, exported_names=None):
+        self.exported_names = exported_names or {}
+
+    @classmethod
+    def read_from(cls, manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as manifest_file:
+            return cls(json.load(manifest_file)['files'])
+
+    def write_to(self, manifest_path):
+        with open(manifest_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump({'version': 1, 'files': self.exported_names}, manifest_file, indent=2, sort_keys=True)
+
+    def exported_name_for(self, relative_name):
+        return self.exported_names.get(relative_name, relative_name)
+
+
+class StaticFilesExporter:
+    """Exports static files to `destination_directory`, in parallel, using a pool of processes.
+
+    Each file is written under its own relative name (keeping the directory structure), and also under a
+    name that includes a hash of its contents. JavaScript and CSS files that are not already minified are
+    minified in the process. If `compress` is True, compressed variants of each file are written next to it
+    (see :class:`~reahl.web.fw.CompressedFile`). A :class:`StaticFilesManifest` is written in
+    `destination_directory` to map the relative names of files to their content hashed names.
+
+    .. versionadded:: 7.1
+    """
+    def __init__(self, destination_directory, compress=True):
+        self.destination_directory = destination_directory
+        self.compress = compress
+
+    def export(self, static_files, max_workers=None):
+        manifest = StaticFilesManifest()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            exports = [executor.submit(self.export_file, *self.export_arguments_for(static_file)) for static_file in static_files]
+            for export in concurrent.futures.as_completed(exports):
+                relative_name, exported_name = export.result()
+                manifest.exported_names[relative_name] = exported_name
+        manifest.write_to(os.path.join(self.destination_directory, manifest.file_name))
+        return manifest
+
+    def export_arguments_for(self, static_file):
+        source_path = static_file.disk_path
+        if source_path:
+            content_bytes = None
+        else:
+            with static_file.open() as open_file:
+                content_bytes = open_file.read()
+        already_processed = static_file.immutable
+        return static_file.relative_name, source_path, content_bytes, already_processed
+
+    def export_file(self, relative_name, source_path, content_bytes, already_processed):
+        if content_bytes is None:
+            with open(source_path, 'rb') as source_file:
+                content_bytes = source_file.read()
+
+        exported_name = relative_name
+        if not already_processed:
+            content_bytes = self.minify(relative_name, content_bytes)
+            exported_name = BundledFile.name_with_hash(relative_name, hashlib.sha256(content_bytes))
+
+        for name in {relative_name, exported_name}:
+            self.write_file(name, content_bytes)
+        return relative_name, exported_name
+
+    def minify(self, relative_name, content_bytes):
+        if '.min.' in os.path.basename(relative_name):
+            return content_bytes
+        if relative_name.endswith('.js'):
+            import rjsmin
+            return rjsmin.jsmin(content_bytes.decode('utf-8')).encode('utf-8')
+        elif relative_name.endswith('.css'):
+            import rcssmin
+            return rcssmin.cssmin(content_bytes.decode('utf-8')).encode('utf-8')
+        return content_bytes
+
+    def write_file(self, relative_name, content_bytes):
+        full_path = os.path.join(self.destination_directory, *relative_name.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as exported_file:
+            exported_file.write(content_bytes)
+        if self.compress:
+            for content_encoding in CompressedFile.supported_content_encodings():
+                CompressedFile.write_next_to(full_path, content_bytes, content_encoding)
+
 class Library:
     """A frontend-library: a collection of CSS and JavaScript code that can be used with Reahl.
 
@@ -113,9 +250,24 @@ class Library:
     configured libraries are automatically included in any
     :class:`~reahl.web.ui.HTML5Page`.
 
+    A Library that is not `active` is only included on pages that
+    contain a Widget which lists the Library's class in its
+    `required_libraries`.
+
+    If `web.config.bundle_frontend_libraries` is True, the CSS and
+    JavaScript files of a Library are each concatenated and minified
+    into a single :class:`~reahl.web.fw.BundledFile` which is included
+    on pages instead of the individual files.
+
     :param name: A unique name for this Library.
+
+    .. versionchanged:: 7.1
+       Added bundling.
+
+    .. versionchanged:: 7.1
+       Libraries that are not active are included on pages with Widgets that require them.
     """
-    active = True
+    active = True  #: If True, this Library is included on all pages, else only on pages with Widgets that require it
     @classmethod
     def get_instance(cls):
         return ExecutionContext.get_context().config.web.frontend_libraries.get(cls)
@@ -125,47 +277,69 @@ class Library:
         self.egg_name = 'reahl-web'  #: The component (egg) that contains the files of this library
         self.shipped_in_package = ''  #: The package that contains the files of this library
         self.files = []   #: The JavaScript and CSS files that form part of this library (relative to the `shipped_in_package`)
+        self.bundles = None
 
     def packaged_files(self):
         return [PackagedFile(self.egg_name, self.shipped_in_package, file_name)
                 for file_name in self.files]
 
-    def packaged_files222xxxxxFIXMEIAMDEADButPossibleAlternative(self):
-        exposed_files = []
-        js_files_to_include = [PackagedFile(self.egg_name, self.shipped_in_package, file_name)
-                               for file_name in self.files
-                               if file_name.endswith('.js')]
-        if js_files_to_include:
-            exposed_files.append(ConcatenatedFile('%s.js' % self.name, js_files_to_include))
-
-        css_files_to_include = [PackagedFile(self.egg_name, self.shipped_in_package, file_name)
-                               for file_name in self.files
-                               if file_name.endswith('.css')]
-        if css_files_to_include:
-            exposed_files.append(ConcatenatedFile('%s.css' % self.name, css_files_to_include))
-        return exposed_files
+    def bundled_files(self):
+        """Returns a :class:`~reahl.web.fw.BundledFile` for the JavaScript and one for the CSS files of this Library.
+
+        The bundles are only created once, the first time they are asked for.
+
+        .. versionadded:: 7.1
+        """
+        if self.bundles is None:
+            self.bundles = []
+            for extension in ['.js', '.css']:
+                files_to_include = [PackagedFile(self.egg_name, self.shipped_in_package, file_name)
+                                    for file_name in self.files_of_type(extension)]
+                if files_to_include:
+                    self.bundles.append(BundledFile('%s%s' % (self.name, extension), files_to_include))
+        return self.bundles
+
+    @property
+    def is_bundled(self):
+        return ExecutionContext.get_context().config.web.bundle_frontend_libraries
+
+    def urls_of_type(self, extension):
+        if self.is_bundled:
+            file_names = [bundle.relative_name for bundle in self.bundled_files()
+                          if bundle.relative_name.endswith(extension)]
+        else:
+            file_names = self.files_of_type(extension)
+
+        web_config = ExecutionContext.get_context().config.web
+        if web_config.static_files_manifest:
+            manifest = web_config.frontend_libraries.get_manifest(web_config.static_files_manifest)
+            file_names = [manifest.exported_name_for(file_name) for file_name in file_names]
+        return ['%s/%s' % (web_config.static_files_url, file_name) for file_name in file_names]
 
     def files_of_type(self, extension):
         return [f for f in self.files if f.endswith(extension)]
 
+    def is_included_on(self, rendered_page):
+        return self.active or rendered_page.is_library_required(self)
+
     def header_only_material(self, rendered_page):
         result = ''
-        if self.active:
-            for file_name in self.files_of_type('.css'):
-                result += '\n<link rel="stylesheet" href="/static/%s" type="text/css">' % file_name
+        if self.is_included_on(rendered_page):
+            for url in self.urls_of_type('.css'):
+                result += '\n<link rel="stylesheet" href="%s" type="text/css">' % url
         return result
 
     def footer_only_material(self, rendered_page):
         result = ''
-        if self.active:
-            for file_name in self.files_of_type('.js'):
-                result += '\n<script type="text/javascript" src="/static/%s"></script>' % file_name
+        if self.is_included_on(rendered_page):
+            for url in self.urls_of_type('.js'):
+                result += '\n<script type="text/javascript" src="%s"></script>' % url
         return result
 
     def inline_material(self):
         result = ''
-        for file_name in self.files_of_type('.js'):
-            result += '\n<script type="text/javascript" src="/static/%s"></script>' % file_name
+        for url in self.urls_of_type('.js'):
+            result += '\n<script type="text/javascript" src="%s"></script>' % url
         return result
 
     
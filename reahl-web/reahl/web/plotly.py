@@ -20,7 +20,7 @@ Support for including `plotly.py <https://github.com/plotly/plotly.py/>`_ figure
 
 import json
 
-from reahl.web.ui import HTMLWidget, Div, LiteralHTML
+from reahl.web.ui import HTMLWidget, Div
 from reahl.web.libraries import PlotlyJS
 
 
@@ -51,7 +51,10 @@ class Chart(HTMLWidget):
     :keyword read_check: (See :class:`reahl.web.fw.Widget`)
     :keyword write_check: (See :class:`reahl.web.fw.Widget`)
 
+    .. versionchanged:: 7.1
+       plotly.js is included with the page (or with the refreshed Widget) containing the Chart, instead of inside the Chart.
     """
+    required_libraries = [PlotlyJS]
     def __init__(self, view, figure, css_id, read_check=None, write_check=None):
         super().__init__(view, read_check=read_check, write_check=write_check)
         self.figure = figure
@@ -59,7 +62,6 @@ class Chart(HTMLWidget):
         containing_div.append_class('reahl-plotlychart')
         self.set_html_representation(containing_div)
         self.enable_refresh()
-        containing_div.add_child(LiteralHTML(view, PlotlyJS.get_instance().inline_material()))
         self.contents = containing_div.add_child(ChartContents(self)) #: The contents of the graph. You can use this as
                                                                       #: refresh_widget on an Input to refresh only the
                                                                       #: contents of the Chart, and not the entire Chart.
@@ -51,7 +51,7 @@ function mapToTraditionalNames(untraditionallyNamedArguments) {
     return traditionallyNamedArguments;
 }
 
-function replaceContents(widgetContents) {
+function replaceContents(widgetContents, contentHashes) {
     for (var cssId in widgetContents) {
         var widget = $('#'+cssId);
 
@@ -61,6 +61,17 @@ function replaceContents(widgetContents) {
 
         widget.html(widgetContents[cssId]);
     }
+    for (var cssId in contentHashes) {
+        $('#'+cssId).attr('data-reahl-content-hash', contentHashes[cssId]);
+    }
+}
+
+function getRenderedContentHashes() {
+    var contentHashes = {};
+    $('[data-reahl-content-hash]').each(function(i, widget) {
+        contentHashes[$(widget).attr('id')] = $(widget).attr('data-reahl-content-hash');
+    });
+    return contentHashes;
 }
 
 function reloadPage() {
@@ -79,6 +90,7 @@ function handleStateChanged(refreshUrl, widgetsToRefresh, newState, afterHandler
 
     var data = {};
     data['__reahl_client_side_state__'] = $.param(newState, true);
+    data['__reahl_rendered_hashes__'] = JSON.stringify(getRenderedContentHashes());
 
     widgetsToRefresh.block(blockOptions({cursor: 'wait'}));
 
@@ -91,7 +103,7 @@ function handleStateChanged(refreshUrl, widgetsToRefresh, newState, afterHandler
                         alert(data.exception)
                         reloadPage();
                     } else {
-                        replaceContents(data.result);
+                        replaceContents(data.result, data.hashes);
                         afterContentsReplacedHandler();
                     }
                 } else {
@@ -2497,7 +2497,7 @@ class SimpleFileInput(PrimitiveInput):
     def get_value_from_input(self, input_values):
         field_storages = input_values.get(self.name, [])
 
-        return [UploadedFile(str(field_storage.filename), field_storage.file.read(), str(field_storage.type))
+        return [UploadedFile(str(field_storage.filename), field_storage.file, str(field_storage.type))
                  for field_storage in field_storages
                  if field_storage not in ('', b'')]
 
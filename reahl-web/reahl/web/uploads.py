@@ -0,0 +1,180 @@
+# Copyright 2024 Reahl Software Services (Pty) Ltd. All rights reserved.
+#
+#    This file is part of Reahl.
+#
+#    Reahl is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as
+#    published by the Free Software Foundation; version 3 of the License.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Files uploaded in chunks, kept on the server while they are being assembled.
+
+.. versionadded:: 7.1
+"""
+
+
+import hashlib
+import hmac
+import json
+import os
+import os.path
+import stat
+import tempfile
+from datetime import datetime
+
+from reahl.component.context import ExecutionContext
+from reahl.component.exceptions import DomainException, ProgrammerError
+from reahl.component.i18n import Catalogue
+
+
+_ = Catalogue('reahl-web')
+
+
+class AnnouncedFile:
+    # What is known about a file before its contents arrive, enough to check some constraints early
+    def __init__(self, filename, mime_type, size):
+        self.filename = filename
+        self.mime_type = mime_type
+        self.size = size
+
+
+class PartialUpload:
+    """A file that is being uploaded in chunks, assembled in a file on the server until it is complete.
+
+       Each chunk is checked against its SHA256 checksum. Chunks must arrive in order, but a chunk may
+       be sent again: the file is then truncated to where that chunk starts. Because what was received
+       survives failed requests, an interrupted upload can be resumed from :attr:`received_size`.
+
+       What is known about the file (its name, mime type and size) is announced with the first chunk,
+       and is not changed by those that follow. Partial uploads that are abandoned are removed by
+       :meth:`remove_stale`.
+
+       :param upload_key: A string that uniquely identifies this upload.
+
+       .. versionadded:: 7.1
+    """
+    max_chunk_size = 8*1024*1024
+
+    @classmethod
+    def for_current_session(cls, input_form, input_name, client_upload_id):
+        """Returns the PartialUpload identified by `client_upload_id` (chosen by the browser) for the given input,
+           private to the current user session."""
+        context = ExecutionContext.get_context()
+        message = '%s:%s:%s:%s' % (context.session.as_key(), input_form.css_id, input_name, client_upload_id)
+        upload_key = hmac.new(context.config.web.csrf_key.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).hexdigest()
+        return cls(upload_key)
+
+    @classmethod
+    def get_directory(cls):
+        """The directory in which partial uploads are kept: `web.partial_uploads_directory` or, by default,
+           a directory in the system temp directory which is named differently for each application."""
+        config = ExecutionContext.get_context().config
+        if config.web.partial_uploads_directory:
+            return config.web.partial_uploads_directory
+        application_hash = hashlib.sha256(('partial-uploads:%s' % config.web.csrf_key).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(tempfile.gettempdir(), 'reahl-partial-uploads-%s' % application_hash)
+
+    @classmethod
+    def create_directory(cls):
+        directory = cls.get_directory()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        status = os.lstat(directory)
+        owned_by_us = not hasattr(os, 'getuid') or status.st_uid == os.getuid()
+        if not (stat.S_ISDIR(status.st_mode) and owned_by_us and not (status.st_mode & 0o077)):
+            raise ProgrammerError('%s should be a directory that only the owner of this process has access to' % directory)
+        return directory
+
+    @classmethod
+    def remove_stale(cls, cutoff):
+        """Removes all partial uploads to which nothing was added since `cutoff` (a :class:`datetime.datetime`)."""
+        directory = cls.get_directory()
+        try:
+            filenames = os.listdir(directory)
+        except FileNotFoundError:
+            return
+        last_added = {}
+        for filename in filenames:
+            upload_key, extension = os.path.splitext(filename)
+            if extension in ['.part', '.json']:
+                try:
+                    modified = datetime.fromtimestamp(os.path.getmtime(os.path.join(directory, filename)))
+                except FileNotFoundError:
+                    continue
+                last_added[upload_key] = max(modified, last_added.get(upload_key, modified))
+        for upload_key, modified in last_added.items():
+            if modified < cutoff:
+                cls(upload_key).discard()
+
+    def __init__(self, upload_key):
+        self.upload_key = upload_key
+
+    @property
+    def path(self):
+        return os.path.join(self.get_directory(), '%s.part' % self.upload_key)
+
+    @property
+    def announcement_path(self):
+        return os.path.join(self.get_directory(), '%s.json' % self.upload_key)
+
+    @property
+    def received_size(self):
+        """The number of bytes received so far."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def announce(self, announced_file):
+        """Starts the upload afresh, recording what is known about the file before its contents arrive."""
+        self.discard()
+        self.create_directory()
+        with open(self.announcement_path, 'w') as announcement:
+            json.dump({'filename': announced_file.filename, 'mime_type': announced_file.mime_type, 'size': announced_file.size},
+                      announcement)
+
+    @property
+    def announced_file(self):
+        """What was announced about the file with its first chunk."""
+        try:
+            with open(self.announcement_path, 'r') as announcement:
+                return AnnouncedFile(**json.load(announcement))
+        except FileNotFoundError:
+            raise DomainException(message=_('A part of the file is missing, please try again.'))
+
+    def add_chunk(self, offset, chunk_file, checksum):
+        """Writes the contents of the binary file `chunk_file` at `offset`, if they match `checksum`.
+           Returns the number of bytes received so far.
+        """
+        chunk = chunk_file.read(self.max_chunk_size+1)
+        if len(chunk) > self.max_chunk_size:
+            raise DomainException(message=_('The uploaded chunk is too large.'))
+        if not hmac.compare_digest(hashlib.sha256(chunk).hexdigest(), checksum.lower()):
+            raise DomainException(message=_('The uploaded chunk was corrupted, please try again.'))
+        if offset > self.received_size:
+            raise DomainException(message=_('A part of the file is missing, please try again.'))
+
+        self.create_directory()
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'w+b') as assembled:
+            assembled.seek(offset)
+            assembled.write(chunk)
+            assembled.truncate()
+        return offset + len(chunk)
+
+    def open(self):
+        """Returns the file assembled so far, opened for reading."""
+        return open(self.path, 'rb')
+
+    def discard(self):
+        """Removes all that was received."""
+        for path in [self.path, self.announcement_path]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
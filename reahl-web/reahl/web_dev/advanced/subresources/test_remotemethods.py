@@ -171,6 +171,45 @@ def test_immutable_remote_methods(web_fixture, remote_method_fixture, sql_alchem
         assert Session.query(TestObject).count() == 0
 
 
+class ReadReplicaScenarios(Fixture):
+    @scenario
+    def immutable(self):
+        self.method_kwargs = dict(immutable=True)
+        self.http_method = 'get'
+        self.reads_routed_to_replica = True
+
+    @scenario
+    def immutable_but_needs_recent_changes(self):
+        self.method_kwargs = dict(immutable=True, read_from_replica=False)
+        self.http_method = 'get'
+        self.reads_routed_to_replica = False
+
+    @scenario
+    def mutable(self):
+        self.method_kwargs = dict(immutable=False)
+        self.http_method = 'post'
+        self.reads_routed_to_replica = False
+
+
+@with_fixtures(WebFixture, RemoteMethodFixture, ReadReplicaScenarios)
+def test_immutable_remote_methods_read_from_replica(web_fixture, remote_method_fixture, read_replica_scenarios):
+    """The reads of an immutable RemoteMethod are routed to the read replica of the database (if there is one),
+       unless it is constructed with read_from_replica=False."""
+
+    fixture = read_replica_scenarios
+    def callable_object():
+        return str(bool(Session().info.get('route_reads_to_replica')))
+
+    remote_method = RemoteMethod(web_fixture.view, 'amethod', callable_object, MethodResult(), disable_csrf_check=True, **fixture.method_kwargs)
+    browser = Browser(remote_method_fixture.new_wsgi_app(remote_method=remote_method))
+
+    if fixture.http_method == 'get':
+        browser.open('/_amethod_method')
+    else:
+        browser.post('/_amethod_method', {})
+    assert browser.raw_html == str(fixture.reads_routed_to_replica)
+
+
 class ArgumentScenarios(Fixture):
     @scenario
     def get(self):
@@ -492,6 +531,41 @@ def test_coactive_widgets(web_fixture):
                              }
 
 
+@with_fixtures(WebFixture)
+def test_only_changed_widgets_are_sent_when_client_sends_hashes(web_fixture):
+    """If the browser sends the hashes of what it currently displays, a WidgetResult only sends
+       the contents of Widgets that differ, and lists the others as unchanged."""
+
+    @stubclass(Widget)
+    class WidgetWithRemoteMethod(Widget):
+        def __init__(self, view):
+            super().__init__(view)
+            coactive_widget = self.add_child(CoactiveWidgetStub(view, 'coactive', []))
+            result_widget = self.add_child(CoactiveWidgetStub(view, 'main', [coactive_widget]))
+            method_result = WidgetResult([result_widget])
+            remote_method = RemoteMethod(view, 'amethod', lambda **kwargs: None, default_result=method_result, disable_csrf_check=True)
+            view.add_resource(remote_method)
+
+    wsgi_app = web_fixture.new_wsgi_app(child_factory=WidgetWithRemoteMethod.factory())
+    browser = Browser(wsgi_app)
+
+    # The first time around, the browser has no hashes yet
+    browser.post('/_amethod_method', {'__reahl_rendered_hashes__': '{}'})
+    json_response = json.loads(browser.raw_html)
+    assert json_response['result'] == {'main': '<main><script type="text/javascript"></script>',
+                                       'coactive': '<coactive><script type="text/javascript"></script>'}
+    assert json_response['unchanged'] == []
+    hashes = json_response['hashes']
+    assert set(hashes.keys()) == {'main', 'coactive'}
+
+    # Only the widget whose hash differs is sent again
+    browser.post('/_amethod_method', {'__reahl_rendered_hashes__': json.dumps({'main': hashes['main'], 'coactive': 'stale'})})
+    json_response = json.loads(browser.raw_html)
+    assert json_response['result'] == {'coactive': '<coactive><script type="text/javascript"></script>'}
+    assert json_response['unchanged'] == ['main']
+    assert json_response['hashes'] == hashes
+
+
 @uses(web_fixture=WebFixture)
 class CoactiveScenarios(Fixture):
     expected_exception = NoException
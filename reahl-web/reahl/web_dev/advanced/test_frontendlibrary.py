@@ -15,6 +15,8 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os.path
+import json
 
 from reahl.tofu import temp_dir, Fixture, set_up, uses
 from reahl.tofu.pytestsupport import with_fixtures
@@ -22,9 +24,9 @@ from reahl.stubble import EasterEgg
 
 from reahl.browsertools.browsertools import Browser
 
-from reahl.web.fw import ReahlWSGIApplication, UserInterface
-from reahl.web.ui import HTML5Page
-from reahl.web.libraries import Library
+from reahl.web.fw import ReahlWSGIApplication, UserInterface, WidgetResult, RemoteMethod
+from reahl.web.ui import HTML5Page, P, Div, Slot
+from reahl.web.libraries import Library, StaticFilesManifest
 
 from reahl.web_dev.fixtures import WebFixture
 
@@ -38,6 +40,13 @@ class LibraryFixture(Fixture):
         package_dir.file_with('__init__.py', '')
         package_dir.file_with('somefile.js', 'contents - js')
         package_dir.file_with('somefile.css', 'contents - css')
+        package_dir.sub_dir('css').file_with('nested.css',
+            'a {background: url(../images/a.png)}\n'
+            'b {background: url("fonts/b.woff?#iefix")}\n'
+            'i {background: url(data:image/png;base64,AAAA) url(/absolute.png) url(https://example.org/c.png)}\n'
+            '/*# sourceMappingURL=nested.css.map */\n')
+        package_dir.sub_dir('js').file_with('nested.js', 'var nested = 1;\n//# sourceMappingURL=nested.js.map\n')
+        package_dir.sub_dir('images').file_with('a.png', 'an image')
         return egg_dir
 
     def new_easter_egg(self):
@@ -103,6 +112,184 @@ def test_library_files(web_fixture, library_fixture):
     assert link_added == '<link rel="stylesheet" href="/static/somefile.css" type="text/css">'
 
 
+@with_fixtures(WebFixture, LibraryFixture)
+def test_libraries_required_by_widgets(web_fixture, library_fixture):
+    """A Library that is not active is only included on pages that contain a visible Widget requiring it."""
+
+    class MyInactiveLibrary(library_fixture.MyLibrary):
+        active = False
+
+    class WidgetNeedingMyLibrary(P):
+        required_libraries = [MyInactiveLibrary]
+
+    class HiddenWidgetNeedingMyLibrary(Div):
+        def __init__(self, view):
+            super().__init__(view)
+            self.add_child(WidgetNeedingMyLibrary(view, text='needs it'))
+
+        def can_read(self):
+            return False
+
+    class PageWithSlot(HTML5Page):
+        def __init__(self, view):
+            super().__init__(view)
+            self.body.add_child(Slot(view, 'main'))
+
+    class MainUI(UserInterface):
+        def assemble(self):
+            self.define_page(PageWithSlot)
+            self.define_view('/', title='Without the library')
+            with_library = self.define_view('/with', title='With the library')
+            with_library.set_slot('main', WidgetNeedingMyLibrary.factory(text='needs it'))
+            hidden = self.define_view('/hidden', title='With the library, but hidden')
+            hidden.set_slot('main', HiddenWidgetNeedingMyLibrary.factory())
+
+    config = web_fixture.config
+    config.web.site_root = MainUI
+    config.web.frontend_libraries.clear()
+    config.web.frontend_libraries.add(MyInactiveLibrary())
+
+    browser = Browser(ReahlWSGIApplication(config))
+
+    browser.open('/')
+    assert not browser.is_element_present('//script[@src]')
+    assert not browser.is_element_present('//link')
+
+    browser.open('/with')
+    assert browser.get_html_for('//script[@src]') == '<script type="text/javascript" src="/static/somefile.js"></script>'
+    assert browser.get_html_for('//link') == '<link rel="stylesheet" href="/static/somefile.css" type="text/css">'
+
+    browser.open('/hidden')
+    assert not browser.is_element_present('//script[@src]')
+    assert not browser.is_element_present('//link')
+
+
+@with_fixtures(WebFixture, LibraryFixture)
+def test_libraries_required_by_refreshed_widgets(web_fixture, library_fixture):
+    """A Library that is not active is sent along with a Widget that requires it when that Widget is
+       re-rendered via Ajax, since the page it appears on may not include the Library yet."""
+
+    class MyInactiveLibrary(library_fixture.MyLibrary):
+        active = False
+
+    class WidgetNeedingMyLibrary(P):
+        required_libraries = [MyInactiveLibrary]
+
+    class WidgetWithRemoteMethod(Div):
+        def __init__(self, view):
+            super().__init__(view)
+            needing = self.add_child(Div(view, css_id='needing'))
+            needing.add_child(WidgetNeedingMyLibrary(view, text='needs it'))
+            not_needing = self.add_child(P(view, text='does not need it', css_id='not_needing'))
+            method_result = WidgetResult([needing, not_needing])
+            view.add_resource(RemoteMethod(view, 'amethod', lambda: None, default_result=method_result, disable_csrf_check=True))
+
+    config = web_fixture.config
+    config.web.frontend_libraries.clear()
+    config.web.frontend_libraries.add(MyInactiveLibrary())
+    browser = Browser(web_fixture.new_wsgi_app(child_factory=WidgetWithRemoteMethod.factory()))
+
+    browser.post('/_amethod_method', {})
+    result = json.loads(browser.raw_html)['result']
+    assert result['needing'].startswith('\n<script type="text/javascript" src="/static/somefile.js"></script><p>needs it</p>')
+    assert 'somefile.js' not in result['not_needing']
+
+
+@with_fixtures(WebFixture, LibraryFixture)
+def test_bundled_library_files(web_fixture, library_fixture):
+    """If so configured, the js and css files of each library are served (and included on pages) as
+       single files with names that change when their contents change, so they can be cached forever."""
+
+    config = web_fixture.config
+    config.web.bundle_frontend_libraries = True
+    config.web.frontend_libraries.clear()
+    library = config.web.frontend_libraries.add(library_fixture.MyLibrary())
+
+    browser = Browser(ReahlWSGIApplication(config))
+
+    [js_bundle, css_bundle] = library.bundled_files()
+    assert js_bundle.relative_name.startswith('mylib-') and js_bundle.relative_name.endswith('.js')
+    assert css_bundle.relative_name.startswith('mylib-') and css_bundle.relative_name.endswith('.css')
+
+    browser.open('/')
+    script_added = browser.get_html_for('//script[@src]')
+    assert script_added == '<script type="text/javascript" src="/static/%s"></script>' % js_bundle.relative_name
+
+    link_added = browser.get_html_for('//link')
+    assert link_added == '<link rel="stylesheet" href="/static/%s" type="text/css">' % css_bundle.relative_name
+
+    browser.open('/static/%s' % js_bundle.relative_name)
+    assert 'contents' in browser.raw_html
+    assert 'immutable' in browser.last_response.headers['Cache-Control']
+
+    # The individual files are still available
+    browser.open('/static/somefile.js')
+    assert browser.raw_html == 'contents - js'
+    assert 'Cache-Control' not in browser.last_response.headers
+
+
+@with_fixtures(WebFixture, LibraryFixture)
+def test_bundled_files_refer_to_what_their_files_refer_to(web_fixture, library_fixture):
+    """Relative urls in the CSS files of a library are rewritten so they still refer to the same files from where
+       the bundle is served. Source map comments, which do not apply to a bundle, are removed."""
+
+    class MyNestedLibrary(library_fixture.MyLibrary):
+        def __init__(self):
+            super().__init__()
+            self.files = ['js/nested.js', 'css/nested.css', 'images/a.png']
+
+    config = web_fixture.config
+    config.web.bundle_frontend_libraries = True
+    config.web.frontend_libraries.clear()
+    library = config.web.frontend_libraries.add(MyNestedLibrary())
+
+    browser = Browser(ReahlWSGIApplication(config))
+    [js_bundle, css_bundle] = library.bundled_files()
+
+    browser.open('/static/%s' % css_bundle.relative_name)
+    css = browser.raw_html
+    assert 'url(images/a.png)' in css
+    assert 'url("css/fonts/b.woff?#iefix")' in css
+    assert 'url(data:image/png;base64,AAAA)' in css
+    assert 'url(/absolute.png)' in css
+    assert 'url(https://example.org/c.png)' in css
+    assert 'sourceMappingURL' not in css
+
+    browser.open('/static/images/a.png')
+    assert browser.raw_html == 'an image'
+
+    browser.open('/static/%s' % js_bundle.relative_name)
+    assert 'nested' in browser.raw_html
+    assert 'sourceMappingURL' not in browser.raw_html
+
+
+@with_fixtures(WebFixture, LibraryFixture)
+def test_exported_library_files(web_fixture, library_fixture):
+    """The files of libraries can be exported (minified, compressed and with content hashed names) along with a
+       manifest which, if configured, makes pages refer to the content hashed names of files."""
+
+    config = web_fixture.config
+    config.web.frontend_libraries.clear()
+    config.web.frontend_libraries.add(library_fixture.MyLibrary())
+
+    export_dir = temp_dir()
+    manifest = config.web.frontend_libraries.export_to(export_dir.name, max_workers=2)
+
+    # Files are exported under their own and content hashed names, along with compressed variants
+    exported_js = manifest.exported_name_for('somefile.js')
+    assert exported_js.startswith('somefile-') and exported_js.endswith('.js')
+    for file_name in ['somefile.js', exported_js, exported_js+'.gz']:
+        assert os.path.isfile(os.path.join(export_dir.name, file_name))
+
+    # The app can be configured to refer to exported files using the manifest
+    config.web.static_files_manifest = os.path.join(export_dir.name, StaticFilesManifest.file_name)
+    config.web.static_files_url = 'https://cdn.example.com/static'
+    browser = Browser(ReahlWSGIApplication(config))
+    browser.open('/')
+    script_added = browser.get_html_for('//script[@src]')
+    assert script_added == '<script type="text/javascript" src="https://cdn.example.com/static/%s"></script>' % exported_js
+
+
 @with_fixtures(WebFixture)
 def test_standard_reahl_files(web_fixture):
     """The framework includes certain frontent frameworks by default."""
@@ -248,6 +248,7 @@ def test_web_session_handling(reahl_system_fixture, web_fixture):
             @stubclass(Resource)
             class ResourceStub:
                 should_commit = True
+                may_read_from_replica = False
                 def cleanup_after_transaction(self):
                     context = ExecutionContext.get_context()
                     if hasattr(context.request, 'internal_redirect'):
@@ -313,6 +314,7 @@ def test_internal_redirects(web_fixture):
     @stubclass(Resource)
     class ResourceStub:
         should_commit = True
+        may_read_from_replica = False
         def cleanup_after_transaction(self): pass
         def handle_request(self, request):
             fixture.requests_handled.append(request)
@@ -335,6 +337,42 @@ def test_internal_redirects(web_fixture):
     assert fixture.handling_resources[0] is not fixture.handling_resources[1]
 
 
+@with_fixtures(WebFixture)
+def test_read_replica_routing_after_internal_redirects(web_fixture):
+    """After an InternalRedirect, reads are routed to the read replica only if the freshly constructed
+       resource may read from the replica, and never while it is being constructed."""
+
+    fixture = web_fixture
+    fixture.routing_seen = []
+
+    def note_routing(event):
+        fixture.routing_seen.append((event, bool(Session().info.get('route_reads_to_replica'))))
+
+    @stubclass(Resource)
+    class ResourceStub:
+        should_commit = True
+        def __init__(self, may_read_from_replica):
+            self.may_read_from_replica = may_read_from_replica
+        def cleanup_after_transaction(self): pass
+        def handle_request(self, request):
+            note_routing('handled')
+            if hasattr(request, 'internal_redirect'):
+                return Response(body='response given after internal redirect')
+            raise InternalRedirect(None, None)
+
+    @stubclass(ReahlWSGIApplication)
+    class ReahlWSGIApplicationStub2(ReahlWSGIApplicationStub):
+        def resource_for(self, request):
+            note_routing('constructed')
+            return ResourceStub(may_read_from_replica=not hasattr(request, 'internal_redirect'))
+
+    browser = Browser(ReahlWSGIApplicationStub2(fixture.config))
+
+    browser.open('/')
+
+    assert fixture.routing_seen == [('constructed', False), ('handled', True), ('constructed', False), ('handled', False)]
+
+
 @with_fixtures(WebFixture)
 def test_handling_uncaught_exceptions(web_fixture):
     """If an uncaught exception is raised, the session is closed properly."""
@@ -16,13 +16,18 @@
 
 
 import datetime
+import gzip
 import os.path
+from wsgiref.util import FileWrapper
 
-from reahl.tofu import scenario, temp_dir, temp_file_with, Fixture
+from webob import Request
+
+from reahl.tofu import scenario, temp_dir, temp_file_with, Fixture, expected
 from reahl.tofu.pytestsupport import with_fixtures
 from reahl.stubble import EasterEgg, stubclass
 
-from reahl.web.fw import FileOnDisk, FileFromBlob, PackagedFile, ConcatenatedFile, FileDownload, UserInterface
+from reahl.web.fw import FileOnDisk, FileFromBlob, PackagedFile, ConcatenatedFile, FileDownload, UserInterface, DiskDirectory, \
+    NoMatchingFactoryFound, FileOnDiskCache
 from reahl.browsertools.browsertools import Browser
 
 from reahl.web_dev.fixtures import WebFixture
@@ -73,6 +78,215 @@ def test_files_from_disk(web_fixture):
     browser.open('/staticfiles/one_that_does_not_exist', status=404)
 
 
+@with_fixtures(WebFixture)
+def test_files_from_disk_are_cached(web_fixture):
+    """The FileOnDisk found for a path is kept in a FileOnDiskCache and reused until the file changes on disk,
+       which is only checked again after web.static_file_recheck_seconds.
+    """
+
+    static_root = temp_dir()
+    files_dir = static_root.sub_dir('staticfiles')
+    one_file = files_dir.file_with('one_file.xml', 'one')
+    web_fixture.config.web.static_root = static_root.name
+    file_cache = FileOnDiskCache()
+    def find_file(cache=file_cache):
+        return DiskDirectory('staticfiles', file_cache=cache).create_file('/one_file.xml')
+
+    # Case: the file is checked on every request
+    web_fixture.config.web.static_file_recheck_seconds = 0
+    found_file = find_file()
+    assert find_file() is found_file
+    assert find_file(cache=FileOnDiskCache()) is not found_file  # Each cache (of each ReahlWSGIApplication) is separate
+
+    with open(one_file.name, 'w') as changed_file:
+        changed_file.write('changed')
+    changed = find_file()
+    assert changed is not found_file
+    assert changed.size == len('changed')
+
+    # Case: changes are not noticed within web.static_file_recheck_seconds
+    web_fixture.config.web.static_file_recheck_seconds = 60
+    with open(one_file.name, 'w') as changed_file:
+        changed_file.write('changed again')
+    assert find_file() is changed
+
+    # Case: a file that disappears is not found anymore (once rechecked)
+    web_fixture.config.web.static_file_recheck_seconds = 0
+    os.remove(one_file.name)
+    with expected(NoMatchingFactoryFound):
+        find_file()
+    assert len(file_cache) == 0
+
+
+def test_file_on_disk_cache_is_bounded():
+    """A FileOnDiskCache keeps only its max_entries most recently used files."""
+    file_cache = FileOnDiskCache(max_entries=2)
+    file_cache.put('/a', 0, 'file a')
+    file_cache.put('/b', 0, 'file b')
+    file_cache.get('/a')
+    file_cache.put('/c', 0, 'file c')
+
+    assert len(file_cache) == 2
+    assert file_cache.get('/b') == (None, None)
+    assert file_cache.get('/a') == (0, 'file a')
+
+
+@with_fixtures(WebFixture)
+def test_cached_file_that_disappeared(web_fixture):
+    """A cached file that disappeared from disk (within web.static_file_recheck_seconds) is reported as not found,
+       and looked for on disk again for the next request."""
+
+    static_root = temp_dir()
+    one_file = static_root.sub_dir('staticfiles').file_with('one_file.xml', 'one')
+    web_fixture.config.web.static_root = static_root.name
+    web_fixture.config.web.static_file_recheck_seconds = 60
+
+    class MainUI(UserInterface):
+        def assemble(self):
+            self.define_static_directory('/staticfiles')
+
+    browser = Browser(web_fixture.new_wsgi_app(site_root=MainUI))
+    browser.open('/staticfiles/one_file.xml')
+    assert browser.raw_html == 'one'
+
+    os.remove(one_file.name)
+    browser.open('/staticfiles/one_file.xml', status=404)
+
+    with open(one_file.name, 'w') as recreated_file:
+        recreated_file.write('recreated')
+    browser.open('/staticfiles/one_file.xml')
+    assert browser.raw_html == 'recreated'
+
+
+@with_fixtures(WebFixture)
+def test_files_sent_via_file_wrapper(web_fixture):
+    """Files on disk are handed to the wsgi.file_wrapper of the WSGI server (if it has one), except
+       when serving a partial or conditional GET.
+    """
+
+    static_root = temp_dir()
+    files_dir = static_root.sub_dir('staticfiles')
+    files_dir.file_with('one_file.xml', 'one')
+    web_fixture.config.web.static_root = static_root.name
+
+    class MainUI(UserInterface):
+        def assemble(self):
+            self.define_static_directory('/staticfiles')
+
+    wrapped_files = []
+    class FileWrapperStub(FileWrapper):
+        def __init__(self, filelike, blksize=8192):
+            super().__init__(filelike, blksize=blksize)
+            wrapped_files.append(filelike)
+
+    wsgi_app = web_fixture.new_wsgi_app(site_root=MainUI)
+    browser = Browser(wsgi_app)
+
+    # A normal GET is sent via the file wrapper
+    browser.open('/staticfiles/one_file.xml', extra_environ={'wsgi.file_wrapper': FileWrapperStub})
+    assert browser.raw_html == 'one'
+    assert browser.last_response.content_length == 3
+    assert len(wrapped_files) == 1
+    assert wrapped_files[0].closed
+
+    # A partial GET is not
+    browser.open('/staticfiles/one_file.xml', headers={'Range': 'bytes=1-'}, extra_environ={'wsgi.file_wrapper': FileWrapperStub}, status=206)
+    assert browser.raw_html == 'ne'
+    assert len(wrapped_files) == 1
+
+
+@with_fixtures(WebFixture)
+def test_compressed_variants(web_fixture):
+    """A compressed variant of a file is served to browsers that accept its Content-Encoding.
+       Variants are found next to a file on disk, or can be generated.
+    """
+
+    static_root = temp_dir()
+    files_dir = static_root.sub_dir('staticfiles')
+    content = 'body { color: red; }'*100
+    css_file = files_dir.file_with('styles.css', content)
+    with open(css_file.name+'.gz', 'wb') as gz_file:
+        gz_file.write(gzip.compress(content.encode('utf-8')))
+    files_dir.file_with('plain.css', content)
+    web_fixture.config.web.static_root = static_root.name
+
+    class MainUI(UserInterface):
+        def assemble(self):
+            self.define_static_directory('/staticfiles')
+
+    wsgi_app = web_fixture.new_wsgi_app(site_root=MainUI)
+    browser = Browser(wsgi_app)
+
+    # Case: the browser accepts gzip
+    browser.open('/staticfiles/styles.css', headers={'Accept-Encoding': 'gzip, deflate'})
+    response = browser.last_response
+    assert response.etag.endswith('-gzip')  # Note: WebTest decodes the content and removes the Content-Encoding header
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.body.decode('utf-8') == content
+    compressed_etag = response.etag
+
+    # Case: the browser does not accept gzip
+    browser.open('/staticfiles/styles.css')
+    response = browser.last_response
+    assert not response.content_encoding
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.body.decode('utf-8') == content
+    assert response.etag != compressed_etag
+
+    # Case: a file without compressed variants
+    browser.open('/staticfiles/plain.css', headers={'Accept-Encoding': 'gzip'})
+    response = browser.last_response
+    assert not response.content_encoding
+    assert 'Vary' not in response.headers
+
+    # Case: generated variants
+    blob_file = FileFromBlob('a.css', content.encode('utf-8'), 'text/css', 'utf-8', len(content), 123)
+    blob_file.generate_compressed_variants()
+    response = FileDownload(blob_file, accept_encoding=Request.blank('/', headers={'Accept-Encoding': 'gzip'}).accept_encoding)
+    assert response.content_encoding == 'gzip'
+    assert gzip.decompress(b''.join(response.app_iter)).decode('utf-8') == content
+
+
+@with_fixtures(WebFixture)
+def test_generated_compressed_variants(web_fixture):
+    """Compressed variants generated at startup have the modification time of the original file, and
+       are kept in a cache directory (if given) from which other processes reuse them. Nothing is generated
+       for a file with compressed variants next to it on disk.
+    """
+
+    content = 'body { color: red; }'*100
+    cache_dir = temp_dir()
+
+    def generated_variant(cache_directory=None):
+        blob_file = FileFromBlob('a.css', content.encode('utf-8'), 'text/css', 'utf-8', len(content), 123)
+        blob_file.generate_compressed_variants(cache_directory=cache_directory)
+        [gzip_variant] = [i for i in blob_file.compressed_variants if i.content_encoding == 'gzip']
+        return gzip_variant
+
+    # Case: variants carry the modification time of the original
+    variant = generated_variant()
+    assert variant.mtime == 123
+    assert variant.full_path != generated_variant().full_path
+
+    # Case: variants are reused from a cache directory
+    variant = generated_variant(cache_directory=cache_dir.name)
+    assert os.path.dirname(variant.full_path) == cache_dir.name
+    assert variant.mtime == 123
+    assert generated_variant(cache_directory=cache_dir.name).full_path == variant.full_path
+    with open(variant.full_path, 'rb') as cached_file:
+        assert gzip.decompress(cached_file.read()).decode('utf-8') == content
+
+    # Case: variants found on disk are used instead
+    files_dir = temp_dir()
+    css_file = files_dir.file_with('styles.css', content)
+    with open(css_file.name+'.gz', 'wb') as gz_file:
+        gz_file.write(gzip.compress(content.encode('utf-8')))
+    disk_file = FileOnDisk(css_file.name, 'styles.css')
+    disk_file.generate_compressed_variants()
+    assert disk_file.generated_variants is None
+    assert [i.full_path for i in disk_file.compressed_variants] == [css_file.name+'.gz']
+
+
 @with_fixtures(WebFixture)
 def test_files_from_list(web_fixture):
     """An explicit list of files can also be added on an URL as if they were in a single
@@ -219,6 +433,51 @@ def test_concatenated_files(web_fixture, concatenate_scenarios):
         assert browser.raw_html == fixture.expected_result
 
 
+@with_fixtures(WebFixture)
+def test_concatenated_files_are_cached(web_fixture):
+    """If web.minified_files_cache_directory is set, the result of concatenating (and minifying) files is kept there
+       and reused by later ConcatenatedFiles (also in other processes) with the same contents."""
+
+    cache_dir = temp_dir()
+    web_fixture.config.web.minified_files_cache_directory = cache_dir.name
+    web_fixture.config.reahlsystem.debug = False
+
+    egg_dir = temp_dir()
+    package_dir = egg_dir.sub_dir('packaged_files')
+    package_dir.file_with('__init__.py', '')
+    one_file = package_dir.file_with('one.js', 'acall1(); //some comment')
+    minified_calls = []
+
+    @stubclass(ConcatenatedFile)
+    class ConcatenatedFileSpy(ConcatenatedFile):
+        def write_concatenation(self, relative_name, contents, output_file):
+            minified_calls.append(relative_name)
+            super().write_concatenation(relative_name, contents, output_file)
+
+    def inner_files():
+        return [PackagedFile('test==1.0', 'packaged_files', 'one.js')]
+
+    with EasterEgg(name='test', location=egg_dir.name).installed():
+        # The first time, the concatenation is done and cached
+        first = ConcatenatedFileSpy('concatenated.js', inner_files())
+        assert os.path.dirname(first.full_path) == cache_dir.name
+        assert len(minified_calls) == 1
+        with first.open() as open_file:
+            assert open_file.read() == b'acall1();'
+
+        # Thereafter, it is reused
+        second = ConcatenatedFileSpy('concatenated.js', inner_files())
+        assert second.full_path == first.full_path
+        assert len(minified_calls) == 1
+
+        # Changed contents result in a new cached file
+        with open(one_file.name, 'w') as changed_file:
+            changed_file.write('acall2();')
+        third = ConcatenatedFileSpy('concatenated.js', inner_files())
+        assert third.full_path != first.full_path
+        assert len(minified_calls) == 2
+
+
 @with_fixtures(WebFixture)
 def test_file_download_details(web_fixture):
     """FileDownloadStub (the GET response for a StaticFileResource) works correctly in
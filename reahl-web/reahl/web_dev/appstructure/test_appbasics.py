@@ -20,6 +20,7 @@ import os.path
 import warnings
 import io
 import itertools
+import gc
 
 from reahl.tofu import expected, scenario, Fixture, uses
 from reahl.tofu.pytestsupport import with_fixtures
@@ -28,9 +29,12 @@ from reahl.stubble import EmptyStub
 from reahl.browsertools.browsertools import Browser, XPath
 
 from reahl.component.exceptions import ProgrammerError, IncorrectArgumentError, IsSubclass
+from reahl.component.i18n import SystemWideCatalogue
 from reahl.web.fw import UserInterface
 from reahl.web.ui import HTML5Page, P, Div
 
+from reahl.sqlalchemysupport import Session
+
 from reahl.web_dev.fixtures import WebFixture, BasicPageLayout
 
 
@@ -288,3 +292,35 @@ def test_out_of_bound_widgets(web_fixture):
     assert browser.is_element_present(XPath.paragraph().with_text('Out Of Bound Widget'))
     assert not browser.is_element_present(XPath.paragraph().with_text('Out Of Bound Widget').inside_of(main_panel))
     assert browser.is_element_present(XPath.paragraph().with_text('Child Widget').inside_of(main_panel))
+
+
+@with_fixtures(WebFixture)
+def test_warming_up(web_fixture):
+    """Before worker processes are forked, a ReahlWSGIApplication can be warmed up: translations are loaded
+       and the given URLs are rendered once, without keeping anything the rendering writes to the database."""
+
+    rendered = []
+    class MyPanel(Div):
+        def render(self):
+            rendered.append(self.view.relative_path)
+            return super().render()
+
+    class MainUI(UserInterface):
+        def assemble(self):
+            self.define_page(HTML5Page).use_layout(BasicPageLayout())
+            self.define_view('/', title='Hello').set_slot('main', MyPanel.factory())
+            self.define_view('/other', title='Other').set_slot('main', MyPanel.factory())
+
+    wsgi_app = web_fixture.new_wsgi_app(site_root=MainUI)
+    SystemWideCatalogue.instance = None  # To "reset" the singleton
+    user_session_class = web_fixture.config.web.session_class
+    user_sessions_before = Session.query(user_session_class).count()
+
+    try:
+        wsgi_app.warm_up(urls=['/', '/other'])
+    finally:
+        gc.unfreeze()
+
+    assert rendered == ['/', '/other']
+    assert Session.query(user_session_class).count() == user_sessions_before  # What the requests wrote was rolled back
+    assert ('af', 'reahl-web') in SystemWideCatalogue.get_instance().translations
@@ -15,22 +15,30 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import io
 import os
+import re
+import stat
+import time
+import hashlib
+import tempfile
 import threading 
+from datetime import datetime, timedelta
 
 from flaky import flaky
 
-from reahl.tofu import scenario, expected, Fixture, temp_file_with, uses
+from reahl.tofu import scenario, expected, Fixture, temp_file_with, temp_dir, uses
 from reahl.tofu.pytestsupport import with_fixtures
 
-from reahl.browsertools.browsertools import XPath
+from reahl.browsertools.browsertools import XPath, Browser
 
 from reahl.sqlalchemysupport import Session
 from reahl.webdeclarative.webdeclarative import PersistedFile
 from reahl.component.modelinterface import ExposedNames, Event, FileField, Action, ValidationConstraint
-from reahl.component.exceptions import DomainException
+from reahl.component.exceptions import DomainException, ProgrammerError
 from reahl.web.bootstrap.forms import Form
 from reahl.web.bootstrap.files import FileUploadInput, FileUploadPanel, Button, FormLayout, FileInput, FileInputButton
+from reahl.web.uploads import PartialUpload, AnnouncedFile
 
 from reahl.web_dev.fixtures import WebFixture
 
@@ -909,3 +917,139 @@ def test_async_number_files_validation(web_fixture, max_number_of_files_file_upl
 
     browser.click(XPath.button_labelled('Remove', filename=fixture.file_to_upload1_name))
     assert browser.wait_for_not(browser.is_visible, XPath.span().including_text('a maximum of 1 files may be uploaded')) 
+
+
+class ChunkedUploadClient:
+    # Sends chunks the way reahl.files.js does
+    def __init__(self, browser):
+        self.browser = browser
+        browser.open('/')
+        self.chunk_url = re.search(r'chunkUploadUrl: "([^"]*)"', browser.raw_html).group(1)
+        self.progress_url = re.search(r'uploadProgressUrl: "([^"]*)"', browser.raw_html).group(1)
+        self.headers = {'X-CSRF-TOKEN': str(browser.xpath('//meta[@name="csrf-token"]/@content')[0])}
+
+    def send_chunk(self, offset, chunk, total_size, checksum=None, filename='file1.html', upload_id='an upload'):
+        checksum = checksum or hashlib.sha256(chunk).hexdigest()
+        self.browser.post(self.chunk_url, {'upload_id': upload_id, 'offset': str(offset), 'total_size': str(total_size),
+                                           'checksum': checksum, 'filename': filename, 'mime_type': 'text/html'},
+                          upload_files=[('chunk', filename, chunk)], headers=self.headers)
+        return self.browser.last_response.json
+
+    def received_so_far(self, upload_id='an upload'):
+        self.browser.open('%s?upload_id=%s' % (self.progress_url, upload_id.replace(' ', '+')), headers=self.headers)
+        return self.browser.last_response.json
+
+
+@with_fixtures(WebFixture, FileUploadInputFixture)
+def test_chunked_upload(web_fixture, file_upload_input_fixture):
+    """Large files are uploaded to a FileUploadInput in chunks, each checked against its checksum. An interrupted
+       upload resumes from what the server already received, and the completed file is added like any other upload."""
+    fixture = file_upload_input_fixture
+    client = ChunkedUploadClient(Browser(fixture.new_wsgi_app(enable_js=True)))
+
+    contents = b'0123456789'*3
+
+    assert client.received_so_far() == 0
+    assert client.send_chunk(0, contents[:10], len(contents)) == 10
+
+    # A corrupted chunk is refused
+    assert client.send_chunk(10, contents[10:20], len(contents), checksum='0'*64) == 'The uploaded chunk was corrupted, please try again.'
+    assert client.received_so_far() == 10
+    assert not fixture.file_was_uploaded('file1.html')
+
+    # The upload resumes from where the server is
+    assert client.send_chunk(10, contents[10:20], len(contents)) == 20
+    assert client.send_chunk(20, contents[20:], len(contents)) == 30
+    assert fixture.file_was_uploaded('file1.html')
+    assert Session.query(PersistedFile).filter_by(filename='file1.html').one().file_data == contents
+
+
+@with_fixtures(WebFixture, FileUploadInputFixture)
+def test_chunked_upload_size_is_what_was_announced_first(web_fixture, file_upload_input_fixture):
+    """The size of a file uploaded in chunks is announced with its first chunk: a larger size announced later is ignored."""
+    fixture = file_upload_input_fixture
+    client = ChunkedUploadClient(Browser(fixture.new_wsgi_app(enable_js=True)))
+
+    contents = b'0123456789'*3
+    assert client.send_chunk(0, contents[:10], 20) == 10
+    assert client.send_chunk(10, contents[10:20], 30) == 20
+    assert fixture.file_was_uploaded('file1.html')
+    assert Session.query(PersistedFile).filter_by(filename='file1.html').one().file_data == contents[:20]
+
+    # Chunks that do not follow an announcement are refused
+    assert client.send_chunk(10, contents[10:20], 30, upload_id='another upload') == 'A part of the file is missing, please try again.'
+    assert client.received_so_far(upload_id='another upload') == 0
+
+
+@with_fixtures(WebFixture, FileUploadInputFixture)
+def test_chunked_upload_maximum_size(web_fixture, file_upload_input_fixture):
+    """Files larger than web.max_chunked_upload_bytes are refused before anything of them is stored."""
+    fixture = file_upload_input_fixture
+    web_fixture.config.web.max_chunked_upload_bytes = 20
+    client = ChunkedUploadClient(Browser(fixture.new_wsgi_app(enable_js=True)))
+
+    assert client.send_chunk(0, b'0123456789', 21) == 'The uploaded file is too large.'
+    assert client.received_so_far() == 0
+
+    assert client.send_chunk(0, b'0123456789', 20) == 10
+
+
+@with_fixtures(WebFixture, MaxNumberOfFilesFileUploadInputFixture)
+def test_chunked_upload_maximum_number_of_files(web_fixture, max_number_of_files_file_upload_input_fixture):
+    """A file uploaded in chunks that would be one too many is refused before anything of it is stored."""
+    fixture = max_number_of_files_file_upload_input_fixture
+    client = ChunkedUploadClient(Browser(fixture.new_wsgi_app(enable_js=True)))
+
+    assert client.send_chunk(0, b'0123456789', 10, filename='file1.html') == 10
+    assert fixture.file_was_uploaded('file1.html')
+
+    assert client.send_chunk(0, b'0123456789', 10, filename='file2.html', upload_id='another upload') == 'a maximum of 1 files may be uploaded'
+    assert client.received_so_far(upload_id='another upload') == 0
+    assert not fixture.file_was_uploaded('file2.html')
+
+
+@with_fixtures(WebFixture)
+def test_partial_uploads_directory(web_fixture):
+    """Partial uploads are kept in a directory that only the owner of the process can access, named differently
+       for each application unless web.partial_uploads_directory is set."""
+    config = web_fixture.config
+
+    default_directory = PartialUpload.get_directory()
+    assert default_directory.startswith(tempfile.gettempdir())
+    config.web.csrf_key = 'a different key'
+    assert PartialUpload.get_directory() != default_directory
+
+    directory = temp_dir()
+    config.web.partial_uploads_directory = os.path.join(directory.name, 'uploads')
+    assert PartialUpload.create_directory() == config.web.partial_uploads_directory
+    assert stat.S_IMODE(os.stat(config.web.partial_uploads_directory).st_mode) == 0o700
+
+    # A directory others can access is not used
+    os.chmod(config.web.partial_uploads_directory, 0o755)
+    with expected(ProgrammerError):
+        PartialUpload.create_directory()
+
+
+@with_fixtures(WebFixture)
+def test_removing_stale_partial_uploads(web_fixture):
+    """Partial uploads to which nothing was added since a given time are removed."""
+    web_fixture.config.web.partial_uploads_directory = os.path.join(temp_dir().name, 'uploads')
+
+    def start_upload(upload_key):
+        partial_upload = PartialUpload(upload_key)
+        partial_upload.announce(AnnouncedFile('file.html', 'text/html', 20))
+        partial_upload.add_chunk(0, io.BytesIO(b'0123456789'), hashlib.sha256(b'0123456789').hexdigest())
+        return partial_upload
+
+    stale_upload = start_upload('stale')
+    recent_upload = start_upload('recent')
+    an_hour_ago = time.time() - 60*60
+    os.utime(stale_upload.path, (an_hour_ago, an_hour_ago))
+    os.utime(stale_upload.announcement_path, (an_hour_ago, an_hour_ago))
+
+    PartialUpload.remove_stale(datetime.now() - timedelta(minutes=30))
+
+    assert not os.path.exists(stale_upload.path)
+    assert not os.path.exists(stale_upload.announcement_path)
+    assert recent_upload.received_size == 10
+    assert recent_upload.announced_file.size == 20
@@ -49,7 +49,8 @@ class ReahlWSGIApplicationStub(ReahlWSGIApplication):
         static_files = self.config.web.frontend_libraries.packaged_files()
         static_files_no_js = [packaged_file
                               for packaged_file in static_files if not packaged_file.relative_name.endswith('.js')]
-        return self.define_static_files('/static', static_files_no_js)
+        self.define_static_files('/static', static_files_no_js)
+        return static_files_no_js
 
 
 class BasicPageLayout(Layout):
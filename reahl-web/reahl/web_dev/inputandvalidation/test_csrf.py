@@ -18,6 +18,7 @@
 import time
 import datetime
 import base64
+import hashlib
 
 from selenium.common.exceptions import TimeoutException
 
@@ -193,3 +194,21 @@ def test_csrf_with_invalid_timestamp(web_fixture):
     future_token = CSRFToken(timestamp=future_time)
     with expected(InvalidCSRFToken):
         CSRFToken.from_coded_string(future_token.as_signed_string())
+
+
+@with_fixtures(WebFixture)
+def test_tokens_signed_by_earlier_versions(web_fixture):
+    """Tokens signed with HMAC-SHA1 (as done before version 7.1) are still accepted while web.csrf_accept_sha1_tokens is set,
+       and match a token created with a legacy_value."""
+    timestamp_string = repr(CSRFToken.get_now().timestamp())
+    sha1_signature = CSRFToken.sign_timed_value('old value', timestamp_string, digestmod=hashlib.sha1)
+    sha1_signed_string = '%s:%s' % (CSRFToken.get_delimited_encoded_string('old value', timestamp_string), sha1_signature)
+
+    reconstructed_token = CSRFToken.from_coded_string(sha1_signed_string)
+    assert reconstructed_token.value == 'old value'
+    assert CSRFToken(value='new value', legacy_value='old value').matches(reconstructed_token)
+    assert not CSRFToken(value='new value').matches(reconstructed_token)
+
+    web_fixture.config.web.csrf_accept_sha1_tokens = False
+    with expected(InvalidCSRFToken):
+        CSRFToken.from_coded_string(sha1_signed_string)
@@ -18,12 +18,14 @@
 
 import os.path
 
+from webob import Request
+
 from reahl.tofu import temp_file_with
 from reahl.tofu.pytestsupport import with_fixtures
 
 from reahl.component.modelinterface import FileField, ExposedNames, Event, UploadedFile, ValidationConstraint
 from reahl.web.ui import SimpleFileInput, Form, ButtonInput
-from reahl.browsertools.browsertools import XPath
+from reahl.browsertools.browsertools import XPath, Browser
 
 from reahl.web_dev.fixtures import WebFixture
 
@@ -97,6 +99,39 @@ def test_simple_file_input(web_fixture):
     assert read_contents == expected_content
 
 
+@with_fixtures(WebFixture)
+def test_request_body_size_limit(web_fixture):
+    """If web.max_request_body_bytes is set, requests with larger bodies are refused before they are read."""
+    fixture = web_fixture
+    wsgi_app = fixture.new_wsgi_app(enable_js=False)
+    browser = Browser(wsgi_app)
+
+    fixture.config.web.max_request_body_bytes = 100
+    browser.post('/', {'afile': 'x'*200}, status=413)
+    browser.open('/')
+
+
+@with_fixtures(WebFixture)
+def test_request_body_size_limit_without_content_length(web_fixture):
+    """The body of a request that does not state its Content-Length upfront (such as a chunked one) is only read up to
+       web.max_request_body_bytes."""
+    fixture = web_fixture
+    wsgi_app = fixture.new_wsgi_app(enable_js=False)
+    fixture.config.web.max_request_body_bytes = 100
+
+    def post_chunked(body):
+        request = Request.blank('/', method='POST', body=body, content_type='application/x-www-form-urlencoded')
+        del request.environ['CONTENT_LENGTH']
+        request.environ['wsgi.input_terminated'] = True
+        request.environ['webob.is_body_seekable'] = False
+        status, headers, app_iter = request.call_application(wsgi_app)
+        app_iter.close() # Ends the request
+        return int(status.split()[0])
+
+    assert post_chunked(b'afile='+b'x'*200) == 413
+    assert post_chunked(b'afile=x') != 413
+
+
 @with_fixtures(WebFixture)
 def test_simple_file_input_exceptions(web_fixture):
     """Usually, when a DomainException happens during a form submit Inputs save the input they received so that
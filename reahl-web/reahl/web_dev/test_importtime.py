@@ -0,0 +1,75 @@
+# Copyright 2026 Reahl Software Services (Pty) Ltd. All rights reserved.
+#
+#    This file is part of Reahl.
+#
+#    Reahl is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as
+#    published by the Free Software Foundation; version 3 of the License.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+import subprocess
+
+from reahl.tofu import scenario, Fixture
+from reahl.tofu.pytestsupport import with_fixtures
+
+
+class ImportFixture(Fixture):
+    deferred_modules = ['babel', 'dateutil', 'docutils', 'bs4', 'rjsmin', 'rcssmin', 'brotli', 'passlib']
+    max_modules_added = 300     # Importing reahl.web.ui adds about 200 modules to those of a bare interpreter
+    max_times_baseline = 15     # Importing reahl.web.ui takes about 4 times as long as importing webob
+    baseline_module_name = 'webob'
+
+    @scenario
+    def framework(self):
+        self.module_name = 'reahl.web.fw'
+
+    @scenario
+    def widgets(self):
+        self.module_name = 'reahl.web.ui'
+
+    def import_in_new_process(self, module_name):
+        """Imports `module_name` in a new interpreter, returning the names of all modules loaded after
+           the import and the cumulative time (in microseconds) `python -X importtime` reports for it."""
+        script = 'import sys, %s; print(" ".join(sys.modules))' % module_name
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], capture_output=True, text=True, check=True)
+        [last_line] = completed.stderr.strip().splitlines()[-1:]
+        cumulative_microseconds, imported_name = [i.strip() for i in last_line.split('|')[1:]]
+        assert imported_name == module_name
+        return set(completed.stdout.split()), int(cumulative_microseconds)
+
+    def modules_of_bare_interpreter(self):
+        completed = subprocess.run([sys.executable, '-c', 'import sys; print(" ".join(sys.modules))'], capture_output=True, text=True, check=True)
+        return set(completed.stdout.split())
+
+
+@with_fixtures(ImportFixture)
+def test_heavy_dependencies_are_imported_on_demand(fixture):
+    """Importing the main modules of the framework does not import heavy dependencies that are only needed
+       by some of its features."""
+
+    imported_modules, _ = fixture.import_in_new_process(fixture.module_name)
+
+    eagerly_imported = [name for name in fixture.deferred_modules if name in imported_modules]
+    assert not eagerly_imported
+
+
+@with_fixtures(ImportFixture)
+def test_import_budget(fixture):
+    """Importing the main modules of the framework loads a bounded number of modules, and (as measured by
+       `python -X importtime`) takes no longer than a generous multiple of importing webob on the same machine."""
+
+    imported_modules, import_time = fixture.import_in_new_process(fixture.module_name)
+    _, baseline_time = fixture.import_in_new_process(fixture.baseline_module_name)
+
+    modules_added = imported_modules - fixture.modules_of_bare_interpreter()
+    assert len(modules_added) <= fixture.max_modules_added
+    assert import_time <= fixture.max_times_baseline*baseline_time
@@ -42,6 +42,22 @@ def test_plotly_basics(web_fixture):
     assert browser.is_element_present(chart)
 
 
+@with_fixtures(WebFixture)
+def test_javascript_is_included_once_with_charts_on_page(web_fixture):
+    """The plotly.js src is included once on a page, however many Charts are on it."""
+
+    class TwoCharts(Div):
+        def __init__(self, view):
+            super().__init__(view)
+            self.add_child(Chart(view, go.Figure(), 'chart1'))
+            self.add_child(Chart(view, go.Figure(), 'chart2'))
+
+    browser = Browser(web_fixture.new_wsgi_app(child_factory=TwoCharts.factory(), enable_js=True))
+    browser.open('/')
+
+    assert browser.get_xpath_count(plotly_js) == 1
+
+
 @with_fixtures(WebFixture)
 def test_no_javascript_when_no_chart_on_page(web_fixture):
     """When there aren't any Charts on the page, the plotly.js src should not be present."""
@@ -22,7 +22,7 @@ from reahl.stubble import EmptyStub, stubclass
 from reahl.browsertools.browsertools import WidgetTester, Browser
 
 from reahl.component.exceptions import IncorrectArgumentError, IsInstance
-from reahl.web.fw import UserInterface, Widget
+from reahl.web.fw import UserInterface, Widget, LazyWidget
 from reahl.web.ui import Div, P, Slot
 
 
@@ -81,6 +81,34 @@ def test_visibility(web_fixture):
     assert actual == ''
 
 
+@with_fixtures(WebFixture)
+def test_lazy_widgets(web_fixture):
+    """A LazyWidget only creates the Widget it stands in for once that is needed, and never if the LazyWidget is not visible."""
+
+    created = []
+    class ExpensiveWidget(Widget):
+        def __init__(self, view):
+            super().__init__(view)
+            created.append(self)
+            self.add_child(P(view, text='expensive'))
+
+    fixture = web_fixture
+
+    # Case: when not visible
+    hidden = LazyWidget(fixture.view, ExpensiveWidget.factory(), read_check=lambda: False, write_check=lambda: False)
+    assert WidgetTester(hidden).render_html() == ''
+    assert list(hidden.contained_widgets()) == []
+    assert not hidden.is_created
+    assert created == []
+
+    # Case: when visible
+    shown = LazyWidget(fixture.view, ExpensiveWidget.factory())
+    assert not shown.is_created
+    assert WidgetTester(shown).render_html() == '<p>expensive</p>'
+    assert shown.is_created
+    assert created == [shown.created_widget]
+
+
 @with_fixtures(WebFixture)
 def test_widget_factories_and_args(web_fixture):
     """Widgets can be created from factories which allow you to supply widget-specific args